@@ -3,107 +3,144 @@ import pandas as pd
 import xgboost as xgb
 import matplotlib.pyplot as plt
 from src import config
+from src.data import store
+from src.data.cache import PredictionCache
+from src.strategy import brackets, portfolio
 
-def run_backtest():
-    print(f"--> Starting Backtest with MARKET REGIME FILTER (QQQ)...")
-    print(f"    Initial Capital: ${config.FALLBACK_EQUITY:,.2f}")
-    
-    # 1. Load Market Data (QQQ)
-    qqq_path = config.DATA_RAW / "QQQ_1min.parquet"
-    if not qqq_path.exists():
-        print("[!] QQQ data missing. Run 'fetch_market.py' first.")
-        return
-        
-    print("    Loading QQQ Data...", end="")
-    df_qqq = pd.read_parquet(qqq_path)
-    
-    # Calculate Regime Filter: Is Price > 20-min Moving Average?
-    # We use 'close' column.
-    df_qqq['qqq_ma'] = df_qqq['close'].rolling(window=20).mean()
-    df_qqq['market_safe'] = df_qqq['close'] > df_qqq['qqq_ma']
-    
-    # Keep only the safety flag and index (time) for merging
-    df_qqq = df_qqq[['market_safe']]
-    print(" Done.")
-
-    all_trades = []
-    
-    # 2. Process Stocks
-    for symbol in config.ACTIVE_TRADING_LIST:
-        print(f"\n  [Processing {symbol}]...")
-        
-        # Load Stock Data
+def _as_index_time(ts, index):
+    """Booster attribute timestamp -> comparable with the labeled index (None stays None)."""
+    if ts is None: return None
+    ts = pd.Timestamp(ts)
+    if index.tz is None and ts.tz is not None:
+        return ts.tz_convert(store.STORE_TZ).tz_localize(None)
+    if index.tz is not None and ts.tz is None:
+        return ts.tz_localize(index.tz)
+    return ts
+
+def load_panel(symbols):
+    """
+    Scores every symbol's labeled data with its model and stacks the test
+    split (last HOLDOUT_FRAC) into one panel: time index, one row per
+    symbol-minute. Rows a refreshed model has since trained on (before its
+    trained_until attribute) are left out, so the panel stays out-of-sample.
+    Probabilities come from the prediction cache; inference only runs on a miss.
+    """
+    cache = PredictionCache()
+    frames = []
+    scored = 0
+    for symbol in symbols:
         data_path = config.DATA_PROCESSED / f"{symbol}_labeled.parquet"
-        if not data_path.exists(): continue
-        df = pd.read_parquet(data_path)
-        
-        # --- MERGE WITH QQQ ---
-        # Join on the Timestamp Index
-        # 'inner' join ensures we only look at times where we have BOTH stock and QQQ data
-        df = df.join(df_qqq, how='inner')
-        
-        # Load Model
         model_path = config.MODELS_DIR / f"{symbol}_xgb.json"
-        if not model_path.exists(): continue
+        if not data_path.exists() or not model_path.exists(): continue
+        df = pd.read_parquet(data_path)
+
+        # Prepare Features (exclude non-feature cols)
+        exclude = ['bin', 'ret', 'exit_time', 'open', 'high', 'low', 'close', 'volume']
+        features = [c for c in df.columns if c not in exclude]
+
+        # Cached probabilities if neither the model nor the features changed
         bst = xgb.Booster()
         bst.load_model(str(model_path))
-        
-        # Prepare Features (exclude non-feature cols + our new 'market_safe' col)
-        exclude = ['bin', 'ret', 'exit_time', 'open', 'high', 'low', 'close', 'volume', 'market_safe']
-        features = [c for c in df.columns if c not in exclude]
-        
-        # Predict
-        dmatrix = xgb.DMatrix(df[features])
-        df['prob'] = bst.predict(dmatrix)
-        
-        # --- SIMULATION (Test Set Only) ---
-        split = int(len(df) * 0.8)
-        test_df = df.iloc[split:].copy()
-        
-        # FILTER LOGIC:
-        # 1. High Confidence (Prob > Threshold)
-        # 2. Safe Market (QQQ > MA20)
-        signals = test_df[
-            (test_df['prob'] > config.ENTRY_THRESHOLD) & 
-            (test_df['market_safe'] == True)  # <--- THE GUARD
-        ].copy()
-        
-        print(f"    -> Raw Signals: {len(test_df[test_df['prob'] > config.ENTRY_THRESHOLD])}")
-        print(f"    -> Safe Signals: {len(signals)} (Filtered out risky trades)")
-        
-        for t, row in signals.iterrows():
-            pnl = 0.01 if row['bin'] == 1 else -0.005
-            all_trades.append({
-                'time': t, 'symbol': symbol, 'pnl_pct': pnl
-            })
-
-    # 3. Calculate Results
-    if not all_trades:
+        key = cache.key(model_path, df[features])
+        prob = cache.get(symbol, key)
+        if prob is None or len(prob) != len(df):
+            prob = bst.inplace_predict(df[features].to_numpy(dtype='float32'))
+            cache.put(symbol, key, prob)
+            scored += 1
+        df['prob'] = prob
+
+        # --- Test Set Only (never trained on) ---
+        split = int(len(df) * (1 - config.HOLDOUT_FRAC))
+        test_df = df.iloc[split:]
+        unseen = _as_index_time(bst.attr('trained_until'), df.index)
+        if unseen is not None and split < len(df) and unseen > df.index[split]:
+            print(f"  [!] {symbol}: model refreshed up to {unseen}; testing on the {(df.index >= unseen).sum()} rows after it")
+            test_df = df[df.index >= unseen]
+        test_df = test_df[['prob', 'feat_rsi_14', 'bin', 'ret', 'exit_time']].copy()
+        test_df['symbol'] = symbol
+        frames.append(test_df)
+        print(f"  [+] {symbol}: {len(test_df)} test minutes")
+
+    if frames:
+        print(f"  [CACHE] Predictions: {len(frames) - scored} cached, {scored} scored")
+    return pd.concat(frames).sort_index(kind='stable') if frames else None
+
+def apply_bracket_exits(panel, threshold=None):
+    """
+    Replaces label exits with simulated live brackets (limit entry, profit
+    target, trailing stop) for every minute that could trigger an entry.
+    Signals whose limit entry never fills are dropped.
+    """
+    candidates = panel[portfolio.threshold_mask(panel, threshold)]
+    out = []
+    for symbol, grp in candidates.groupby('symbol', sort=False):
+        bars = store.read_bars(symbol, start=grp.index.min(), columns=['open', 'high', 'low', 'close'])
+        sim = brackets.simulate_brackets(bars, grp.index)
+        grp = grp.copy()
+        grp['exit_time'] = sim['exit_time'].to_numpy()
+        grp['ret'] = sim['ret'].to_numpy()
+        grp['exit_reason'] = sim['reason'].to_numpy()
+        out.append(grp[grp['exit_reason'] != 'unfilled'])
+    return pd.concat(out).sort_index(kind='stable') if out else candidates.iloc[:0]
+
+def run_backtest(symbols=None, exits='bracket'):
+    symbols = symbols or config.ACTIVE_TRADING_LIST
+    print(f"--> Starting Portfolio Backtest for {symbols}...")
+    print(f"    Initial Capital: ${config.FALLBACK_EQUITY:,.2f}")
+
+    # 1. Panel of scored minutes (all symbols at once)
+    panel = load_panel(symbols)
+    if panel is None:
+        print("[!] No labeled data / models found.")
+        return
+
+    # 2. Market Guard (same rule as live: guard symbols > 5-min EMA)
+    print(f"    Building Market Guard ({'+'.join(config.GUARD_SYMBOLS)})...")
+    safe = portfolio.guard_series(panel.index)
+    panel['market_safe'] = safe.reindex(panel.index).to_numpy()
+
+    # 3. Exits: simulated live bracket (default) or triple-barrier labels
+    thresholds = portfolio.entry_thresholds(symbols)
+    print(f"    Entry thresholds: {thresholds}")
+    raw = portfolio.threshold_mask(panel, thresholds).sum()
+    if exits == 'bracket':
+        print(f"    Simulating brackets (target {config.PROFIT_TARGET_PCT:.1%}, trail {config.TRAILING_STOP_PCT}%)...")
+        panel = apply_bracket_exits(panel, thresholds)
+
+    # 4. Live entry gating: threshold, guard, RSI, hours, cooldown, ownership
+    trades = portfolio.select_entries(panel, thresholds)
+    print(f"    -> Raw Signals: {raw}")
+    print(f"    -> Taken Trades: {len(trades)} (after guard / RSI / cooldown / ownership)")
+    if trades.empty:
         print("[!] No trades passed the filter.")
         return
 
-    trades_df = pd.DataFrame(all_trades).sort_values('time')
-    equity = config.FALLBACK_EQUITY
-    
-    wins = 0
-    losses = 0
-    
-    for _, trade in trades_df.iterrows():
-        pos_size = equity * config.POSITION_PCT
-        pnl_amt = (pos_size * trade['pnl_pct']) - 2.0 # $2 comms
-        equity += pnl_amt
-        
-        if trade['pnl_pct'] > 0: wins += 1
-        else: losses += 1
-
-    total_return = ((equity - config.FALLBACK_EQUITY) / config.FALLBACK_EQUITY) * 100
-    win_rate = (wins / (wins + losses)) * 100
-    
-    print("\n=== REGIME FILTERED RESULTS (QQQ Guard) ===")
-    print(f"  Final Equity:   ${equity:,.2f}")
-    print(f"  Total Return:   {total_return:.2f}%")
-    print(f"  Total Trades:   {wins + losses}")
-    print(f"  Win Rate:       {win_rate:.2f}%")
+    # 5. Compounded sizing at POSITION_PCT of equity, booked at exit
+    trades, curve = portfolio.simulate_portfolio(trades)
+    stats = portfolio.summarize(trades, curve)
+
+    print("\n=== PORTFOLIO RESULTS (Live Gating) ===")
+    print(f"  Final Equity:   ${stats['final_equity']:,.2f}")
+    print(f"  Total Return:   {stats['total_return']:.2%}")
+    print(f"  Total Trades:   {stats['trades']}")
+    print(f"  Win Rate:       {stats['win_rate']:.2%}")
+    print(f"  Max Drawdown:   {stats['max_drawdown']:.2%}")
+    print(f"  Max Open Pos:   {stats['max_open']}")
+    if 'exit_reason' in trades.columns:
+        print(f"  Exit Reasons:   {trades['exit_reason'].value_counts().to_dict()}")
+
+    print("\n  Per Symbol:")
+    per_sym = trades.groupby('symbol').agg(trades=('pnl', 'size'), pnl=('pnl', 'sum'))
+    for sym, row in per_sym.iterrows():
+        print(f"    {sym:<6} {int(row['trades']):>5} trades | ${row['pnl']:>12,.2f}")
+
+    plt.figure(figsize=(10, 5))
+    plt.plot(curve.index, curve.values)
+    plt.title("Portfolio Equity (Live Gating)")
+    plt.savefig(config.PROJECT_ROOT / "backtest_result.png")
+    plt.close()
+
+    return trades, curve
 
 if __name__ == "__main__":
-    run_backtest()
\ No newline at end of file
+    run_backtest()
@@ -1,6 +1,8 @@
 # code red/main.py
 import argparse
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 # Add 'src' to python path to enable modular imports
@@ -8,11 +10,40 @@ sys.path.append(str(Path(__file__).parent / "src"))
 
 import config
 # Import the actual scripts we have been using
-from src.data import ingest
+from src.data import ingest, backfill
 import run_pipeline  # Your feature/label pipeline
 import train_model   # Your XGBoost trainer
+import tune_model    # Hyperparameter search
 
-def run_task(task):
+def run_per_symbol(func, symbols, workers=1, label="Task", **kwargs):
+    """
+    Runs func(symbol, **kwargs) for every symbol and returns {symbol: result}.
+    With workers > 1 symbols are spread over a pool of `workers` processes.
+    Each process handles one symbol at a time and only returns a small
+    result, so at most `workers` symbols' frames are alive at once. A
+    failing symbol is reported and skipped without stopping the batch.
+    """
+    results = {}
+    if workers <= 1:
+        for sym in symbols:
+            try:
+                results[sym] = func(sym, **kwargs)
+            except Exception as e:
+                print(f"  [!] {label} failed for {sym}: {e}")
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(func, sym, **kwargs): sym for sym in symbols}
+        for future in as_completed(futures):
+            sym = futures[future]
+            try:
+                results[sym] = future.result()
+            except Exception as e:
+                print(f"  [!] {label} failed for {sym}: {e}")
+    return {sym: results[sym] for sym in symbols if sym in results}
+
+def run_task(task, start=None, end=None, workers=1, walk_forward=False, trials=200, search='halving',
+             stream=False, pooled=False):
     """
     Master Controller for the Quant Pipeline.
     """
@@ -26,37 +57,61 @@ def run_task(task):
         importlib.reload(config)
         ingest.fetch_data()
 
+    # 1b. BACKFILL (Multi-year history, resumable)
+    elif task == 'backfill':
+        print("--> Starting Historical Backfill...")
+        backfill.backfill(config.ALL_SYMBOLS, start=start, end=end)
+
     # 2. PIPELINE (Features + Labels)
     elif task == 'pipeline':
-        print("--> Running Feature & Label Pipeline...")
+        print(f"--> Running Feature & Label Pipeline ({workers} worker(s))...")
         # Loop through universe defined in config
-        for sym in config.TARGET_SYMBOLS:
-            try:
-                run_pipeline.run_full_pipeline(sym)
-            except Exception as e:
-                print(f"  [!] Pipeline failed for {sym}: {e}")
+        rows = run_per_symbol(run_pipeline.run_full_pipeline, config.TARGET_SYMBOLS, workers, "Pipeline")
+        done = [s for s, n in rows.items() if n]
+        print(f"  [+] Pipeline complete for {len(done)}/{len(config.TARGET_SYMBOLS)} symbols")
 
     # 3. TRAINING (XGBoost Models)
     elif task == 'train':
-        print("--> Training Models...")
-        results = {}
-        for sym in config.TARGET_SYMBOLS:
-            try:
-                score = train_model.train_xgb_model(sym)
-                if score is not None:
-                    results[sym] = score
-            except Exception as e:
-                print(f"  [!] Training failed for {sym}: {e}")
+        print(f"--> Training Models ({workers} worker(s))...")
+        # Split cores between workers so boosters don't oversubscribe
+        n_jobs = max(1, (os.cpu_count() or 1) // workers) if workers > 1 else -1
+        if stream and pooled:
+            # One booster over the whole universe, streamed from disk
+            score = train_model.train_out_of_core(config.TARGET_SYMBOLS)
+            scores = {'UNIVERSE': score}
+        elif stream:
+            scores = run_per_symbol(train_model.train_out_of_core, config.TARGET_SYMBOLS, workers, "Training", n_jobs=n_jobs)
+        elif walk_forward:
+            # One level of processes only: folds go parallel when symbols don't
+            fold_workers = 1 if workers > 1 else min(config.WF_FOLDS, os.cpu_count() or 1)
+            if fold_workers > 1:
+                n_jobs = max(1, (os.cpu_count() or 1) // fold_workers)
+            scores = run_per_symbol(train_model.train_walk_forward, config.TARGET_SYMBOLS, workers, "Training",
+                                    fold_workers=fold_workers, n_jobs=n_jobs)
+        else:
+            scores = run_per_symbol(train_model.train_xgb_model, config.TARGET_SYMBOLS, workers, "Training", n_jobs=n_jobs)
+        results = {s: p for s, p in scores.items() if p is not None}
         
         print("\n=== FINAL SCOREBOARD ===")
         for s, p in results.items():
             print(f"{s}: {p:.2%}")
 
+    # 3a. NIGHTLY REFRESH (new days only; promote if not worse)
+    elif task == 'refresh':
+        print(f"--> Refreshing Models ({workers} worker(s))...")
+        n_jobs = max(1, (os.cpu_count() or 1) // workers) if workers > 1 else -1
+        promoted = run_per_symbol(train_model.refresh_model, config.TARGET_SYMBOLS, workers, "Refresh", n_jobs=n_jobs)
+        print(f"  [+] Promoted {sum(1 for p in promoted.values() if p)}/{len(config.TARGET_SYMBOLS)} models")
+
+    # 3b. HYPERPARAMETER SEARCH (resumable; writes models/<SYM>_params.json)
+    elif task == 'tune':
+        tune_model.search(config.TARGET_SYMBOLS, n_trials=trials, method=search, workers=workers)
+
     # 4. RUN EVERYTHING
     elif task == 'all':
         run_task('ingest')
-        run_task('pipeline')
-        run_task('train')
+        run_task('pipeline', workers=workers)
+        run_task('train', workers=workers, walk_forward=walk_forward, stream=stream, pooled=pooled)
 
     else:
         print(f"[!] Error: Unknown task '{task}'")
@@ -69,14 +124,24 @@ if __name__ == "__main__":
         '--task', 
         type=str, 
         default='all',
-        choices=['ingest', 'pipeline', 'train', 'all'],
+        choices=['ingest', 'backfill', 'pipeline', 'train', 'refresh', 'tune', 'all'],
         help='Task to run (default: all)'
     )
+    parser.add_argument('--start', type=str, default=None, help='Backfill start date (default: BACKFILL_YEARS ago)')
+    parser.add_argument('--end', type=str, default=None, help='Backfill end date (default: today)')
+    parser.add_argument('--workers', type=int, default=1, help='Processes for per-symbol pipeline/train (default: 1)')
+    parser.add_argument('--walk-forward', action='store_true', help='Train with purged walk-forward folds (see WF_* in config)')
+    parser.add_argument('--stream', action='store_true', help='Out-of-core training from parquet batches (see TRAIN_* in config)')
+    parser.add_argument('--pooled', action='store_true', help='With --stream: one UNIVERSE model over all target symbols')
+    parser.add_argument('--trials', type=int, default=200, help='Configurations per symbol for --task tune (default: 200)')
+    parser.add_argument('--search', type=str, default='halving', choices=['halving', 'random'], help='Search method for --task tune')
     
     args = parser.parse_args()
     
     try:
-        run_task(args.task)
+        run_task(args.task, start=args.start, end=args.end, workers=args.workers,
+                 walk_forward=args.walk_forward, trials=args.trials, search=args.search,
+                 stream=args.stream, pooled=args.pooled)
     except KeyboardInterrupt:
         print("\n[!] Process interrupted by user.")
     except Exception as e:
@@ -1,115 +1,95 @@
 # code red/optimize.py
-import pandas as pd
-import xgboost as xgb
 import numpy as np
 from src import config
+from src.strategy import portfolio, sweep
+from backtest import load_panel
 
-def analyze_strategy():
-    print(f"--> Running Deep Dive Optimization for {config.ACTIVE_TRADING_LIST}...")
-    
-    # Store all potential trades
-    all_signals = []
+def analyze_strategy(symbols=None, thresholds=None):
+    symbols = symbols or config.ACTIVE_TRADING_LIST
+    print(f"--> Running Deep Dive Optimization for {symbols}...")
 
-    for symbol in config.ACTIVE_TRADING_LIST:
-        # Load Data
-        data_path = config.DATA_PROCESSED / f"{symbol}_labeled.parquet"
-        if not data_path.exists(): continue
-        df = pd.read_parquet(data_path)
-        
-        # Load Model
-        model_path = config.MODELS_DIR / f"{symbol}_xgb.json"
-        if not model_path.exists(): continue
-        bst = xgb.Booster()
-        bst.load_model(str(model_path))
-        
-        # Prepare Features
-        exclude = ['bin', 'ret', 'exit_time', 'open', 'high', 'low', 'close', 'volume']
-        features = [c for c in df.columns if c not in exclude]
-        
-        # Predict
-        dtest = xgb.DMatrix(df[features])
-        df['prob'] = bst.predict(dtest)
-        
-        # Use only Test Data (Last 20%)
-        split = int(len(df) * 0.8)
-        test_df = df.iloc[split:].copy()
-        test_df['symbol'] = symbol
-        
-        # Store essential info
-        all_signals.append(test_df[['symbol', 'prob', 'bin']])
-
-    if not all_signals:
+    # Scored test minutes (unseen holdout) for every symbol in one panel
+    master_df = load_panel(symbols)
+    if master_df is None:
         print("[!] No data found.")
         return
 
-    # Combine into one giant dataframe
-    master_df = pd.concat(all_signals)
-    master_df['hour'] = master_df.index.hour
+    print(f"    Building Market Guard ({'+'.join(config.GUARD_SYMBOLS)})...")
+    safe = portfolio.guard_series(master_df.index)
+    master_df['market_safe'] = safe.reindex(master_df.index).to_numpy()
+    master_df['hour'] = master_df.index.hour.astype(np.int8)
 
     print(f"    Analyzed {len(master_df)} total minutes of test data.\n")
 
+    # --- Full grid: threshold x symbol x hour x guard in one pass ---
+    table = sweep.threshold_sweep(master_df, thresholds=thresholds)
+    out_path = config.DATA_PROCESSED / "threshold_sweep.parquet"
+    dims = ['symbol', 'hour', 'guard']
+    table.astype({c: str for c in dims}).to_parquet(out_path, index=False)
+    print(f"    [+] Sweep: {table['threshold'].nunique()} thresholds, {len(table)} rows -> {out_path.name}\n")
+
+    overall = table[(table['symbol'] == sweep.ALL) & (table['hour'] == sweep.ALL)]
+
     # --- TEST 1: THRESHOLD OPTIMIZATION ---
     print("=== 1. THRESHOLD SENSITIVITY (How picky should we be?) ===")
     print(f"{'Threshold':<10} | {'Trades':<8} | {'Win Rate':<10} | {'Exp. Return (per trade)':<20}")
     print("-" * 60)
-    
-    best_thresh = 0.50
-    best_score = -999
-    
-    for thresh in [0.50, 0.55, 0.60, 0.65, 0.70, 0.75, 0.80]:
-        # Filter trades
-        trades = master_df[master_df['prob'] > thresh]
-        
-        if len(trades) < 5: continue # Ignore empty results
-        
-        wins = trades[trades['bin'] == 1]
-        win_rate = len(wins) / len(trades)
-        
-        # Approx return: (Win% * 1.0%) - (Loss% * 0.5%)
-        # This is the "Expected Value" (EV)
-        ev = (win_rate * 1.0) - ((1 - win_rate) * 0.5)
-        
-        print(f"{thresh:<10.2f} | {len(trades):<8} | {win_rate:<10.2%} | {ev:+.4f}%")
-        
-        if ev > best_score and len(trades) > 20: # Ensure enough sample size
-            best_score = ev
-            best_thresh = thresh
+    off = overall[overall['guard'] == 'off'].set_index('threshold')
+    off.index = off.index.round(6)
+    swept = set(np.round(thresholds if thresholds is not None else sweep.threshold_grid(), 6))
+    shown = [t for t in [0.50, 0.55, 0.60, 0.65, 0.70, 0.75, 0.80] if round(t, 6) in swept]
+    # Exact rows only; the sweep drops thresholds with no trades, so a miss means 0 trades
+    rows = off.reindex([round(t, 6) for t in shown])
+    rows['trades'] = rows['trades'].fillna(0)
+    for thresh, row in zip(shown, rows.itertuples()):
+        if row.trades < 5:
+            print(f"{thresh:<10.2f} | {int(row.trades):<8} | {'n/a':<10} | n/a (too few trades)")
+            continue
+        print(f"{thresh:<10.2f} | {int(row.trades):<8} | {row.win_rate:<10.2%} | {row.ev:+.4f}%")
 
-    print(f"\n[>>] RECOMMENDED THRESHOLD: {best_thresh} (EV: {best_score:.4f}%)\n")
+    best = sweep.best_threshold(table, symbol=sweep.ALL, hour=sweep.ALL, guard='off')
+    best_thresh = best['threshold'] if best is not None else 0.50
+    if best is not None:
+        print(f"\n[>>] RECOMMENDED THRESHOLD: {best_thresh:.4f} (EV: {best['ev']:.4f}%, {int(best['trades'])} trades)\n")
 
     # --- TEST 2: TIME OF DAY ANALYSIS ---
     print("=== 2. HOURLY PERFORMANCE (When do we lose money?) ===")
-    print(f"Using Threshold: {best_thresh}")
+    print(f"Using Threshold: {best_thresh:.4f}")
     print(f"{'Hour':<10} | {'Trades':<8} | {'Win Rate':<10} | {'Status':<10}")
     print("-" * 50)
-    
-    # Filter by the BEST threshold first
-    optimized_df = master_df[master_df['prob'] > best_thresh]
-    
-    # Group by Hour (9, 10, 11, etc.)
-    hourly_stats = optimized_df.groupby('hour').agg(
-        trades=('bin', 'count'),
-        wins=('bin', 'sum')
-    )
-    hourly_stats['win_rate'] = hourly_stats['wins'] / hourly_stats['trades']
-    
+
+    hourly = table[(table['symbol'] == sweep.ALL) & (table['hour'] != sweep.ALL)
+                   & (table['guard'] == 'off') & (table['threshold'] == best_thresh)]
     bad_hours = []
-    
-    for hour, row in hourly_stats.iterrows():
+    for _, row in hourly.sort_values('hour').iterrows():
         wr = row['win_rate']
         status = "✅ CLEAN"
         if wr < 0.33: # If Win Rate is below break-even (33% for 2:1 ratio)
             status = "❌ TOXIC"
-            bad_hours.append(hour)
+            bad_hours.append(row['hour'])
         elif wr < 0.40:
             status = "⚠️ WEAK"
-            
-        print(f"{hour}:00      | {row['trades']:<8} | {wr:<10.2%} | {status}")
+        print(f"{row['hour']}:00      | {int(row['trades']):<8} | {wr:<10.2%} | {status}")
 
     if bad_hours:
         print(f"\n[>>] ACTION: Update paper_trade.py to BLOCK trading during hours: {bad_hours}")
     else:
         print(f"\n[>>] ACTION: No time restrictions needed. All hours are profitable.")
 
+    # --- TEST 3: PER SYMBOL / GUARD ---
+    print("\n=== 3. BEST THRESHOLD PER SYMBOL (guard off / on) ===")
+    tuned = portfolio.entry_thresholds(symbols)
+    for sym in symbols + [sweep.ALL]:
+        line = f"{sym:<6}" + (f" | live: {tuned[sym]:.3f}" if sym in tuned else "")
+        for g in ['off', 'on']:
+            b = sweep.best_threshold(table, symbol=sym, hour=sweep.ALL, guard=g)
+            line += f" | {g}: " + (f"{b['threshold']:.4f} EV {b['ev']:+.4f}% ({int(b['trades'])})" if b is not None else "n/a")
+        print(line)
+
+    heatmap_path = config.PROJECT_ROOT / "optimize_heatmap.png"
+    sweep.plot_heatmap(table, heatmap_path, symbol=sweep.ALL, guard='off')
+    print(f"\n    [+] Heatmap saved to {heatmap_path.name}")
+    return table
+
 if __name__ == "__main__":
-    analyze_strategy()
\ No newline at end of file
+    analyze_strategy()
@@ -1,24 +1,34 @@
 # code red/paper_trade.py
+import asyncio
 import datetime
 import math
-import requests
 import json
 import csv
+import numpy as np
 import pandas as pd
-import xgboost as xgb
 import pytz 
+import xgboost as xgb
 import sys
 import time
 from collections import deque
 from ib_insync import *
 from src import config
-from src.strategy import features
+from src.account import EquityTracker
+from src.alerts import AlertDispatcher
+from src.data.feed import MarketDataFeed, bar_seconds
+from src.orders import OrderBook
+from src.scheduler import BarScheduler
+from src.strategy import features, portfolio
+from src.strategy.guard import MarketGuard
+from src.strategy.treeeval import TreeEnsemble
 
 class MLTrader:
     def __init__(self):
         self.ib = IB()
         self.models = {}    
-        self.positions = {} 
+        self.boosters = {}          # symbol -> xgb.Booster (large batches)
+        self.thresholds = {}        # symbol -> entry threshold
+        self.book = OrderBook()  # Positions + live brackets, event-driven
         self.account_id = "" 
         self.minutes_running = 0 
         self.log_file = config.PROJECT_ROOT / "trade_log.csv"
@@ -27,11 +37,21 @@ class MLTrader:
         # RISK & STATE
         self.starting_equity = 0.0
         self.daily_loss_limit = 0.0 
-        self.order_labels = {}
+        self.equity = EquityTracker()   # Event-fed NetLiquidation + daily P&L
+        self.alerts = AlertDispatcher() # Background Discord sender
         
         # --- NEW FEATURES STATE ---
         self.last_trade_time = {}   # Cooldown Timer
         self.market_is_safe = False # Market Guard (SPY Trend)
+        self.guard = MarketGuard()  # Streaming EMA state for guard symbols
+        self.feature_engines = {}   # Streaming feature state per symbol
+        self.clock = BarScheduler() # Wakes just after each 1-min bar close
+        self.realtime = config.LIVE_BARS == 'realtime'
+        self.feed = MarketDataFeed() # 5-sec real-time bars -> local 1-min / 5-min bars
+        self.live_rows = {}         # symbol -> (features, price) of the last bar the feed closed
+        if self.realtime:
+            self.feed.barCloseEvent[60] += self.on_live_bar
+            self.feed.barCloseEvent[bar_seconds(config.GUARD_BAR_SIZE)] += self.on_guard_bar
 
         # EVENT LISTENER
         self.ib.execDetailsEvent += self.on_fill
@@ -59,7 +79,7 @@ class MLTrader:
         # Update Cooldown on Exit/Entry
         self.last_trade_time[symbol] = datetime.datetime.now(pytz.timezone('US/Eastern'))
         
-        label = self.order_labels.get(order_id, "Manual/Unknown")
+        label = self.book.label(order_id)
         
         if side == 'BOT':
             title = f"🚀 BOUGHT: {symbol}"
@@ -94,12 +114,17 @@ class MLTrader:
         self.log(f"--> Connecting to IBKR (Port {config.IB_PORT})...")
         try:
             if self.ib.isConnected(): self.ib.disconnect()
+            self.guard.reset() # Old subscriptions die with the connection
+            self.feed.reset()
+            self.equity.reset()
             
             self.ib.connect('127.0.0.1', config.IB_PORT, clientId=config.CLIENT_ID)
             self.ib.reqMarketDataType(3) 
             
             accounts = self.ib.managedAccounts()
             self.account_id = accounts[0] if accounts else "Unknown"
+            self.equity.attach(self.ib, self.account_id)
+            self.book.attach(self.ib, self.account_id) # Rebuilt from positions / open orders sent at connect
             
             current_equity = self.get_account_equity()
             
@@ -127,51 +152,33 @@ class MLTrader:
 
     def update_market_guard(self):
         """
-        Checks SPY (Market) AND XLK (Tech Sector) Trends.
-        Rule: BOTH must be above their 5-minute EMA-20.
+        Reads the streaming guard (SPY + XLK vs 5-min EMA-20 by default).
+        Rule: ALL guard symbols must be above their EMA. No network round-trip
+        once the guard is subscribed; subscription happens lazily.
         """
         self.market_is_safe = False # Default to Unsafe
         
         try:
-            # Define the "Guardians"
-            tickers = ['SPY', 'XLK'] 
-            statuses = []
-            
-            for symbol in tickers:
-                contract = Stock(symbol, 'SMART', 'USD')
-                # Request 5-minute bars (Institutional Trend)
-                bars = self.ib.reqHistoricalData(
-                    contract, endDateTime='', durationStr='7200 S', 
-                    barSizeSetting='5 mins', whatToShow='TRADES', useRTH=True, timeout=5
-                )
-                
-                if not bars or len(bars) < 20:
-                    self.log(f"  [GUARD] ⚠️ Missing Data for {symbol}. Halting Buys.")
+            if not self.guard.attached:
+                self.guard.attach(self.ib, stream=not self.realtime) # Realtime: the feed advances it
+                missing = [s for s in self.guard.symbols if s not in self.guard.subscriptions]
+                if missing:
+                    self.log(f"  [GUARD] ⚠️ Missing Data for {missing}. Halting Buys.")
                     return # Fail Safe
 
-                df = util.df(bars)
-                df['ema'] = df['close'].ewm(span=20, adjust=False).mean()
-                
-                last_close = df['close'].iloc[-1]
-                last_ema = df['ema'].iloc[-1]
-                
-                # Individual Check
-                is_bullish = last_close > last_ema
-                statuses.append(is_bullish)
-                
-                # Optional debug log
-                # dist_pct = ((last_close - last_ema) / last_ema) * 100
-                # self.log(f"  [DEBUG] {symbol}: {last_close:.2f} vs EMA {last_ema:.2f} ({dist_pct:+.2f}%)")
-
-            # THE DOUBLE LOCK: Both must be True
-            if all(statuses):
-                self.market_is_safe = True
-                if self.minutes_running % 10 == 0:
-                    self.log("  [GUARD] ✅ MARKET & SECTOR ALIGNED (SPY+XLK Bullish). Trading Active.")
-            else:
-                self.market_is_safe = False
-                if self.minutes_running % 10 == 0:
-                    self.log("  [GUARD] 🛑 SECTOR CONFLICT. Tech (XLK) or Market (SPY) is weak. Halting.")
+            statuses = self.guard.statuses()
+            age = self.guard.age_minutes()
+
+            # THE DOUBLE LOCK: all True and fresh
+            self.market_is_safe = self.guard.is_safe()
+            if self.minutes_running % 10 == 0:
+                names = "+".join(self.guard.symbols)
+                if self.market_is_safe:
+                    self.log(f"  [GUARD] ✅ MARKET & SECTOR ALIGNED ({names} Bullish). Trading Active.")
+                elif age is None or age > config.GUARD_MAX_STALENESS_MIN:
+                    self.log(f"  [GUARD] ⚠️ Guard data stale ({age if age is None else f'{age:.0f} min'}). Halting.")
+                else:
+                    self.log(f"  [GUARD] 🛑 SECTOR CONFLICT {statuses}. Halting.")
 
         except Exception as e:
             self.log(f"  [!] Market Guard Error: {e}")
@@ -187,13 +194,13 @@ class MLTrader:
                         continue
 
                 if not self.models: self.load_models()
-                self.update_positions()
                 self.run_strategy_loop()
 
             except KeyboardInterrupt:
                 self.log("\n  [STOP] Manual Shutdown.")
                 self.generate_daily_summary() 
                 self.ib.disconnect()
+                self.alerts.close()
                 break
             except Exception as e:
                 self.log(f"\n  [CRITICAL CRASH] {e}")
@@ -203,36 +210,43 @@ class MLTrader:
     def run_strategy_loop(self):
         self.log(f"--> STARTING LIVE TRADING LOOP: {config.ACTIVE_TRADING_LIST}")
         
+        self.clock.reset()
         while True:
-            self.ib.sleep(0.1) 
+            # Guard -> features -> inference -> orders, timed from the bar close
+            tick = self.clock.wait(self.ib.sleep) # ib.sleep keeps IB events flowing
+            if tick.missed:
+                self.log(f"  [SKIP] {tick.missed} bar close(s) missed (previous tick overran)")
             
+            if self.realtime and not self.feed.attached:
+                self.feed.attach(self.ib)
+                missing = [s for s in self.feed.symbols if s not in self.feed.subscriptions]
+                if missing: self.log(f"  [FEED] ⚠️ No real-time bars for {missing}. Using historical requests.")
+
             self.check_circuit_breaker()
             self.update_market_guard() 
-            
-            if self.minutes_running % 5 == 0: self.update_positions()
+            tick.mark('guard')
 
-            tz_ny = pytz.timezone('US/Eastern')
-            now = datetime.datetime.now(tz_ny)
+            now = tick.bar_close
             start_time = now.replace(hour=config.TRADING_START_HOUR, minute=0, second=0, microsecond=0)
             end_time = now.replace(hour=config.TRADING_END_HOUR, minute=0, second=0, microsecond=0)
 
             if now < start_time:
                 wait_seconds = (start_time - now).total_seconds()
                 self.log(f"  [WAIT] Market not open. Sleeping {wait_seconds:.0f}s...")
-                self.ib.sleep(wait_seconds + 1)
+                self.ib.sleep(max(wait_seconds - 60, 0))
+                self.clock.reset()
                 continue 
 
             if now >= end_time:
                 if not self.summary_generated: self.generate_daily_summary()
-                self.log(f"  [WAIT] Market Closed. Sleeping 60s...")
-                self.ib.sleep(60)
                 continue
             
             self.summary_generated = False
 
+            eligible = []
             for symbol in config.ACTIVE_TRADING_LIST:
-                # 1. OWNERSHIP CHECK
-                if self.positions.get(symbol, False): 
+                # 1. OWNERSHIP CHECK (held, or a bracket still working)
+                if self.book.is_busy(symbol): 
                     # self.log(f"  [SKIP] {symbol} (Already Owned)")
                     continue 
 
@@ -250,9 +264,16 @@ class MLTrader:
                         continue 
 
                 if symbol not in self.models: continue
-                
-                # 4. DATA CHECK
-                X_live, price = self.get_live_features(symbol)
+                eligible.append(symbol)
+
+            # 4. DATA CHECK (all eligible symbols fetched concurrently, up to the bar that just closed)
+            if self.realtime: self.wait_for_feed(eligible, now)
+            live, late = self.fetch_live_features(eligible, closed_at=now)
+            if late:
+                self.log(f"  [SKIP] {late} (Data deadline {config.LIVE_FETCH_DEADLINE}s missed)")
+
+            candidates = {}  # symbol -> (latest feature row, price)
+            for symbol, (X_live, price) in live.items():
                 if X_live is None or X_live.empty: 
                     self.log(f"  [SKIP] {symbol} (Data Fetch Failed)")
                     continue
@@ -264,28 +285,52 @@ class MLTrader:
                     if current_rsi > 75:
                         self.log(f"  [SKIP] {symbol} is Overbought (RSI: {current_rsi:.1f} > 75)")
                         continue
-                
-                dtest = xgb.DMatrix(X_live)
-                prob = self.models[symbol].predict(dtest)[0]
-                
+
+                candidates[symbol] = (X_live, price)
+            tick.mark('features')
+
+            # 6. BATCHED INFERENCE (one call per model, no DMatrix per symbol)
+            probs = self.predict_batch({sym: X for sym, (X, _) in candidates.items()})
+            tick.mark('inference')
+
+            # Don't trade a bar we're already too late for
+            stale = self.clock.over_budget(tick)
+            for symbol, prob in probs.items():
+                price = candidates[symbol][1]
                 self.log(f"  {symbol}: {prob:.1%} (Price: ${price:.2f})")
                 
-                if prob >= config.ENTRY_THRESHOLD:
-                    self.execute_trade(symbol, prob, price)
-            
-            self.log("  ... scanning complete. Sleeping 60s ...")
-            self.ib.sleep(60)
+                if prob >= self.thresholds.get(symbol, config.ENTRY_THRESHOLD):
+                    if stale:
+                        self.log(f"  [SKIP] {symbol} entry: {now:%H:%M} bar is past its "
+                                 f"{config.LIVE_TICK_BUDGET_MS}ms budget")
+                        continue
+                    tick.orders += self.execute_trade(symbol, prob, price)
+            tick.mark('orders')
+
+            overran = self.clock.finish(tick)
+            if overran:
+                self.log(f"  [OVERRUN] {now:%H:%M} bar: {tick.elapsed * 1000:.0f}ms after close "
+                         f"(budget {config.LIVE_TICK_BUDGET_MS}ms) | {tick.describe()}")
+            else:
+                self.log(f"  ... {now:%H:%M} bar scanned {tick.elapsed * 1000:.0f}ms after close "
+                         f"(start +{tick.late * 1000:.0f}ms | {tick.describe()})")
+            if self.minutes_running and self.minutes_running % 30 == 0:
+                stats = self.clock.summary()
+                self.log(f"  [LATENCY] close->done p50 {stats.get('p50_ms', 0):.0f}ms p95 {stats.get('p95_ms', 0):.0f}ms "
+                         f"max {stats.get('max_ms', 0):.0f}ms | close->orders p50 {stats.get('order_p50_ms', 0):.0f}ms "
+                         f"max {stats.get('order_max_ms', 0):.0f}ms | {stats['overruns']} overrun(s), {stats['skipped']} skipped, "
+                         f"{stats['stale']} stale")
             self.minutes_running += 1
 
     def execute_trade(self, symbol, confidence, price):
-        if self.positions.get(symbol, False): return
+        if self.book.is_busy(symbol): return False
         entry_price = float(price)
-        if entry_price <= 0: return
+        if entry_price <= 0: return False
 
         equity = self.get_account_equity()
         target_value = equity * config.POSITION_PCT
         qty = math.floor(target_value / entry_price)
-        if qty < 1: return
+        if qty < 1: return False
 
         self.last_trade_time[symbol] = datetime.datetime.now(pytz.timezone('US/Eastern'))
 
@@ -317,9 +362,8 @@ class MLTrader:
         take_profit_id = self.ib.client.getReqId()
         stop_loss_id = self.ib.client.getReqId()
 
-        self.order_labels[parent_id] = "Entry (Limit)"
-        self.order_labels[take_profit_id] = "Profit Target"
-        self.order_labels[stop_loss_id] = "Trailing Stop"
+        # Tracked before sending so status/fill events always find the bracket
+        self.book.register_bracket(symbol, qty, parent_id, take_profit_id, stop_loss_id)
 
         parent = Order(orderId=parent_id, action='BUY', totalQuantity=qty, orderType='LMT', lmtPrice=parent_limit_price, transmit=False, tif='DAY')
         take_profit = Order(orderId=take_profit_id, action='SELL', totalQuantity=qty, orderType='LMT', lmtPrice=lmt_price, parentId=parent_id, transmit=False, tif='DAY')
@@ -329,54 +373,182 @@ class MLTrader:
         self.ib.placeOrder(contract, take_profit)
         self.ib.placeOrder(contract, stop_loss)
             
-        self.positions[symbol] = True
         self.log(f"  [EXECUTE] ORDERS SENT: Parent #{parent_id} | Trail {trail_pct}%")
+        return True
 
     def check_circuit_breaker(self):
-        current_equity = self.get_account_equity()
+        current_equity = self.get_account_equity() # Cached; polls only when stale
         daily_pnl = current_equity - self.starting_equity
         if self.minutes_running % 10 == 0:
-            self.log(f"  [PnL CHECK] Day PnL: ${daily_pnl:,.2f}")
+            age = self.equity.age_seconds()
+            self.log(f"  [PnL CHECK] Day PnL: ${daily_pnl:,.2f} (equity {'n/a' if age is None else f'{age:.0f}s'} old)")
         if daily_pnl < self.daily_loss_limit:
             self.log(f"  [CRITICAL] CIRCUIT BREAKER HIT! PnL: ${daily_pnl:,.2f}")
             self.send_discord_embed(title="🛑 CIRCUIT BREAKER", description="Daily Loss Limit Hit.", color=0xe74c3c)
             self.generate_daily_summary()
+            self.alerts.close()
             sys.exit("Circuit Breaker Hit.")
 
-    def update_positions(self):
-        try:
-            current_positions = self.ib.positions()
-            self.positions = {}
-            for pos in current_positions:
-                if pos.position > 0: self.positions[pos.contract.symbol] = True
-        except: pass
-
     def load_models(self):
         self.log("--> Loading Brains...")
+        self.thresholds = portfolio.entry_thresholds(config.ACTIVE_TRADING_LIST) # Tuned per symbol, else ENTRY_THRESHOLD
         for symbol in config.ACTIVE_TRADING_LIST:
             model_path = config.MODELS_DIR / f"{symbol}_xgb.json"
             if model_path.exists():
-                bst = xgb.Booster()
-                bst.load_model(str(model_path))
-                self.models[symbol] = bst
-                self.log(f"  [+] Loaded Model: {symbol}")
+                # NumPy tree walker: ~5x less per-call overhead than xgboost for one row
+                self.models[symbol] = TreeEnsemble.load(model_path)
+                self.boosters[symbol] = xgb.Booster(model_file=str(model_path)) # Faster past a few dozen rows
+                self.log(f"  [+] Loaded Model: {symbol} (entry >= {self.thresholds[symbol]:.3f})")
 
-    def get_live_features(self, symbol):
+    def predict_batch(self, rows):
+        """
+        Scores the latest feature row of many symbols in one pass.
+        Rows are stacked into a contiguous float32 array and each distinct
+        model is called once via inplace_predict: the NumPy walker for up to
+        TREE_EVAL_MAX_ROWS rows, xgboost above that. Returns {symbol: prob}.
+        """
+        if not rows: return {}
+        symbols = list(rows)
+        X = np.empty((len(symbols), len(features.FEATURE_COLUMNS)), dtype=np.float32)
+        for i, sym in enumerate(symbols):
+            frame = rows[sym]
+            if list(frame.columns) != features.FEATURE_COLUMNS:
+                frame = frame[features.FEATURE_COLUMNS]
+            X[i] = frame.to_numpy()[-1]
+
+        # Group rows by model (symbols may share a booster)
+        groups = {}
+        for i, sym in enumerate(symbols):
+            groups.setdefault(id(self.models[sym]), (sym, []))[1].append(i)
+
+        probs = np.empty(len(symbols), dtype=np.float32)
+        for sym, idx in groups.values():
+            bst = self.models[sym] if len(idx) <= config.TREE_EVAL_MAX_ROWS else self.boosters[sym]
+            probs[idx] = bst.inplace_predict(X[idx])
+        return {sym: float(p) for sym, p in zip(symbols, probs)}
+
+    def fetch_live_features(self, symbols, closed_at=None):
+        """
+        Fetches every symbol's bars concurrently (at most LIVE_FETCH_CONCURRENCY
+        requests in flight, each with a LIVE_FETCH_DEADLINE). Scan time is
+        about the slowest request, not the sum. Returns
+        {symbol: (features, price)} and the symbols that missed the deadline
+        (skipped for this minute). With closed_at (a bar close), features
+        are for the last bar that closed by then; otherwise the forming bar
+        is peeked.
+        """
+        if not symbols: return {}, []
+        async def scan():
+            slots = asyncio.Semaphore(config.LIVE_FETCH_CONCURRENCY)
+            tasks = [self.get_live_features_async(sym, slots, closed_at) for sym in symbols]
+            return await asyncio.gather(*tasks, return_exceptions=True)
+        results = self.ib.run(scan())
+
+        out, late = {}, []
+        for sym, res in zip(symbols, results):
+            if isinstance(res, asyncio.TimeoutError): late.append(sym)
+            elif isinstance(res, Exception): out[sym] = (None, 0.0)
+            else: out[sym] = res
+        return out, late
+
+    def wait_for_feed(self, symbols, closed_at):
+        """
+        Gives the local feed up to FEED_WAIT_MS to close the bar ending at
+        closed_at for every symbol it can advance (subscribed, engine one bar
+        behind). 5-sec real-time bars usually land after the tick wakes, so
+        without this the historical request would almost always win.
+        """
+        prev = closed_at - datetime.timedelta(minutes=1)
+        def pending():
+            out = []
+            for sym in symbols:
+                engine = self.feature_engines.get(sym)
+                if sym not in self.feed.subscriptions or engine is None: continue
+                if engine.last_ts == prev - datetime.timedelta(minutes=1): out.append(sym) # Not closed yet
+            return out
+        deadline = time.monotonic() + config.FEED_WAIT_MS / 1000
+        while pending() and time.monotonic() < deadline:
+            self.ib.sleep(0.02) # Lets the real-time bar events in
+
+    def on_guard_bar(self, symbol, bar):
+        """Guard bar closed by the local feed. A skipped bar (gap, joined mid-bucket) would bend the EMA: reseed instead."""
+        last = self.guard.last_bar_time.get(symbol)
+        if last is not None and bar.date - last > datetime.timedelta(seconds=bar_seconds(config.GUARD_BAR_SIZE)):
+            self.guard.forget(symbol) # update_market_guard re-attaches it from history
+            return
+        self.guard.on_bar(symbol, bar.date, bar.close)
+
+    def on_live_bar(self, symbol, bar):
+        """1-min bar closed by the local feed: advances the symbol's features with no request."""
+        engine = self.feature_engines.get(symbol)
+        if engine is None or engine.last_ts is None: return # Seeded by the first historical fetch
+        if bar.date - engine.last_ts != datetime.timedelta(minutes=1): return # Gap / already committed: fetch path handles it
+        row = engine.update(bar.date, bar._asdict())
+        if row is not None:
+            self.live_rows[symbol] = (engine.to_frame(bar.date, row), bar.close)
+
+    async def get_live_features_async(self, symbol, slots, closed_at=None):
+        if closed_at is not None:
+            live = self.live_rows.get(symbol)
+            if live is not None and live[0].index[-1] == closed_at - datetime.timedelta(minutes=1):
+                return live # Built locally from real-time bars
         contract = Stock(symbol, 'SMART', 'USD')
-        try:
-            bars = self.ib.reqHistoricalData(contract, endDateTime='', durationStr='2 D', barSizeSetting='1 min', whatToShow='TRADES', useRTH=True, timeout=10)
-            if not bars: return None, 0.0
+        deadline = config.LIVE_FETCH_DEADLINE
+        for _ in range(2): # Second pass only when a gap forces a reseed
+            engine = self.feature_engines.get(symbol)
+            # Full 2-day pull only to seed; afterwards just the last few bars
+            duration = '2 D' if engine is None else '300 S'
+            async with slots:
+                # At its timeout ib_insync cancels the request and returns an empty
+                # list (no exception), so an empty answer after the deadline = late.
+                # wait_for is only a backstop.
+                started = time.monotonic()
+                bars = await asyncio.wait_for(self.ib.reqHistoricalDataAsync(
+                    contract, endDateTime='', durationStr=duration, barSizeSetting='1 min',
+                    whatToShow='TRADES', useRTH=True, timeout=deadline), deadline + 1)
+            if not bars:
+                if time.monotonic() - started >= deadline: raise asyncio.TimeoutError()
+                return None, 0.0
             df = util.df(bars)
             df.columns = df.columns.str.lower()
-            current_price = df['close'].iloc[-1]
             df['date'] = pd.to_datetime(df['date'])
             df.set_index('date', inplace=True)
-            df_features = features.add_technical_features(df)
-            latest_row = df_features.iloc[[-1]].copy()
-            expected_cols = ['average', 'vwap', 'feat_dist_vwap', 'log_ret', 'feat_vol_15m', 'feat_vol_impact', 'feat_rsi_14', 'feat_spread_proxy']
-            if any(c not in latest_row.columns for c in expected_cols): return None, 0.0
-            return latest_row[expected_cols], current_price
-        except: return None, 0.0
+
+            # Gap since the last committed bar -> state is stale, reseed
+            if engine is not None and (engine.last_ts is None or df.index[0] > engine.last_ts):
+                self.feature_engines.pop(symbol, None)
+                continue
+
+            if closed_at is not None:
+                # Bars are stamped with their open: the one at closed_at has only just started
+                cutoff = closed_at if df.index.tz is not None else closed_at.replace(tzinfo=None)
+                df = df[df.index < cutoff]
+                if df.empty: return None, 0.0
+
+            # Commit completed bars; the last one is committed if closed, else peeked
+            completed, live_ts = df.iloc[:-1], df.index[-1]
+            if engine is None:
+                engine = features.StreamingFeatures().seed(completed)
+                self.feature_engines[symbol] = engine
+            else:
+                engine.seed(completed[completed.index > engine.last_ts])
+
+            if closed_at is None:
+                row = engine.peek(live_ts, df.iloc[-1])
+            elif engine.last_ts is None or live_ts > engine.last_ts:
+                row = engine.update(live_ts, df.iloc[-1])
+            else:
+                # The feed committed this bar while the request was in flight
+                live = self.live_rows.get(symbol)
+                if live is not None and live[0].index[-1] == live_ts: return live
+                row = None # Closed bar not published yet
+            if row is None: return None, 0.0
+            return engine.to_frame(live_ts, row), float(df['close'].iloc[-1]) # Priced off the scored bar
+        return None, 0.0
+
+    def get_live_features(self, symbol):
+        data, _ = self.fetch_live_features([symbol])
+        return data.get(symbol, (None, 0.0))
 
     def generate_daily_summary(self):
         if self.summary_generated: return
@@ -467,11 +639,10 @@ class MLTrader:
             self.log(f"  [!] Report Generation Failed: {e}")
 
     def send_discord_embed(self, title, description, color, fields=None):
-        if not config.DISCORD_WEBHOOK_URL: return
+        # Non-blocking: the dispatcher thread does the HTTP work
         embed = {"title": title, "description": description, "color": color, "timestamp": datetime.datetime.utcnow().isoformat(), "footer": {"text": "ML Trader | Quant V2"}}
         if fields: embed["fields"] = fields
-        try: requests.post(config.DISCORD_WEBHOOK_URL, json={"embeds": [embed]})
-        except: pass
+        self.alerts.send(embed)
 
     def log_trade_to_csv(self, symbol, action, qty, entry, target, stop, confidence, equity):
         file_exists = self.log_file.exists()
@@ -483,11 +654,21 @@ class MLTrader:
         except Exception: pass
 
     def get_account_equity(self):
+        """
+        Equity from the event-fed tracker. Only when it has no value or it is
+        older than EQUITY_MAX_STALENESS_SEC is accountSummary polled (and the
+        result fed back into the tracker).
+        """
+        equity = self.equity.equity()
+        if equity is not None and not self.equity.is_stale():
+            return equity
         try:
             summary = self.ib.accountSummary(self.account_id)
             net_liq = next((v.value for v in summary if v.tag == 'NetLiquidation'), None)
-            return float(net_liq) if net_liq else config.FALLBACK_EQUITY
-        except: return config.FALLBACK_EQUITY
+            if not net_liq: return equity if equity is not None else config.FALLBACK_EQUITY
+            self.equity.on_net_liq(float(net_liq))
+            return float(net_liq)
+        except: return equity if equity is not None else config.FALLBACK_EQUITY
 
 if __name__ == "__main__":
     bot = MLTrader()
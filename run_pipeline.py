@@ -1,52 +1,133 @@
 # code red/run_pipeline.py
 import pandas as pd
 from src import config
+from src.data import store
+from src.data.cache import StageCache, code_version, make_key
 from src.strategy import features, labeling
 
-def run_full_pipeline(symbol):
+# Days of history fed ahead of each day so rolling windows / RSI are warm
+FEATURE_WARMUP_DAYS = 2
+FEATURE_VERSION = code_version(features.add_technical_features)
+LABEL_VERSION = code_version(labeling.get_triple_barrier_labels)
+
+def _runs(days):
+    """Splits a sorted list of day indices into contiguous runs."""
+    runs = []
+    for i in days:
+        if runs and i == runs[-1][-1] + 1:
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+    return runs
+
+def _by_day(df):
+    return {day: chunk for day, chunk in df.groupby(df.index.strftime('%Y-%m-%d'))}
+
+def build_features(symbol, days, fingerprints, cache):
+    """
+    Per-day feature stage. Day D's features depend on the raw partitions of
+    D and the FEATURE_WARMUP_DAYS before it, so only days whose key changed
+    are recomputed. Each day is computed on exactly that window (warm-up
+    days prepended, then sliced away): EWM state never carries over from
+    further back, so a day's output is the same whichever neighbours were
+    already cached.
+    """
+    keys = [
+        make_key('features', symbol, FEATURE_VERSION, FEATURE_WARMUP_DAYS,
+                 [fingerprints[d] for d in days[max(0, i - FEATURE_WARMUP_DAYS):i + 1]])
+        for i in range(len(days))
+    ]
+    out = {}
+    missing = []
+    for i, day in enumerate(days):
+        cached = cache.get('features', keys[i])
+        if cached is None:
+            missing.append(i)
+        else:
+            out[day] = cached
+
+    for run in _runs(missing):
+        first = days[max(0, run[0] - FEATURE_WARMUP_DAYS)]
+        bars = store.read_bars(symbol, start=first, end=pd.Timestamp(days[run[-1]]) + pd.Timedelta(days=1))
+        bar_days = bars.index.strftime('%Y-%m-%d')
+        for i in run:
+            window = bars[(bar_days >= days[max(0, i - FEATURE_WARMUP_DAYS)]) & (bar_days <= days[i])]
+            day_df = _by_day(features.add_technical_features(window)).get(days[i], bars.iloc[:0])
+            out[days[i]] = cache.put('features', keys[i], day_df, day=days[i])
+
+    return [out[d] for d in days], keys, len(missing)
+
+def build_labels(symbol, days, feature_frames, feature_keys, cache, risk_params, vertical_barrier_bars):
+    """
+    Per-day label stage. Barriers of late-day events reach into the next
+    session, so day D's labels depend on the features of D and D+1 (or on D
+    being the last day).
+    """
+    out = []
+    recomputed = 0
+    for i, day in enumerate(days):
+        next_key = feature_keys[i + 1] if i + 1 < len(days) else 'END'
+        key = make_key('labels', symbol, LABEL_VERSION, risk_params, vertical_barrier_bars, feature_keys[i], next_key)
+        cached = cache.get('labels', key)
+        if cached is not None:
+            out.append(cached)
+            continue
+
+        window = pd.concat(feature_frames[i:i + 2])
+        df_day = feature_frames[i]
+        if not df_day.empty:
+            df_labels = labeling.get_triple_barrier_labels(
+                prices=window['close'],
+                events=df_day.index,
+                sl_tp_limits=risk_params,
+                vertical_barrier_bars=vertical_barrier_bars
+            )
+            df_day = df_day.join(df_labels[['bin', 'ret', 'exit_time']], how='inner')
+        out.append(cache.put('labels', key, df_day, day=day))
+        recomputed += 1
+    return out, recomputed
+
+def run_full_pipeline(symbol, risk_params=(0.005, 0.010), vertical_barrier_bars=12):
     print(f"--> Starting Pipeline for {symbol}...")
 
-    # --- 1. Load Data ---
-    raw_path_parquet = config.DATA_RAW / f"{symbol}_1min.parquet"
-    processed_path = config.DATA_PROCESSED / f"{symbol}_1min.parquet"
-    
-    if processed_path.exists():
-        df = pd.read_parquet(processed_path)
-    elif raw_path_parquet.exists():
-        df = pd.read_parquet(raw_path_parquet)
-        df.columns = df.columns.str.lower()
-    else:
+    # --- 1. Load Data (partition fingerprints only; bars read on demand) ---
+    store.import_legacy_file(symbol)
+    fingerprints = store.day_fingerprints(symbol)
+    days = sorted(fingerprints)
+    if not days:
         print(f"  [SKIP] No data found for {symbol}")
         return
 
+    cache = StageCache(symbol)
+    risk_params = list(risk_params) # Risk: 1.0% Profit, 0.5% Stop
+
     # --- 2. Features ---
     try:
-        df_features = features.add_technical_features(df)
+        feature_frames, feature_keys, n_feat = build_features(symbol, days, fingerprints, cache)
     except Exception as e:
         print(f"  [!] Features failed for {symbol}: {e}")
         return
 
     # --- 3. Labels ---
-    # Risk: 1.0% Profit, 0.5% Stop
-    risk_params = [0.005, 0.010] 
     try:
-        df_labels = labeling.get_triple_barrier_labels(
-            prices=df_features['close'],
-            events=df_features.index,
-            sl_tp_limits=risk_params,
-            vertical_barrier_bars=12
-        )
+        labeled, n_lab = build_labels(symbol, days, feature_frames, feature_keys, cache,
+                                      risk_params, vertical_barrier_bars)
     except Exception as e:
         print(f"  [!] Labeling failed for {symbol}: {e}")
         return
+    finally:
+        cache.save()
+        cache.evict()
 
     # --- 4. Save ---
-    df_final = df_features.join(df_labels[['bin', 'ret', 'exit_time']], how='inner')
+    df_final = pd.concat([df for df in labeled if not df.empty])
     save_path = config.DATA_PROCESSED / f"{symbol}_labeled.parquet"
-    df_final.to_parquet(save_path)
+    df_final.to_parquet(save_path, row_group_size=config.TRAIN_BATCH_ROWS) # Streamable by --stream training
+    print(f"  [CACHE] {symbol}: recomputed {n_feat}/{len(days)} feature days, {n_lab}/{len(days)} label days")
     print(f"  [SUCCESS] {symbol} Ready. Rows: {len(df_final)}")
+    return len(df_final)
 
 if __name__ == "__main__":
     # Loop through the entire universe defined in config.py
     for sym in config.TARGET_SYMBOLS:
-        run_full_pipeline(sym)
\ No newline at end of file
+        run_full_pipeline(sym)
@@ -0,0 +1,110 @@
+# quant_v2/src/account.py
+import datetime
+import math
+from src import config
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+class EquityTracker:
+    """
+    In-memory account equity fed by IB events, so risk checks and sizing
+    never wait on the broker.
+
+    NetLiquidation comes from the account-updates stream (accountValueEvent,
+    pushed by IB every few minutes) and daily / unrealized / realized P&L
+    from a reqPnL subscription (pnlEvent, about once a second). Between
+    NetLiquidation pushes, equity() carries the last value forward by the
+    daily P&L change since it arrived. age_seconds() / is_stale() say how
+    old that estimate is; callers poll the broker only when it is stale.
+    """
+    def __init__(self, max_staleness=None):
+        self.max_staleness = config.EQUITY_MAX_STALENESS_SEC if max_staleness is None else max_staleness
+        self.ib = None
+        self.account = None
+        self.reset()
+
+    def reset(self):
+        """Drops all cached values (e.g. after a reconnect)."""
+        self.net_liq = None
+        self.net_liq_time = None
+        self.daily_pnl = None
+        self.unrealized_pnl = None
+        self.realized_pnl = None
+        self.pnl_time = None
+        self.pnl_at_net_liq = None  # daily_pnl when net_liq arrived
+        self.pnl_sub = None
+
+    # --- State updates ---
+    def on_net_liq(self, value, when=None):
+        self.net_liq = float(value)
+        self.net_liq_time = when or _now()
+        self.pnl_at_net_liq = self.daily_pnl
+
+    def on_account_value(self, value):
+        if value.tag != 'NetLiquidation' or (self.account and value.account != self.account):
+            return
+        try:
+            self.on_net_liq(float(value.value))
+        except ValueError:
+            pass
+
+    def on_pnl(self, pnl):
+        if self.account and pnl.account != self.account:
+            return
+        if pnl.dailyPnL is None or math.isnan(pnl.dailyPnL):
+            return  # IB sends NaN until the first computation
+        self.daily_pnl = pnl.dailyPnL
+        self.unrealized_pnl = pnl.unrealizedPnL
+        self.realized_pnl = pnl.realizedPnL
+        self.pnl_time = _now()
+        if self.pnl_at_net_liq is None and self.net_liq is not None:
+            self.pnl_at_net_liq = self.daily_pnl
+
+    # --- IB subscription ---
+    def attach(self, ib, account):
+        """
+        Hooks the account-value / P&L events (once per IB instance), seeds
+        NetLiquidation from ib_insync's local account cache and starts a
+        P&L subscription for the account.
+        """
+        if self.ib is not ib:
+            ib.accountValueEvent += self.on_account_value
+            ib.pnlEvent += self.on_pnl
+            self.ib = ib
+        self.account = account
+
+        for value in ib.accountValues(account):  # Local cache, no request
+            self.on_account_value(value)
+        if self.pnl_sub is None:
+            self.pnl_sub = ib.reqPnL(account)
+
+    def detach(self):
+        if self.ib is not None:
+            self.ib.accountValueEvent -= self.on_account_value
+            self.ib.pnlEvent -= self.on_pnl
+            if self.pnl_sub is not None:
+                try: self.ib.cancelPnL(self.account)
+                except Exception: pass
+        self.ib = None
+        self.reset()
+
+    # --- Read side (hot path, no I/O) ---
+    def equity(self):
+        """Latest NetLiquidation, carried forward by daily P&L since. None if unknown."""
+        if self.net_liq is None:
+            return None
+        if self.daily_pnl is None or self.pnl_at_net_liq is None:
+            return self.net_liq
+        return self.net_liq + (self.daily_pnl - self.pnl_at_net_liq)
+
+    def age_seconds(self, now=None):
+        """Age of the equity estimate (newest of NetLiquidation / P&L update)."""
+        if self.net_liq_time is None:
+            return None
+        latest = max(t for t in (self.net_liq_time, self.pnl_time) if t is not None)
+        return ((now or _now()) - latest).total_seconds()
+
+    def is_stale(self, now=None):
+        age = self.age_seconds(now)
+        return age is None or age > self.max_staleness
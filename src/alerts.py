@@ -0,0 +1,189 @@
+# quant_v2/src/alerts.py
+import json
+import queue
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from src import config
+
+DISCORD_MAX_EMBEDS = 10  # Discord limit per webhook message
+
+class AlertDispatcher:
+    """
+    Background Discord webhook sender.
+    send() only enqueues (never blocks the trading thread). A worker thread
+    coalesces bursts into multi-embed messages over one pooled HTTP session,
+    honours 429 retry_after / rate-limit headers, and replaces overflowing
+    alerts with a single "N alerts dropped" notice.
+    """
+    def __init__(self, url=None, maxsize=None, batch_window=None, max_retries=None, timeout=5.0):
+        self.url = url if url is not None else config.DISCORD_WEBHOOK_URL
+        self.batch_window = config.ALERT_BATCH_WINDOW if batch_window is None else batch_window
+        self.max_retries = config.ALERT_MAX_RETRIES if max_retries is None else max_retries
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize or config.ALERT_QUEUE_SIZE)
+
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+        self.dropped = 0        # Overflowed since the last drop notice
+        self.sent = 0           # Embeds delivered
+        self.failed = 0         # Embeds given up on
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        if self.url:
+            self._thread.start()
+
+    def send(self, embed):
+        """Enqueue an embed. Returns False if it was dropped (queue full)."""
+        if not self.url:
+            return False
+        try:
+            self.queue.put_nowait(embed)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def flush(self, timeout=5.0):
+        """Best-effort wait for the queue to drain (e.g. before shutdown)."""
+        deadline = time.monotonic() + timeout
+        while self._thread.is_alive() and (self.queue.unfinished_tasks or self.dropped) and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def close(self, timeout=5.0):
+        self.flush(timeout)
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+        self.session.close()
+
+    # --- Worker thread ---
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self.queue.get(timeout=0.2)
+            except queue.Empty:
+                first = None
+            batch = [] if first is None else [first]
+
+            # Reserve a slot for the drop notice if anything overflowed
+            with self._lock:
+                dropped, self.dropped = self.dropped, 0
+            capacity = DISCORD_MAX_EMBEDS - (1 if dropped else 0)
+
+            # Coalesce whatever else arrives within the batch window
+            deadline = time.monotonic() + self.batch_window
+            while batch and len(batch) < capacity:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            embeds = batch + ([self._drop_notice(dropped)] if dropped else [])
+            if embeds:
+                try:
+                    ok = self._post(embeds)
+                except Exception as e:
+                    # Bad header, unencodable embed...: lose this batch, never the worker
+                    print(f"  [!] Alert batch failed: {e!r}")
+                    ok = False
+                if ok: self.sent += len(embeds)
+                else: self.failed += len(embeds)
+            for _ in batch:
+                self.queue.task_done()
+
+    def _post(self, embeds):
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                resp = self.session.post(self.url, json={"embeds": embeds}, timeout=self.timeout)
+            except requests.RequestException:
+                resp = None
+
+            if resp is not None and resp.status_code == 429:
+                # Rate limited: wait exactly as long as asked, does not count as a failure
+                time.sleep(self._retry_after(resp))
+                continue
+            if resp is not None and resp.status_code < 300:
+                if resp.headers.get("X-RateLimit-Remaining") == "0":
+                    time.sleep(self._seconds(resp.headers.get("X-RateLimit-Reset-After")))
+                return True
+
+            attempt += 1
+            if attempt > self.max_retries or (resp is not None and 400 <= resp.status_code < 500):
+                return False
+            time.sleep(0.5 * 2 ** (attempt - 1))
+        return False
+
+    @staticmethod
+    def _seconds(value, default=1.0):
+        """Header/body wait time -> seconds (garbage -> default)."""
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            return default
+
+    @classmethod
+    def _retry_after(cls, resp):
+        try:
+            return cls._seconds(resp.json().get("retry_after"))
+        except (ValueError, AttributeError):
+            return cls._seconds(resp.headers.get("Retry-After"))
+
+    @staticmethod
+    def _drop_notice(count):
+        return {
+            "title": "⚠️ ALERTS DROPPED",
+            "description": f"{count} alert(s) dropped: queue full (webhook too slow).",
+            "color": 0xe67e22,
+        }
+
+if __name__ == "__main__":
+    # Offline demo against a local webhook stand-in (slow + rate limited)
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    received = []
+
+    class FakeWebhook(BaseHTTPRequestHandler):
+        calls = 0
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            FakeWebhook.calls += 1
+            time.sleep(0.2)  # Slow webhook
+            if FakeWebhook.calls % 4 == 0:
+                self.send_response(429)
+                payload = json.dumps({"retry_after": 0.3}).encode()
+            else:
+                received.append(body["embeds"])
+                self.send_response(204)
+                payload = b""
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeWebhook)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    alerts = AlertDispatcher(url=f"http://127.0.0.1:{server.server_port}/webhook", maxsize=50, batch_window=0.1)
+    t0 = time.perf_counter()
+    for i in range(120):
+        alerts.send({"title": f"Alert {i}", "description": "burst", "color": 0x3498db})
+    enqueue_ms = (time.perf_counter() - t0) * 1e3
+    alerts.close(timeout=30)
+    server.shutdown()
+
+    print(f"--> Enqueued 120 alerts in {enqueue_ms:.2f} ms (trading thread never blocked)")
+    print(f"  Webhook calls: {FakeWebhook.calls} | Messages: {len(received)} | Embeds delivered: {sum(map(len, received))}")
+    print(f"  Sent: {alerts.sent} | Failed: {alerts.failed}")
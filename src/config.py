@@ -7,6 +7,10 @@ PROJECT_ROOT = Path(__file__).parent.parent
 DATA_RAW = PROJECT_ROOT / "data" / "raw"
 DATA_PROCESSED = PROJECT_ROOT / "data" / "processed"
 LOGS_DIR = PROJECT_ROOT / "logs"
+BAR_STORE = DATA_RAW / "bars"   # Partitioned 1-min bars (symbol=/day=)
+STAGE_CACHE = DATA_PROCESSED / "cache"  # Memoized pipeline stages
+STAGE_CACHE_MAX_BYTES = 2 * 1024 ** 3   # LRU eviction above this size
+PRED_CACHE = DATA_PROCESSED / "predictions"  # Model probabilities (Arrow IPC, mmap)
 
 # Ensure directories exist
 os.makedirs(DATA_RAW, exist_ok=True)
@@ -50,4 +54,69 @@ TRAILING_STOP_PCT = 0.8 # 0.4% trailing stop
 PROFIT_TARGET_PCT = 0.05 # 5% profit target
 DISCORD_WEBHOOK_URL = "https://discord.com/api/webhooks/1449887948521734276/xfDVr5-EGqqfv4nHTzMSHN4RhCIwgBMHYviXfG_oy0sBMagatn4bNUYtuBN9N_4hvCJG"  # Optional: For trade alerts
 TRADING_START_HOUR = 10
-TRADING_END_HOUR = 16
\ No newline at end of file
+TRADING_END_HOUR = 16
+
+# --- HISTORICAL DOWNLOAD (IBKR pacing) ---
+HIST_MAX_IN_FLIGHT = 6       # Concurrent reqHistoricalData requests
+HIST_PACING_REQUESTS = 60    # IBKR limit: max requests ...
+HIST_PACING_WINDOW = 600     # ... per rolling window (seconds)
+HIST_PACING_BURST = 10       # Token bucket capacity (burst size)
+HIST_TIMEOUT = 120           # Per-request timeout (seconds)
+HIST_MAX_RETRIES = 3         # Retries per failed chunk
+HIST_RETRY_BACKOFF = 2.0     # Base backoff (seconds), doubled each retry
+
+# --- BACKFILL (multi-year history) ---
+BACKFILL_YEARS = 2           # Default history length for --task backfill
+BACKFILL_WINDOW_DAYS = 30    # Calendar days per request (1-min ceiling)
+BACKFILL_WORKERS = 4         # Parallel download workers
+
+# --- ORDERS & ACCOUNT ---
+ORDER_REGISTRY_SIZE = 500    # Finished orders remembered (for late fill labels)
+EQUITY_MAX_STALENESS_SEC = 240  # Cached equity older than this -> poll accountSummary (IB pushes ~every 3 min)
+
+# --- ALERTS (Discord) ---
+ALERT_QUEUE_SIZE = 200       # Pending alerts before new ones are dropped
+ALERT_BATCH_WINDOW = 0.5     # Seconds to coalesce a burst into one message
+ALERT_MAX_RETRIES = 3        # Per message (429s are retried separately)
+
+# --- MARKET GUARD ---
+GUARD_SYMBOLS = ['SPY', 'XLK']                 # All must be above their EMA
+GUARD_EMA_SPANS = {'SPY': 20, 'XLK': 20}       # EMA span per guard symbol
+GUARD_BAR_SIZE = '5 mins'
+GUARD_SEED_DURATION = '7200 S'                 # History used to seed the EMA
+GUARD_MAX_STALENESS_MIN = 15                   # Older guard state = unsafe
+
+# --- LIVE LOOP ---
+LIVE_FETCH_CONCURRENCY = 8   # Per-minute bar requests in flight at once
+LIVE_FETCH_DEADLINE = 8      # Seconds; a symbol whose bars miss this is skipped this minute
+LIVE_TICK_OFFSET_MS = 250    # Wake this long after each 1-min bar close (ET)
+LIVE_TICK_BUDGET_MS = 10000  # Bar close -> orders sent; longer ticks are logged as overruns
+LIVE_TICK_MAX_LAG_MS = 5000  # A bar close missed by more than this is skipped, not run late
+LIVE_TICK_HISTORY = 390      # Ticks kept for latency stats (one session of 1-min bars)
+TREE_EVAL_MAX_ROWS = 32      # Rows per model scored by the NumPy tree walker; bigger batches go to xgboost
+
+# --- REAL-TIME BARS (live feed) ---
+LIVE_BARS = 'realtime'       # 'realtime' = 5-sec bars aggregated locally, 'historical' = reqHistoricalData every tick
+FEED_BAR_SIZES = [60, 300]   # Bar sizes (seconds) built from 5-sec real-time bars
+FEED_HISTORY_BARS = 400      # Closed bars kept per symbol and size
+FEED_WAIT_MS = 2000          # How long a tick waits for the feed to close the bar before requesting history
+
+# --- TRAINING (walk-forward validation) ---
+WF_FOLDS = 5                 # Walk-forward folds inside the training span
+WF_MODE = 'expanding'        # 'expanding' or 'rolling'
+WF_TRAIN_BLOCKS = 2          # Blocks per training window when rolling
+WF_EMBARGO_MIN = 60          # Gap between a training label's exit and the test block
+WF_INNER_VAL_FRAC = 0.2      # Newest part of each fold's training span used to pick boosting rounds
+HOLDOUT_FRAC = 0.2           # Last 20% stays untouched for backtest/optimize
+
+# --- OUT-OF-CORE TRAINING (--stream) ---
+TRAIN_BATCH_ROWS = 65536     # Rows per parquet batch fed to XGBoost (row group size too)
+TRAIN_MEMORY = 'external'    # 'external' = pages spilled to disk, 'quantile' = in-RAM QuantileDMatrix
+XGB_CACHE = DATA_PROCESSED / "xgb_cache"  # External-memory page cache
+
+# --- NIGHTLY REFRESH (--task refresh) ---
+REFRESH_ROUNDS = 20          # Trees added per refresh (boosting continuation)
+REFRESH_MAX_TREES = 400      # Above this, refit leaf values instead of adding trees
+REFRESH_HOLDOUT_DAYS = 1     # Newest unseen days used to compare current vs refreshed
+REFRESH_MIN_HOLDOUT_ROWS = 200  # Widen the holdout (by days) up to at least this
+REFRESH_LOOKBACK_DAYS = 10   # Cap on unseen days fed to one refresh
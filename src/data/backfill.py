@@ -0,0 +1,141 @@
+# quant_v2/src/data/backfill.py
+import asyncio
+import json
+from itertools import zip_longest
+import pandas as pd
+from ib_insync import *
+from src import config
+from src.data import ingest, store
+
+WINDOW_ANCHOR = pd.Timestamp('2000-01-03')  # Fixed calendar grid, so windows don't move with `end`
+
+def plan_windows(start, end, days=None):
+    """
+    Splits [start, end] into IBKR-legal request windows, newest first.
+    Windows sit on a fixed grid of `days`-day blocks (only the first and
+    last are clipped to start / end), so the same dates map to the same
+    windows whatever day the backfill runs.
+    Returns (window_start, window_end, durationStr) tuples (dates, inclusive).
+    """
+    days = days or config.BACKFILL_WINDOW_DAYS
+    start = pd.Timestamp(start).normalize()
+    end = pd.Timestamp(end).normalize()
+
+    windows = []
+    block = (end - WINDOW_ANCHOR).days // days
+    while True:
+        block_start = WINDOW_ANCHOR + pd.Timedelta(days=block * days)
+        w_start = max(start, block_start)
+        w_end = min(end, block_start + pd.Timedelta(days=days - 1))
+        if w_end < start:
+            break
+        windows.append((w_start, w_end, f"{(w_end - w_start).days + 1} D"))
+        block -= 1
+    return windows
+
+def window_key(window):
+    return f"{window[0]:%Y%m%d}-{window[1]:%Y%m%d}"
+
+def is_done(window, done):
+    """True if a checkpointed window covers this one (clipped edge windows included)."""
+    key = window_key(window)
+    lo, hi = key.split('-')
+    return key in done or any(d.split('-')[0] <= lo and hi <= d.split('-')[1] for d in done)
+
+# --- Checkpoints (one JSON per symbol, ignored by the parquet dataset) ---
+def _checkpoint_path(symbol):
+    return config.BAR_STORE / "_backfill" / f"{symbol}.json"
+
+def load_checkpoint(symbol):
+    path = _checkpoint_path(symbol)
+    if not path.exists():
+        return set()
+    return set(json.loads(path.read_text()).get('done', []))
+
+def save_checkpoint(symbol, done):
+    path = _checkpoint_path(symbol)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps({'done': sorted(done)}))
+    tmp.replace(path)  # Atomic: never leaves a half-written checkpoint
+
+def gap_report(symbol, start, end):
+    """
+    Compares the stored history with the business-day calendar.
+    Missing days include exchange holidays; short days are RTH sessions
+    with fewer than 390 bars (early closes show up here too).
+    """
+    stored = set(store.stored_days(symbol))
+    expected = pd.bdate_range(start, end).strftime('%Y-%m-%d')
+    missing = [d for d in expected if d not in stored]
+
+    bars = store.read_bars(symbol, start, pd.Timestamp(end) + pd.Timedelta(days=1), columns=['close'])
+    per_day = bars.groupby(bars.index.strftime('%Y-%m-%d')).size()
+    short = per_day[per_day < 390].to_dict() if config.USE_RTH else {}
+
+    print(f"  [GAPS] {symbol}: {len(per_day)} days stored, {len(missing)} missing, {len(short)} short")
+    if missing:
+        print(f"    Missing: {', '.join(missing[:10])}{' ...' if len(missing) > 10 else ''}")
+    return {'days': len(per_day), 'missing_days': missing, 'short_days': short}
+
+async def backfill_async(symbols=None, start=None, end=None, ib=None, pacer=None, workers=None):
+    """
+    Downloads [start, end] for every symbol in windows with a bounded worker
+    pool. Each finished window is appended to the bar store and checkpointed,
+    so an interrupted run resumes with only the windows still missing.
+    """
+    symbols = symbols or config.ALL_SYMBOLS
+    end = pd.Timestamp(end or pd.Timestamp.now(tz='US/Eastern').tz_localize(None)).normalize()
+    start = pd.Timestamp(start or end - pd.DateOffset(years=config.BACKFILL_YEARS)).normalize()
+    workers = workers or config.BACKFILL_WORKERS
+    ib = ib or IB()
+    pacer = pacer or ingest.TokenBucket.for_ibkr()
+    slots = asyncio.Semaphore(workers)
+
+    done = {sym: load_checkpoint(sym) for sym in symbols}
+    todo = {sym: [w for w in plan_windows(start, end) if not is_done(w, done[sym])] for sym in symbols}
+    today = pd.Timestamp.now(tz='US/Eastern').tz_localize(None).normalize()
+    print(f"--> Backfill {start:%Y-%m-%d} -> {end:%Y-%m-%d}: "
+          f"{sum(map(len, todo.values()))} windows to fetch ({sum(map(len, done.values()))} checkpointed)")
+
+    # Interleave symbols so consecutive requests hit different contracts
+    queue = asyncio.Queue()
+    for batch in zip_longest(*todo.values()):
+        for sym, window in zip(todo, batch):
+            if window is not None:
+                queue.put_nowait((sym, window))
+
+    failed = []
+
+    async def worker():
+        while not queue.empty():
+            sym, window = queue.get_nowait()
+            end_dt = f"{window[1]:%Y%m%d} 23:59:59 US/Eastern"
+            bars = await ingest.request_bars(ib, Stock(sym, 'SMART', 'USD'), end_dt, window[2], pacer, slots)
+            if not bars:
+                failed.append((sym, window_key(window)))
+                continue
+            added = store.write_bars(sym, ingest.bars_to_frame(bars))
+            if window[1] < today: # The current session is still filling in: fetch it again next run
+                done[sym].add(window_key(window))
+                save_checkpoint(sym, done[sym])
+            print(f"  [+] {sym} {window_key(window)}: {added} new rows")
+
+    try:
+        await ib.connectAsync(config.IB_HOST, config.IB_PORT, clientId=config.CLIENT_ID)
+        await asyncio.gather(*(worker() for _ in range(workers)))
+    except Exception as e:
+        print(f"  [!] Backfill Error: {e}")
+    finally:
+        if ib.isConnected():
+            ib.disconnect()
+
+    if failed:
+        print(f"  [!] {len(failed)} windows failed (re-run to resume): {failed[:5]}")
+    return {sym: gap_report(sym, start, end) for sym in symbols}
+
+def backfill(symbols=None, start=None, end=None, ib=None):
+    return util.run(backfill_async(symbols, start, end, ib))
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,158 @@
+# quant_v2/src/data/cache.py
+import hashlib
+import inspect
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from src import config
+
+def make_key(*parts):
+    """Content address for a stage: hash of everything its output depends on."""
+    blob = json.dumps(parts, sort_keys=True, default=str).encode()
+    return hashlib.sha256(blob).hexdigest()[:32]
+
+def code_version(*funcs):
+    """Hash of the functions' source, so editing stage code invalidates its cache."""
+    return hashlib.sha256("".join(inspect.getsource(f) for f in funcs).encode()).hexdigest()[:16]
+
+class StageCache:
+    """
+    Content-addressed store for pipeline stage outputs.
+
+    Artifacts are parquet files under data/processed/cache/<namespace>/,
+    named <stage>-<key>. Each namespace (one per symbol) keeps a
+    manifest.json describing its entries. File mtime is the LRU clock: a hit
+    touches the file, and evict() drops the least recently used artifacts
+    across all namespaces until the cache fits max_bytes. Namespaces keep
+    pool workers (one symbol each) from writing the same manifest.
+    """
+    def __init__(self, namespace, root=None, max_bytes=None):
+        self.root = root or config.STAGE_CACHE
+        self.dir = self.root / namespace
+        self.max_bytes = config.STAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.manifest_path = self.dir / "manifest.json"
+        self.manifest = json.loads(self.manifest_path.read_text()) if self.manifest_path.exists() else {}
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, stage, key):
+        return self.dir / f"{stage}-{key}.parquet"
+
+    def get(self, stage, key):
+        path = self._path(stage, key)
+        try:
+            df = pd.read_parquet(path)
+        except (FileNotFoundError, OSError):
+            self.misses += 1
+            return None
+        os.utime(path)  # LRU touch
+        self.hits += 1
+        return df
+
+    def put(self, stage, key, df, **meta):
+        path = self._path(stage, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        df.to_parquet(tmp)
+        tmp.replace(path)
+        self.manifest[path.name] = {'stage': stage, 'key': key, 'bytes': path.stat().st_size,
+                                    'created': time.time(), **meta}
+        return df
+
+    def save(self):
+        """Writes the manifest (dropping entries whose artifact was evicted)."""
+        self.manifest = {name: m for name, m in self.manifest.items() if (self.dir / name).exists()}
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.manifest, indent=1, default=str))
+        tmp.replace(self.manifest_path)
+
+    def evict(self):
+        """LRU eviction over the whole cache root. Returns bytes freed."""
+        files = []
+        for path in self.root.glob("*/*.parquet"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        freed = 0
+        for _, size, path in sorted(files):
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                freed += size
+            except FileNotFoundError:
+                pass
+        return freed
+
+def file_digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def frame_digest(df):
+    """Hash of a frame's values, index and column names (not its file bytes)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps(list(map(str, df.columns))).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+class PredictionCache:
+    """
+    Model probabilities per symbol, keyed by (model file, feature frame).
+
+    Stored as uncompressed Arrow IPC files (data/processed/predictions/
+    <SYM>-<key>.arrow) so a hit is a memory map, not a decode. Only one entry
+    per symbol is kept: writing a new one, or invalidate() after a retrain,
+    removes the symbol's other entries.
+    """
+    def __init__(self, root=None):
+        self.root = root or config.PRED_CACHE
+
+    @staticmethod
+    def key(model_path, features_df):
+        return f"{file_digest(model_path)[:16]}-{frame_digest(features_df)[:16]}"
+
+    def _path(self, symbol, key):
+        return self.root / f"{symbol}-{key}.arrow"
+
+    def get(self, symbol, key):
+        """Read-only float32 array backed by the mapped file, or None on a miss."""
+        path = self._path(symbol, key)
+        try:
+            table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+        except (FileNotFoundError, OSError, pa.ArrowInvalid):
+            return None
+        return table.column('prob').to_numpy()
+
+    def put(self, symbol, key, prob):
+        path = self._path(symbol, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.table({'prob': np.asarray(prob, dtype=np.float32)})
+        tmp = path.with_suffix('.tmp')
+        with pa.OSFile(str(tmp), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        tmp.replace(path)
+        self.invalidate(symbol, keep=path)
+
+    def invalidate(self, symbol, keep=None):
+        """Drops a symbol's cached predictions (except `keep`). Returns files removed."""
+        removed = 0
+        for path in self.root.glob(f"{symbol}-*.arrow"):
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
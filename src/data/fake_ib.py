@@ -0,0 +1,137 @@
+# quant_v2/src/data/fake_ib.py
+import asyncio
+import random
+import tempfile
+import time
+import zlib
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from ib_insync import BarData
+
+class FakeIB:
+    """
+    Offline stand-in for the parts of ib_insync.IB the downloader uses.
+    Simulates request latency, random failures and IBKR's historical-data
+    pacing rule (too many requests in the window -> error 162, empty result),
+    and records every request so throughput/pacing can be checked offline.
+    """
+    def __init__(self, latency=0.2, jitter=0.1, failure_rate=0.0,
+                 pacing_requests=60, pacing_window=600.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.pacing_requests = pacing_requests
+        self.pacing_window = pacing_window
+        self.rng = random.Random(seed)
+
+        self.connected = False
+        self.request_log = []   # (start, end, symbol, endDateTime, ok)
+        self.violations = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def connectAsync(self, host='127.0.0.1', port=7497, clientId=1, **kwargs):
+        self.connected = True
+        return self
+
+    def isConnected(self):
+        return self.connected
+
+    def disconnect(self):
+        self.connected = False
+
+    async def reqHistoricalDataAsync(self, contract, endDateTime, durationStr, barSizeSetting,
+                                     whatToShow, useRTH, formatDate=1, keepUpToDate=False,
+                                     chartOptions=[], timeout=60):
+        start = time.monotonic()
+        recent = [r for r in self.request_log if start - r[0] < self.pacing_window]
+        paced_out = len(recent) + self.in_flight >= self.pacing_requests
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+        try:
+            if timeout and delay > timeout:
+                # Like ib_insync: cancel at the timeout and hand back an empty list
+                await asyncio.sleep(timeout)
+                self.request_log.append((start, time.monotonic(), contract.symbol, endDateTime, False))
+                return []
+            await asyncio.sleep(delay)
+        finally:
+            self.in_flight -= 1
+
+        ok = not paced_out and self.rng.random() >= self.failure_rate
+        self.violations += paced_out
+        self.request_log.append((start, time.monotonic(), contract.symbol, endDateTime, ok))
+        if not ok:
+            return []
+        return make_bars(contract.symbol, endDateTime, durationStr)
+
+    def stats(self):
+        """Throughput / pacing summary of everything requested so far."""
+        if not self.request_log:
+            return {}
+        starts = np.array(sorted(r[0] for r in self.request_log))
+        # Most request starts that fell inside any single pacing window
+        max_in_window = int((np.searchsorted(starts, starts + self.pacing_window) - np.arange(len(starts))).max())
+        elapsed = max(r[1] for r in self.request_log) - starts[0]
+        return {
+            'requests': len(starts),
+            'failed': sum(not r[4] for r in self.request_log),
+            'violations': self.violations,
+            'peak_in_flight': self.peak_in_flight,
+            'max_in_window': max_in_window,
+            'elapsed_s': elapsed,
+            'req_per_s': len(starts) / elapsed if elapsed > 0 else float('inf'),
+        }
+
+def make_bars(symbol, end_dt, duration, tz='US/Eastern'):
+    """Synthetic RTH 1-min bars covering `duration` ('N D') up to end_dt."""
+    n_days = int(duration.split()[0]) if duration.endswith('D') else 1
+    if isinstance(end_dt, str) and end_dt:
+        # IBKR format: 'YYYYMMDD HH:MM:SS [TZ]'
+        parts = end_dt.split()
+        end = pd.Timestamp(f"{parts[0]} {parts[1]}").tz_localize(parts[2] if len(parts) > 2 else tz)
+    else:
+        end = pd.Timestamp(end_dt) if end_dt else pd.Timestamp.now(tz=tz)
+    if end.tzinfo is None:
+        end = end.tz_localize(tz)
+    end_day = end.normalize().tz_localize(None)
+    days = pd.bdate_range(end_day - pd.Timedelta(days=n_days - 1), end_day)
+
+    index = pd.DatetimeIndex([
+        t for d in days for t in pd.date_range(d + pd.Timedelta('9h30min'), periods=390, freq='min', tz=tz)
+    ])
+    index = index[index < end]
+
+    rng = np.random.default_rng(zlib.crc32(symbol.encode()))  # hash() is salted per process
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 5e-4, len(index))))
+    open_ = np.r_[close[:1], close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 5e-4, len(index)))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 5e-4, len(index)))
+    volume = rng.integers(1_000, 50_000, len(index)).astype(float)
+
+    return [
+        BarData(date=t.to_pydatetime(), open=o, high=h, low=l, close=c,
+                volume=v, average=(h + l + c) / 3, barCount=int(v // 100))
+        for t, o, h, l, c, v in zip(index, open_, high, low, close, volume)
+    ]
+
+if __name__ == "__main__":
+    # Offline demo: pacing scaled down to 12 requests / 3s so it runs quickly
+    from src import config
+    from src.data import ingest
+
+    ib = FakeIB(latency=0.3, jitter=0.1, failure_rate=0.1, pacing_requests=12, pacing_window=3.0)
+    pacer = ingest.TokenBucket.for_ibkr(requests=12, window=3.0, burst=4)
+    config.HIST_RETRY_BACKOFF = 0.1
+    symbols = [f"SYM{i:02d}" for i in range(30)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config.BAR_STORE = Path(tmp)
+        t0 = time.monotonic()
+        results = asyncio.run(ingest.fetch_data_async(symbols, ib=ib, pacer=pacer, max_in_flight=6))
+        print(f"\n--> Downloaded {sum(v > 0 for v in results.values())}/{len(symbols)} symbols in {time.monotonic() - t0:.1f}s")
+    for k, v in ib.stats().items():
+        print(f"  {k:<15} {v}")
@@ -0,0 +1,298 @@
+# quant_v2/src/data/feed.py
+import datetime
+import time
+from collections import deque, namedtuple
+import numpy as np
+import pandas as pd
+import pytz
+from eventkit import Event
+from ib_insync import Stock
+from src import config
+from src.data import store
+
+REALTIME_SECONDS = 5  # IB only serves 5-second real-time bars
+
+# date = bar start (like IB historical bars), average = VWAP
+Bar = namedtuple('Bar', ['date', 'open', 'high', 'low', 'close', 'volume', 'average'])
+
+def bar_seconds(size):
+    """IB bar size string ('5 secs', '1 min', '5 mins', '1 hour') -> seconds."""
+    n, unit = size.split()
+    return int(n) * {'sec': 1, 'min': 60, 'hour': 3600}[unit.rstrip('s')]
+
+class BarAggregator:
+    """
+    Rolls src_seconds bars up into `seconds` bars, per symbol. A bar is
+    emitted as soon as its last sub-bar arrives. Only buckets that got
+    every sub-bar in sequence are emitted: one with a hole, a missing
+    first sub-bar (subscribed mid-bar) or missing trailing sub-bars (closed
+    by a sub-bar from a later bucket) is dropped rather than emitted with
+    a wrong open/close/volume, and the consumer's fallback (historical
+    request, reseed) covers it. Note a dropped bar leaves a hole for the
+    next size up too.
+    """
+    def __init__(self, seconds, src_seconds, emit):
+        if seconds % src_seconds:
+            raise ValueError(f"{seconds}s bars can't be built from {src_seconds}s bars")
+        self.seconds = seconds
+        self.src_seconds = src_seconds
+        self.emit = emit
+        self.reset()
+
+    def reset(self):
+        self.open = {}        # symbol -> [start, open, high, low, close, volume, price*volume, complete, next sub-bar]
+        self.last_start = {}  # symbol -> start of the last bucket closed
+
+    def bucket(self, date):
+        start = int(date.timestamp()) // self.seconds * self.seconds
+        return datetime.datetime.fromtimestamp(start, date.tzinfo)
+
+    def add(self, symbol, bar):
+        start = self.bucket(bar.date)
+        last = self.last_start.get(symbol)
+        if last is not None and start <= last:
+            return  # Late sub-bar of a bucket already closed
+        cur = self.open.get(symbol)
+        if cur is not None and start != cur[0]:
+            cur[7] = False  # Trailing sub-bars never came
+            self._close(symbol)
+            cur = None
+
+        step = datetime.timedelta(seconds=self.src_seconds)
+        if cur is None:
+            cur = self.open[symbol] = [start, bar.open, bar.high, bar.low, bar.close, 0.0, 0.0, bar.date == start, bar.date]
+        else:
+            if bar.date < cur[8]:
+                return  # Duplicate
+            cur[7] = cur[7] and bar.date == cur[8]  # Hole in the sequence
+            cur[2] = max(cur[2], bar.high)
+            cur[3] = min(cur[3], bar.low)
+            cur[4] = bar.close
+        cur[5] += bar.volume
+        cur[6] += bar.average * bar.volume
+        cur[8] = bar.date + step
+
+        if (cur[8] - start).total_seconds() >= self.seconds:
+            self._close(symbol)
+
+    def _close(self, symbol):
+        start, o, h, l, c, v, pv, complete, _ = self.open.pop(symbol)
+        self.last_start[symbol] = start
+        if complete:
+            self.emit(symbol, Bar(start, o, h, l, c, v, pv / v if v > 0 else c))
+
+class MarketDataFeed:
+    """
+    Local bar builder on top of IB real-time bars.
+
+    One reqRealTimeBars (5-second TRADES) subscription per symbol; the
+    5-second bars are rolled up into every size in bar_sizes (seconds, each
+    a multiple of the previous, e.g. 1-min -> 5-min). Each closed bar fires
+    barCloseEvent[seconds] with (symbol, Bar) about as soon as IB sends the
+    bucket's last 5-second bar, instead of waiting for a historical
+    snapshot. Bars with missing 5-second bars (gaps, joining mid-bar) are
+    never emitted, see BarAggregator. The last `history` bars per size are
+    kept for latest()/frame().
+    Anything that produces 5-second bars (e.g. ReplayFeed) can drive it
+    through on_realtime_bar().
+    """
+    def __init__(self, symbols=None, bar_sizes=None, history=None, tz='US/Eastern'):
+        self.symbols = list(symbols or dict.fromkeys(config.ACTIVE_TRADING_LIST + config.GUARD_SYMBOLS))
+        self.bar_sizes = sorted(bar_sizes or config.FEED_BAR_SIZES)
+        self.history = history or config.FEED_HISTORY_BARS
+        self.tz = pytz.timezone(tz)
+        self.barCloseEvent = {size: Event(f'barClose{size}s') for size in self.bar_sizes}
+
+        # 5s -> first size -> next size ...
+        self.aggregators = []
+        src = REALTIME_SECONDS
+        for i, size in enumerate(self.bar_sizes):
+            self.aggregators.append(BarAggregator(size, src, self._make_emitter(i)))
+            src = size
+        self.ib = None
+        self.reset()
+
+    def reset(self):
+        """Drops all partial bars and history (e.g. after a reconnect)."""
+        for agg in self.aggregators:
+            agg.reset()
+        self.bars = {size: {} for size in self.bar_sizes}  # size -> symbol -> deque of Bars
+        self.last_update = None
+        self.subscriptions = {}
+
+    def _make_emitter(self, i):
+        size = self.bar_sizes[i]
+        def emit(symbol, bar):
+            self.bars[size].setdefault(symbol, deque(maxlen=self.history)).append(bar)
+            if i + 1 < len(self.aggregators):
+                self.aggregators[i + 1].add(symbol, bar)
+            self.barCloseEvent[size].emit(symbol, bar)
+        return emit
+
+    # --- State updates ---
+    def on_realtime_bar(self, symbol, bar):
+        """Feeds one 5-second Bar (date = tz-aware bar start)."""
+        self.last_update = datetime.datetime.now(datetime.timezone.utc)
+        self.aggregators[0].add(symbol, bar)
+
+    # --- IB subscription ---
+    @property
+    def attached(self):
+        return len(self.subscriptions) == len(self.symbols)
+
+    def attach(self, ib):
+        """One 5-second real-time bar subscription per symbol (missing ones are retried on the next call)."""
+        self.ib = ib
+        for symbol in self.symbols:
+            if symbol in self.subscriptions:
+                continue
+            bars = ib.reqRealTimeBars(Stock(symbol, 'SMART', 'USD'), REALTIME_SECONDS, 'TRADES', useRTH=True)
+            if bars is None:
+                continue
+            bars.updateEvent += self._make_handler(symbol)
+            self.subscriptions[symbol] = bars
+
+    def detach(self, ib):
+        for bars in self.subscriptions.values():
+            try: ib.cancelRealTimeBars(bars)
+            except Exception: pass
+        self.reset()
+
+    def _make_handler(self, symbol):
+        def handler(bars, has_new_bar):
+            if has_new_bar and bars:
+                b = bars[-1]
+                self.on_realtime_bar(symbol, Bar(b.time.astimezone(self.tz), b.open_, b.high, b.low,
+                                                 b.close, float(b.volume), b.wap))
+        return handler
+
+    # --- Read side ---
+    def latest(self, symbol, size):
+        bars = self.bars[size].get(symbol)
+        return bars[-1] if bars else None
+
+    def frame(self, symbol, size):
+        """Closed bars held for a symbol as an OHLCV DataFrame indexed by 'date'."""
+        bars = list(self.bars[size].get(symbol, ()))
+        df = pd.DataFrame(bars, columns=Bar._fields)
+        return df.set_index(pd.DatetimeIndex(df.pop('date'), name='date'))
+
+    def age_seconds(self, now=None):
+        if self.last_update is None:
+            return None
+        return ((now or datetime.datetime.now(datetime.timezone.utc)) - self.last_update).total_seconds()
+
+def split_bars(df, seconds=REALTIME_SECONDS):
+    """
+    Rebuilds plausible 5-second bars from coarser OHLCV bars: price walks
+    open -> first extreme -> second extreme -> close (low first on up bars),
+    volume is spread evenly, every sub-bar's WAP is the bar's average. Rolling
+    the result back up reproduces the source bars exactly.
+    Returns a DataFrame of 5-second bars (same columns, bar-start index).
+    """
+    if df.empty:
+        return df
+    step = int(pd.Series(df.index).diff().dt.total_seconds().median()) if len(df) > 1 else 60
+    parts = max(1, step // seconds)
+    if parts == 1:
+        return df
+
+    o, h, l, c = (df[k].to_numpy(dtype=float) for k in ('open', 'high', 'low', 'close'))
+    up = c >= o
+    first, second = np.where(up, l, h), np.where(up, h, l)
+    # Price path at parts + 1 sub-bar edges, linear between the four anchors
+    anchors = np.stack([o, first, second, c], axis=1)
+    edges = np.linspace(0, 3, parts + 1)
+    path = np.stack([np.interp(edges, [0, 1, 2, 3], a) for a in anchors])
+    # Anchors must sit on an edge so the extremes survive the roll-up
+    for k in (1, 2):
+        path[:, int(round(k * parts / 3))] = anchors[:, k]
+
+    vol = df['volume'].to_numpy(dtype=float)
+    base = np.floor(vol / parts)
+    sub_vol = np.repeat(base[:, None], parts, axis=1)
+    sub_vol[:, -1] += vol - base * parts
+    avg = df['average'].to_numpy(dtype=float) if 'average' in df.columns else (h + l + c) / 3
+
+    offsets = pd.to_timedelta(np.arange(parts) * seconds, unit='s')
+    index = (df.index.repeat(parts) + np.tile(offsets, len(df))).rename('date')
+    return pd.DataFrame({
+        'open': path[:, :-1].ravel(),
+        'high': np.maximum(path[:, :-1], path[:, 1:]).ravel(),
+        'low': np.minimum(path[:, :-1], path[:, 1:]).ravel(),
+        'close': path[:, 1:].ravel(),
+        'volume': sub_vol.ravel(),
+        'average': np.repeat(avg, parts),
+    }, index=index)
+
+class ReplayFeed:
+    """
+    Gateway stand-in: plays recorded bars into a MarketDataFeed as 5-second
+    bars in time order across symbols. Recorded 1-min bars (the bar store)
+    are split with split_bars(); 5-second recordings play as they are.
+    speed=None replays as fast as possible, speed=k runs k times real time.
+    """
+    def __init__(self, feed, frames):
+        self.feed = feed
+        self.frames = frames
+
+    @classmethod
+    def from_store(cls, feed, symbols=None, start=None, end=None):
+        frames = store.read_bars(list(symbols or feed.symbols), start=start, end=end)
+        return cls(feed, frames)
+
+    def events(self):
+        """(time, symbol, Bar) for every 5-second bar, time ordered."""
+        rows = []
+        for sym, df in self.frames.items():
+            if df.empty:
+                continue
+            sub = split_bars(df)
+            index = sub.index.tz_localize(self.feed.tz) if sub.index.tz is None else sub.index.tz_convert(self.feed.tz)
+            cols = [sub[k].to_numpy(dtype=float) for k in ('open', 'high', 'low', 'close', 'volume', 'average')]
+            rows.extend((ts, sym, Bar(ts, *vals)) for ts, *vals in zip(index, *cols))
+        rows.sort(key=lambda r: (r[0], r[1]))
+        return rows
+
+    def run(self, speed=None, sleep=time.sleep):
+        """Replays everything. Returns the number of 5-second bars fed."""
+        prev, n = None, 0
+        for ts, sym, bar in self.events():
+            if speed and prev is not None and ts > prev:
+                sleep((ts - prev).total_seconds() / speed)
+            prev = ts
+            self.feed.on_realtime_bar(sym, bar)
+            n += 1
+        return n
+
+if __name__ == "__main__":
+    # Replay parity: locally built bars vs the stored 1-min bars and a pandas 5-min resample
+    import sys
+    symbol = sys.argv[1] if len(sys.argv) > 1 else config.ACTIVE_TRADING_LIST[0]
+    bars_1m = store.read_bars(symbol)
+    days = bars_1m.index.strftime('%Y-%m-%d')
+    day = pd.Series(days).value_counts(sort=False).iloc[-10:].idxmax()  # Fullest of the last 10 sessions
+    bars_1m = bars_1m[days == day]
+
+    feed = MarketDataFeed([symbol], bar_sizes=[60, 300])
+    closes = {60: 0, 300: 0}
+    for size in closes:
+        feed.barCloseEvent[size] += lambda sym, bar, size=size: closes.__setitem__(size, closes[size] + 1)
+    t0 = time.perf_counter()
+    n = ReplayFeed(feed, {symbol: bars_1m}).run()
+    elapsed = time.perf_counter() - t0
+    print(f"--> {symbol} {day}: {n} 5-sec bars -> {closes[60]} x 1-min, {closes[300]} x 5-min "
+          f"in {elapsed:.2f}s ({n / elapsed:,.0f} bars/s)")
+
+    cols = ['open', 'high', 'low', 'close', 'volume']
+    built = feed.frame(symbol, 60)
+    ref = bars_1m[cols]
+    ref.index = ref.index.tz_localize(feed.tz) if ref.index.tz is None else ref.index.tz_convert(feed.tz)
+    diff = np.abs(built[cols].to_numpy() - ref.to_numpy()).max()
+    print(f"  [{'+' if diff < 1e-9 else '!'}] 1-min max |diff| vs stored bars: {diff:.2e}")
+
+    ref5 = ref.resample('5min').agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}).dropna()
+    built5 = feed.frame(symbol, 300)[cols]
+    common = built5.index.intersection(ref5.index)
+    diff5 = np.abs(built5.loc[common].to_numpy() - ref5.loc[common].to_numpy()).max()
+    print(f"  [{'+' if diff5 < 1e-9 else '!'}] 5-min max |diff| vs resample ({len(common)} bars): {diff5:.2e}")
@@ -1,49 +1,148 @@
 # quant_v2/src/data/ingest.py
+import asyncio
+import random
+import time
 import pandas as pd
 from ib_insync import *
 from src import config
+from src.data import store
 
-def fetch_data():
+class TokenBucket:
     """
-    Connects to IBKR TWS/Gateway and downloads 1-minute historical trade data.
-    Saves raw data to Parquet format in the data/raw directory.
+    Async token bucket used to pace historical-data requests.
+    In any rolling window of W seconds at most (capacity + rate * W)
+    requests can start, so rate is derived to keep that under IBKR's limit.
+    """
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate            # Tokens added per second
+        self.capacity = capacity    # Max burst
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.last = clock()
+
+    @classmethod
+    def for_ibkr(cls, requests=None, window=None, burst=None):
+        requests = requests or config.HIST_PACING_REQUESTS
+        window = window or config.HIST_PACING_WINDOW
+        burst = min(burst or config.HIST_PACING_BURST, requests)
+        return cls(rate=max(requests - burst, 1) / window, capacity=burst)
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def bars_to_frame(bars):
+    """Converts ib_insync BarData into the raw OHLCV frame we store."""
+    df = util.df(bars)
+    df['date'] = pd.to_datetime(df['date'])
+    df.set_index('date', inplace=True)
+
+    # Select only necessary columns to reduce file size
+    return df[['open', 'high', 'low', 'close', 'volume', 'average']]
+
+async def request_bars(ib, contract, end_dt, duration, pacer, slots, retries=None):
+    """
+    One paced historical request with retry + exponential backoff.
+    Returns the bars, or [] if every attempt failed.
     """
-    ib = IB()
+    retries = config.HIST_MAX_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        reason = "empty response"
+        async with slots:
+            await pacer.acquire()
+            try:
+                bars = await ib.reqHistoricalDataAsync(
+                    contract, endDateTime=end_dt, durationStr=duration,
+                    barSizeSetting=config.RAW_INTERVAL, whatToShow=config.WHAT_TO_SHOW,
+                    useRTH=config.USE_RTH, formatDate=1, keepUpToDate=False,
+                    timeout=config.HIST_TIMEOUT
+                )
+            except Exception as e:
+                bars, reason = None, str(e)
+
+        if bars:
+            return bars
+        if attempt < retries:
+            delay = config.HIST_RETRY_BACKOFF * (2 ** attempt) * random.uniform(1.0, 1.5)
+            print(f"  [!] {contract.symbol} {end_dt or 'latest'} failed ({reason}). Retry {attempt + 1}/{retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+    return []
+
+def missing_duration(symbol):
+    """IBKR duration string covering only what the bar store is missing."""
+    store.import_legacy_file(symbol)
+    last = store.last_timestamp(symbol)
+    if last is None:
+        return config.DURATION
+    now = pd.Timestamp.now(tz=last.tz)
+    days_missing = (now - last).days + 1
+    return f"{min(days_missing, int(config.DURATION.split()[0]))} D"
+
+async def fetch_symbol(ib, symbol, pacer, slots):
+    duration = missing_duration(symbol)
+    print(f"Fetching {symbol} [{duration}]...")
+    contract = Stock(symbol, 'SMART', 'USD')
+
+    # Request historical trades (High precision for ML features)
+    bars = await request_bars(ib, contract, '', duration, pacer, slots)
+    if not bars:
+        print(f"  [!] NO DATA for {symbol}")
+        return 0
+
+    # Append to the partitioned store (overlapping bars are deduplicated)
+    added = store.write_bars(symbol, bars_to_frame(bars))
+    print(f"  [+] {symbol}: {added} new rows (last bar {store.last_timestamp(symbol)})")
+    return added
+
+async def fetch_data_async(symbols=None, ib=None, pacer=None, max_in_flight=None):
+    """
+    Downloads all symbols concurrently: at most max_in_flight requests are
+    open at once and every request start is paced by a token bucket.
+    `ib` may be any object with ib_insync's async API (e.g. FakeIB).
+    """
+    symbols = symbols or config.ALL_SYMBOLS
+    ib = ib or IB()
+    pacer = pacer or TokenBucket.for_ibkr()
+    slots = asyncio.Semaphore(max_in_flight or config.HIST_MAX_IN_FLIGHT)
+
+    results = {}
     try:
         print(f"--> Connecting to IBKR at {config.IB_HOST}:{config.IB_PORT}...")
-        ib.connect(config.IB_HOST, config.IB_PORT, clientId=config.CLIENT_ID)
-        
-        for symbol in config.ALL_SYMBOLS:
-            print(f"Fetching {symbol} [{config.DURATION}]...")
-            contract = Stock(symbol, 'SMART', 'USD')
-            
-            # Request historical trades (High precision for ML features)
-            bars = ib.reqHistoricalData(
-                contract, endDateTime='', durationStr=config.DURATION,
-                barSizeSetting=config.RAW_INTERVAL, whatToShow=config.WHAT_TO_SHOW,
-                useRTH=config.USE_RTH, formatDate=1, keepUpToDate=False
-            )
-            
-            if not bars:
-                print(f"  [!] NO DATA for {symbol}")
-                continue
-                
-            df = util.df(bars)
-            df['date'] = pd.to_datetime(df['date'])
-            df.set_index('date', inplace=True)
-            
-            # Select only necessary columns to reduce file size
-            df = df[['open', 'high', 'low', 'close', 'volume', 'average']]
-            
-            file_path = config.DATA_RAW / f"{symbol}_1min.parquet"
-            df.to_parquet(file_path)
-            print(f"  [+] Saved {len(df)} rows to {file_path}")
+        await ib.connectAsync(config.IB_HOST, config.IB_PORT, clientId=config.CLIENT_ID)
+
+        rows = await asyncio.gather(
+            *(fetch_symbol(ib, sym, pacer, slots) for sym in symbols),
+            return_exceptions=True
+        )
+        for sym, n in zip(symbols, rows):
+            if isinstance(n, Exception):
+                print(f"  [!] Error ({sym}): {n}")
+                n = 0
+            results[sym] = n
 
     except Exception as e:
         print(f"  [!] Error: {e}")
     finally:
         if ib.isConnected():
             ib.disconnect()
+    return results
+
+def fetch_data(symbols=None, ib=None):
+    """
+    Connects to IBKR TWS/Gateway and downloads 1-minute historical trade data.
+    Only the range missing since the last stored bar is requested; bars are
+    appended to the partitioned store under data/raw/bars.
+    """
+    return util.run(fetch_data_async(symbols, ib))
 
 if __name__ == "__main__":
-    fetch_data()
\ No newline at end of file
+    fetch_data()
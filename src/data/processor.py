@@ -1,6 +1,7 @@
 # quant_v2/src/data/process.py
 import pandas as pd
 from src import config
+from src.data import store
 
 def resample_and_align():
     """
@@ -9,12 +10,11 @@ def resample_and_align():
     """
     print("--> Starting Data Processing (Resample & Align)...")
     
-    hedge_path = config.DATA_RAW / f"{config.HEDGE_SYMBOL}_1min.parquet"
-    if not hedge_path.exists():
-        print(f"CRITICAL: Hedge file {hedge_path} not found.")
+    ohlcv = ['open', 'high', 'low', 'close', 'volume']
+    df_hedge_1m = store.read_bars(config.HEDGE_SYMBOL, columns=ohlcv)
+    if df_hedge_1m.empty:
+        print(f"CRITICAL: Hedge data for {config.HEDGE_SYMBOL} not found.")
         return
-
-    df_hedge_1m = pd.read_parquet(hedge_path)
     
     # Resample Hedge asset to strategy frequency
     df_hedge_15m = df_hedge_1m.resample(config.RESAMPLE_INTERVAL, label='right', closed='right').agg({
@@ -22,14 +22,12 @@ def resample_and_align():
     }).dropna()
 
     for symbol in config.TARGET_SYMBOLS:
-        target_path = config.DATA_RAW / f"{symbol}_1min.parquet"
-        if not target_path.exists():
+        df_target_1m = store.read_bars(symbol, columns=ohlcv)
+        if df_target_1m.empty:
             continue
             
         print(f"Processing {symbol} vs {config.HEDGE_SYMBOL}...")
         
-        df_target_1m = pd.read_parquet(target_path)
-        
         # Resample Target asset to strategy frequency
         df_target_15m = df_target_1m.resample(config.RESAMPLE_INTERVAL, label='right', closed='right').agg({
             'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
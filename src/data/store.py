@@ -0,0 +1,133 @@
+# quant_v2/src/data/store.py
+import hashlib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from src import config
+
+# Layout: data/raw/bars/symbol=<SYM>/day=<YYYY-MM-DD>/bars.parquet
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'average']
+STORE_TZ = 'US/Eastern'  # Bars (and their day partitions) are in exchange time
+PARTITIONING = ds.partitioning(pa.schema([('symbol', pa.string()), ('day', pa.string())]), flavor='hive')
+
+def _symbol_dir(symbol):
+    return config.BAR_STORE / f"symbol={symbol}"
+
+def _day_path(symbol, day):
+    return _symbol_dir(symbol) / f"day={day}" / "bars.parquet"
+
+def stored_days(symbol):
+    """Sorted list of 'YYYY-MM-DD' partitions held for a symbol."""
+    sym_dir = _symbol_dir(symbol)
+    if not sym_dir.exists():
+        return []
+    return sorted(p.name.split('=', 1)[1] for p in sym_dir.glob("day=*") if (p / "bars.parquet").exists())
+
+def day_fingerprints(symbol):
+    """{day: content hash} for every stored partition of a symbol."""
+    return {
+        day: hashlib.blake2b(_day_path(symbol, day).read_bytes(), digest_size=8).hexdigest()
+        for day in stored_days(symbol)
+    }
+
+def write_bars(symbol, df):
+    """
+    Appends 1-min bars to the store. Only the days present in `df` are
+    touched; overlapping bars are deduplicated (newest download wins).
+    tz-aware bars are converted to STORE_TZ first so they land in their
+    exchange-time day. Each day file is replaced atomically (a crash never
+    leaves a half-written partition). Returns the number of new bars added.
+    """
+    if df is None or df.empty:
+        return 0
+    df = df[[c for c in BAR_COLUMNS if c in df.columns]]
+    if df.index.tz is not None:
+        df = df.tz_convert(STORE_TZ)
+
+    added = 0
+    for day, chunk in df.groupby(df.index.strftime('%Y-%m-%d')):
+        path = _day_path(symbol, day)
+        if path.exists():
+            existing = pd.read_parquet(path)
+            if existing.index.tz is not None and chunk.index.tz is not None:
+                existing = existing.tz_convert(STORE_TZ)
+            merged = pd.concat([existing, chunk])
+            merged = merged[~merged.index.duplicated(keep='last')]
+            added += len(merged) - len(existing)
+        else:
+            merged = chunk
+            added += len(chunk)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")  # Dot prefix: dataset scans skip it
+        merged.sort_index().to_parquet(tmp)
+        tmp.replace(path)
+    return added
+
+def last_timestamp(symbol):
+    """Latest stored bar for a symbol (None if nothing stored)."""
+    days = stored_days(symbol)
+    if not days:
+        return None
+    return pd.read_parquet(_day_path(symbol, days[-1]), columns=[]).index.max()
+
+def import_legacy_file(symbol):
+    """One-off migration of an old data/raw/<SYM>_1min.parquet into the store."""
+    legacy_path = config.DATA_RAW / f"{symbol}_1min.parquet"
+    if stored_days(symbol) or not legacy_path.exists():
+        return 0
+    df = pd.read_parquet(legacy_path)
+    df.columns = df.columns.str.lower()
+    print(f"  [+] Importing legacy {legacy_path.name} into bar store")
+    return write_bars(symbol, df)
+
+def read_bars(symbols, start=None, end=None, columns=None):
+    """
+    Reads 1-min bars from the store.
+
+    Only the requested columns are read, and the symbol/day/time filters are
+    pushed down to the parquet scan, so partitions outside [start, end] are
+    never opened. Returns a DataFrame indexed by 'date' for a single symbol
+    (str), or a {symbol: DataFrame} dict for a list of symbols.
+    """
+    single = isinstance(symbols, str)
+    symbols = [symbols] if single else list(symbols)
+    columns = list(columns) if columns is not None else BAR_COLUMNS
+
+    for sym in symbols:
+        import_legacy_file(sym)
+
+    frames = {sym: pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name='date')) for sym in symbols}
+    present = [sym for sym in symbols if stored_days(sym)]
+    if present:
+        dataset = ds.dataset(config.BAR_STORE, format='parquet', partitioning=PARTITIONING)
+        ts_type = dataset.schema.field('date').type
+
+        # Partition pruning + row-level predicate
+        expr = ds.field('symbol').isin(present)
+        # Day partitions are in the store's timezone, so bounds are converted before pruning
+        if start is not None:
+            start = _as_store_time(pd.Timestamp(start), ts_type)
+            expr &= ds.field('day') >= start.strftime('%Y-%m-%d')
+            expr &= ds.field('date') >= pa.scalar(start, type=ts_type)
+        if end is not None:
+            end = _as_store_time(pd.Timestamp(end), ts_type)
+            expr &= ds.field('day') <= end.strftime('%Y-%m-%d')
+            expr &= ds.field('date') <= pa.scalar(end, type=ts_type)
+
+        table = dataset.to_table(columns=['symbol', 'date'] + columns, filter=expr)
+        df = table.to_pandas(ignore_metadata=True).set_index('date')
+        for sym, chunk in df.groupby('symbol', sort=False):
+            frames[sym] = chunk.drop(columns='symbol').sort_index()
+
+    return frames[symbols[0]] if single else frames
+
+def _as_store_time(ts, ts_type):
+    """
+    A bound in the stored 'date' column's timezone. Naive bounds are taken
+    as store-local; with a naive store column, aware bounds are converted
+    to STORE_TZ wall time.
+    """
+    tz = ts_type.tz or STORE_TZ
+    local = ts.tz_convert(tz) if ts.tzinfo else ts.tz_localize(tz)
+    return (local if ts_type.tz else local.tz_localize(None)).to_pydatetime()
@@ -0,0 +1,108 @@
+# quant_v2/src/data/stream.py
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import xgboost as xgb
+from src import config
+
+LABEL_COLS = ['bin', 'ret', 'exit_time']
+
+def feature_columns(path, drop):
+    """Feature names from a labeled parquet's schema (no data read)."""
+    schema = pq.read_schema(path)
+    index_cols = set((schema.pandas_metadata or {}).get('index_columns', []))
+    return [c for c in schema.names if c not in drop and c not in index_cols]
+
+def split_spans(symbols, holdout_frac=None, embargo_min=None):
+    """
+    Per-symbol row spans of the labeled files: train = rows before the
+    holdout, purged so no label (exit_time + embargo) reaches the holdout;
+    holdout = the rest. Only parquet metadata and one row group's 'date'
+    column are read.
+    Returns ({symbol: (path, lo, hi, purge_before)} for train, same for
+    holdout, {symbol: holdout start time or None}).
+    """
+    holdout_frac = config.HOLDOUT_FRAC if holdout_frac is None else holdout_frac
+    embargo_min = config.WF_EMBARGO_MIN if embargo_min is None else embargo_min
+    train, holdout, starts = {}, {}, {}
+    for sym in symbols:
+        path = config.DATA_PROCESSED / f"{sym}_labeled.parquet"
+        if not path.exists():
+            continue
+        meta = pq.ParquetFile(path).metadata
+        n = meta.num_rows
+        split = int(n * (1 - holdout_frac))
+        boundary = start_time = None
+        if split < n:
+            # Row group holding row `split` -> its timestamp
+            start = 0
+            for rg in range(meta.num_row_groups):
+                rows = meta.row_group(rg).num_rows
+                if split < start + rows:
+                    dates = pq.ParquetFile(path).read_row_group(rg, columns=['date'])['date']
+                    start_time = pd.Timestamp(dates[split - start].as_py())
+                    boundary = start_time - pd.Timedelta(minutes=embargo_min)
+                    break
+                start += rows
+        train[sym] = (path, 0, split, boundary)
+        holdout[sym] = (path, split, n, None)
+        starts[sym] = start_time
+    return train, holdout, starts
+
+def iter_spans(spans, columns, batch_rows=None):
+    """
+    Yields (symbol, features float32 [rows, cols], label dict) batches for
+    the given row spans, reading record batches of at most batch_rows so
+    memory is bounded by the batch, not by the file.
+    """
+    batch_rows = batch_rows or config.TRAIN_BATCH_ROWS
+    for sym, (path, lo, hi, purge_before) in spans.items():
+        pos = 0
+        for batch in pq.ParquetFile(path, pre_buffer=False).iter_batches(batch_size=batch_rows, columns=columns + LABEL_COLS):
+            b_lo, b_hi = pos, pos + batch.num_rows
+            pos = b_hi
+            if b_hi <= lo:
+                continue
+            if b_lo >= hi:
+                break
+            batch = batch.slice(max(lo - b_lo, 0), min(hi, b_hi) - max(lo, b_lo))
+            if purge_before is not None:
+                exits = batch.column('exit_time')
+                keep = pc.fill_null(pc.less(exits, pa.scalar(purge_before, type=exits.type)), False)
+                batch = batch.filter(keep)
+            if batch.num_rows == 0:
+                continue
+            X = np.empty((batch.num_rows, len(columns)), dtype=np.float32)
+            for j, c in enumerate(columns):
+                X[:, j] = batch.column(c).to_numpy(zero_copy_only=False)
+            labels = {c: batch.column(c).to_numpy(zero_copy_only=False) for c in ('bin', 'ret')}
+            yield sym, X, labels
+
+class ParquetBatchIter(xgb.DataIter):
+    """
+    XGBoost DataIter over labeled parquet spans. XGBoost walks it several
+    times (sketching, then building pages); each pass re-reads the files,
+    so only one batch is ever held here. With cache_prefix set XGBoost
+    spills pages to disk (external memory).
+    """
+    def __init__(self, spans, columns, batch_rows=None, cache_prefix=None):
+        self.spans = spans
+        self.columns = columns
+        self.batch_rows = batch_rows
+        self._it = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self):
+        self._it = None
+
+    def next(self, input_data):
+        if self._it is None:
+            self._it = iter_spans(self.spans, self.columns, self.batch_rows)
+        try:
+            _, X, labels = next(self._it)
+        except StopIteration:
+            return False
+        input_data(data=X, label=labels['bin'], feature_names=self.columns)
+        return True
@@ -0,0 +1,177 @@
+# quant_v2/src/orders.py
+from collections import OrderedDict
+from src import config
+
+ENTRY, PROFIT, STOP = "Entry (Limit)", "Profit Target", "Trailing Stop"
+TERMINAL = {'Filled', 'Cancelled', 'ApiCancelled', 'Inactive'}
+
+class Bracket:
+    """One entry + take-profit + trailing-stop group, tracked as a unit."""
+    __slots__ = ('symbol', 'qty', 'ids', 'status', 'filled', 'done')
+
+    def __init__(self, symbol, qty, parent_id, take_profit_id=None, stop_id=None):
+        self.symbol = symbol
+        self.qty = qty
+        self.ids = {ENTRY: parent_id, PROFIT: take_profit_id, STOP: stop_id}
+        self.status = 'pending'   # pending -> open -> closed, or pending -> cancelled
+        self.filled = 0.0         # Entry shares filled
+        self.done = set()         # Roles whose order reached a terminal state
+
+    @property
+    def active(self):
+        return self.status in ('pending', 'open')
+
+    def __repr__(self):
+        return f"Bracket({self.symbol} {self.status} {self.filled:g}/{self.qty} #{self.ids[ENTRY]})"
+
+class OrderBook:
+    """
+    Positions and live brackets maintained from IB events instead of polling.
+
+    positionEvent keeps {symbol: shares}; orderStatusEvent / execDetailsEvent
+    move each bracket through pending -> open -> closed (or cancelled when
+    the entry dies unfilled, e.g. a DAY limit expiring). Lookups by symbol
+    and orderId are dict hits. Orders of finished brackets leave the live
+    registry and stay in a small LRU (ORDER_REGISTRY_SIZE) so late fill
+    events can still be labeled; nothing grows across days.
+    """
+    def __init__(self, max_finished=None):
+        self.max_finished = config.ORDER_REGISTRY_SIZE if max_finished is None else max_finished
+        self.ib = None
+        self.account = None
+        self.reset()
+
+    def reset(self):
+        self.positions = {}                # symbol -> shares
+        self.brackets = {}                 # symbol -> active Bracket
+        self.orders = {}                   # orderId -> (Bracket, role), live brackets only
+        self.finished = OrderedDict()      # orderId -> role, most recent last
+
+    # --- Registration ---
+    def register_bracket(self, symbol, qty, parent_id, take_profit_id=None, stop_id=None):
+        bracket = Bracket(symbol, qty, parent_id, take_profit_id, stop_id)
+        self.brackets[symbol] = bracket
+        for role, oid in bracket.ids.items():
+            if oid is not None:
+                self.orders[oid] = (bracket, role)
+        return bracket
+
+    def _finish(self, bracket, status):
+        bracket.status = status
+        if self.brackets.get(bracket.symbol) is bracket:
+            del self.brackets[bracket.symbol]
+        for role, oid in bracket.ids.items():
+            if oid is None:
+                continue
+            self.orders.pop(oid, None)
+            self.finished[oid] = role
+            self.finished.move_to_end(oid)
+        while len(self.finished) > self.max_finished:
+            self.finished.popitem(last=False)
+
+    # --- Events ---
+    def on_order_status(self, trade):
+        entry = self.orders.get(trade.order.orderId)
+        if entry is None:
+            return
+        bracket, role = entry
+        status = trade.orderStatus.status
+        if status not in TERMINAL:
+            return
+        bracket.done.add(role)
+
+        if role == ENTRY:
+            if status == 'Filled':
+                bracket.filled = max(bracket.filled, float(trade.orderStatus.filled))
+                bracket.status = 'open'
+            elif bracket.filled == 0 and float(trade.orderStatus.filled) == 0:
+                # Entry cancelled / expired / rejected before any fill: children die with it
+                self._finish(bracket, 'cancelled')
+                return
+        elif status == 'Filled':
+            bracket.status = 'open' if bracket.status == 'pending' else bracket.status
+
+        # Closed once both exits are terminal (one fills, OCA cancels the other)
+        exits = [r for r in (PROFIT, STOP) if bracket.ids[r] is not None]
+        if bracket.status == 'open' and exits and all(r in bracket.done for r in exits):
+            self._finish(bracket, 'closed')
+
+    def on_exec(self, trade, fill):
+        entry = self.orders.get(fill.execution.orderId)
+        if entry is None:
+            return
+        bracket, role = entry
+        if role == ENTRY and fill.execution.side == 'BOT':
+            # orderStatus.filled is cumulative; don't double count a fill the status already carried
+            cumulative = float(trade.orderStatus.filled) if trade is not None else bracket.filled + float(fill.execution.shares)
+            bracket.filled = max(bracket.filled, cumulative)
+            bracket.status = 'open'
+
+    def on_position(self, position):
+        if position.account and self.account and position.account != self.account:
+            return
+        symbol = position.contract.symbol
+        if position.position > 0:  # Long-only strategy: shorts don't block entries
+            self.positions[symbol] = position.position
+        else:
+            self.positions.pop(symbol, None)
+
+    # --- IB wiring ---
+    def attach(self, ib, account=None):
+        """
+        Subscribes to IB events (once per IB instance) and rebuilds state from
+        ib_insync's local caches - positions and open orders are delivered at
+        connect, so this makes no request.
+        """
+        self.account = account
+        if self.ib is not ib:
+            ib.positionEvent += self.on_position
+            ib.orderStatusEvent += self.on_order_status
+            ib.execDetailsEvent += self.on_exec
+            self.ib = ib
+
+        self.reset()
+        for pos in ib.positions(account) if account else ib.positions():
+            self.on_position(pos)
+
+        # Reassemble brackets from open orders: children point at their parent
+        trades = {t.order.orderId: t for t in ib.openTrades()}
+        for oid, t in trades.items():
+            if t.order.parentId or t.order.action != 'BUY':
+                continue
+            kids = [k for k in trades.values() if k.order.parentId == oid]
+            tp = next((k.order.orderId for k in kids if k.order.orderType == 'LMT'), None)
+            stop = next((k.order.orderId for k in kids if k.order.orderType != 'LMT'), None)
+            bracket = self.register_bracket(t.contract.symbol, t.order.totalQuantity, oid, tp, stop)
+            if t.orderStatus.filled:
+                bracket.filled = float(t.orderStatus.filled)
+                bracket.status = 'open'
+        # Exit-only leftovers (entry already filled in an earlier session)
+        for oid, t in trades.items():
+            if t.order.parentId and t.order.parentId not in trades and oid not in self.orders:
+                bracket = self.brackets.get(t.contract.symbol)
+                if bracket is None:
+                    bracket = self.register_bracket(t.contract.symbol, t.order.totalQuantity, t.order.parentId)
+                    bracket.filled, bracket.status = float(t.order.totalQuantity), 'open'
+                    bracket.done.add(ENTRY)
+                role = PROFIT if t.order.orderType == 'LMT' else STOP
+                bracket.ids[role] = oid
+                self.orders[oid] = (bracket, role)
+
+    # --- Read side ---
+    def holds(self, symbol):
+        return bool(self.positions.get(symbol))
+
+    def is_busy(self, symbol):
+        """Owned, or an entry / exit bracket still working."""
+        return symbol in self.brackets or bool(self.positions.get(symbol))
+
+    def bracket_for(self, order_id):
+        entry = self.orders.get(order_id)
+        return entry[0] if entry else None
+
+    def label(self, order_id, default="Manual/Unknown"):
+        entry = self.orders.get(order_id)
+        if entry is not None:
+            return entry[1]
+        return self.finished.get(order_id, default)
@@ -0,0 +1,118 @@
+# quant_v2/src/scheduler.py
+import datetime
+import math
+import time
+from collections import deque
+import numpy as np
+import pytz
+from src import config
+
+class Tick:
+    """One scheduled run: the bar close it belongs to and per-stage timings."""
+    __slots__ = ('bar_close', 'close_epoch', 'woke', 'late', 'missed', 'stages', 'orders', 'clock')
+
+    def __init__(self, bar_close, close_epoch, woke, missed=0, clock=time.time):
+        self.bar_close = bar_close      # tz-aware, US/Eastern
+        self.close_epoch = close_epoch
+        self.woke = woke
+        self.late = woke - close_epoch  # Seconds from bar close to pipeline start
+        self.missed = missed            # Bar closes skipped before this one
+        self.stages = []                # (name, seconds since bar close)
+        self.orders = 0
+        self.clock = clock
+
+    def mark(self, stage):
+        self.stages.append((stage, self.clock() - self.close_epoch))
+
+    @property
+    def elapsed(self):
+        """Seconds from bar close to the last marked stage."""
+        return self.stages[-1][1] if self.stages else self.late
+
+    def describe(self):
+        prev, parts = self.late, []
+        for name, t in self.stages:
+            parts.append(f"{name} {(t - prev) * 1000:.0f}ms")
+            prev = t
+        return " | ".join(parts)
+
+class BarScheduler:
+    """
+    Wakes offset_ms after every bar boundary (US/Eastern) instead of
+    sleeping a fixed 60s after each scan, so the scan always sees the bar
+    that just closed and the close -> order delay is measured.
+
+    wait() sleeps (through the given sleep function, e.g. ib.sleep so IB
+    events keep flowing) until the next wake time and returns a Tick.
+    If the previous tick ran past one or more wake times, the newest
+    boundary is run late when it is within max_lag_ms, otherwise the
+    scheduler waits for the next one; either way tick.missed counts the
+    closes that got no run. over_budget() is checked before orders go out,
+    so a tick that is already past its budget never trades on a stale bar.
+    finish() closes the tick and keeps the latency history for summary().
+    """
+    def __init__(self, bar_seconds=60, offset_ms=None, budget_ms=None, max_lag_ms=None, tz='US/Eastern',
+                 clock=time.time):
+        self.bar_seconds = bar_seconds
+        self.offset = (config.LIVE_TICK_OFFSET_MS if offset_ms is None else offset_ms) / 1000
+        self.budget = (config.LIVE_TICK_BUDGET_MS if budget_ms is None else budget_ms) / 1000
+        self.max_lag = (config.LIVE_TICK_MAX_LAG_MS if max_lag_ms is None else max_lag_ms) / 1000
+        self.tz = pytz.timezone(tz)
+        self.clock = clock
+        self.last_close = None
+        self.latency = deque(maxlen=config.LIVE_TICK_HISTORY)         # Bar close -> pipeline done
+        self.order_latency = deque(maxlen=config.LIVE_TICK_HISTORY)   # Bar close -> orders sent
+        self.overruns = 0
+        self.skipped = 0
+        self.stale = 0      # Ticks whose orders were dropped for being over budget
+
+    def reset(self):
+        """Forget the previous tick (e.g. after an overnight / pre-open sleep)."""
+        self.last_close = None
+
+    def boundary(self, epoch):
+        """Latest bar close at or before epoch."""
+        return math.floor(epoch / self.bar_seconds) * self.bar_seconds
+
+    def wait(self, sleep=time.sleep):
+        now = self.clock()
+        close = self.boundary(now - self.offset)  # Newest close whose wake time has passed
+        if self.last_close is None or close <= self.last_close or now - close > self.max_lag:
+            close += self.bar_seconds             # Wait for the next one
+        missed = 0
+        if self.last_close is not None:
+            missed = max(0, int(round((close - self.last_close) / self.bar_seconds)) - 1)
+            self.skipped += missed
+
+        delay = close + self.offset - self.clock()
+        if delay > 0:
+            sleep(delay)
+        self.last_close = close
+        bar_close = datetime.datetime.fromtimestamp(close, self.tz)
+        return Tick(bar_close, close, self.clock(), missed, self.clock)
+
+    def over_budget(self, tick):
+        """True if the tick is already past its budget (orders should not go out)."""
+        over = self.clock() - tick.close_epoch > self.budget
+        self.stale += over
+        return over
+
+    def finish(self, tick):
+        """Records the tick. Returns True if it overran its budget."""
+        self.latency.append(tick.elapsed)
+        if tick.orders:
+            self.order_latency.append(tick.elapsed)
+        over = tick.elapsed > self.budget
+        self.overruns += over
+        return over
+
+    def summary(self):
+        """{'ticks', 'p50_ms', 'p95_ms', 'max_ms', 'order_p50_ms', 'order_max_ms', 'overruns', 'skipped', 'stale'}"""
+        out = {'ticks': len(self.latency), 'overruns': self.overruns, 'skipped': self.skipped, 'stale': self.stale}
+        if self.latency:
+            lat = np.asarray(self.latency) * 1000
+            out.update(p50_ms=float(np.percentile(lat, 50)), p95_ms=float(np.percentile(lat, 95)), max_ms=float(lat.max()))
+        if self.order_latency:
+            lat = np.asarray(self.order_latency) * 1000
+            out.update(order_p50_ms=float(np.percentile(lat, 50)), order_max_ms=float(lat.max()))
+        return out
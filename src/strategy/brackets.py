@@ -0,0 +1,143 @@
+# quant_v2/src/strategy/brackets.py
+import numpy as np
+import pandas as pd
+from src import config
+
+EXIT_REASONS = np.array(['unfilled', 'target', 'trail', 'eod'])
+
+def simulate_brackets(bars, entries, entry_limit_pct=0.005, profit_target_pct=None,
+                      trail_pct=None, chunk_size=None, first_window=30):
+    """
+    Resolves MLTrader's bracket (parent LMT, profit-target LMT, TRAIL stop)
+    on 1-min OHLC bars for many entry signals at once.
+
+    Rules (per signal at bar s, reference price = close[s]):
+      - Entry: BUY LMT at ref * (1 + entry_limit_pct), DAY. Fills on the first
+        later bar whose low <= limit, at min(open, limit).
+      - Target: SELL LMT at ref * (1 + profit_target_pct); hit when high >= target,
+        filled at max(open, target).
+      - Trail: stop = high-water mark * (1 - trail_pct/100). The mark starts at the
+        fill price and includes highs up to the previous bar (intrabar order is
+        unknown); hit when low <= stop, filled at min(open, stop).
+      - Exits are checked from the bar after the fill. If target and stop both
+        trigger in one bar, the stop wins (pessimistic) unless the bar opened
+        through the target.
+      - Anything still open at the session's last bar exits at its close ('eod').
+
+    Every signal's path to the end of its session is laid out as one row of a
+    2-D window, so all events are resolved with array ops (chunked for memory).
+    A first pass only looks first_window bars ahead; brackets still open are
+    re-run with a doubled window until the session end is covered.
+    Returns a DataFrame indexed by entry time with fill/exit times, prices,
+    reason and return.
+    """
+    profit_target_pct = config.PROFIT_TARGET_PCT if profit_target_pct is None else profit_target_pct
+    trail = (config.TRAILING_STOP_PCT if trail_pct is None else trail_pct) / 100
+
+    index = bars.index
+    o = bars['open'].to_numpy(dtype=float)
+    h = bars['high'].to_numpy(dtype=float)
+    l = bars['low'].to_numpy(dtype=float)
+    c = bars['close'].to_numpy(dtype=float)
+    n = len(bars)
+
+    # Session boundaries: last bar position of each bar's day
+    day_codes = index.normalize().asi8
+    session_end = np.searchsorted(day_codes, day_codes, side='right') - 1
+
+    entries = pd.DatetimeIndex(entries)
+    pos = index.get_indexer(entries)
+    if (pos < 0).any():
+        raise ValueError(f"{(pos < 0).sum()} entry times are not in the bar index")
+    m = len(pos)
+
+    fill_pos = np.full(m, -1, dtype=np.int64)
+    fill_px = np.full(m, np.nan)
+    exit_pos = np.full(m, -1, dtype=np.int64)
+    exit_px = np.full(m, np.nan)
+    reason = np.zeros(m, dtype=np.int64)  # 0 = unfilled
+
+    horizon = session_end[pos] - pos
+    pending = np.flatnonzero(horizon > 0)
+
+    # Most brackets resolve within minutes: start with a short window and
+    # re-run only the still-open ones with a doubled window each pass.
+    max_h = int(horizon.max(initial=0))
+    K = min(first_window, max_h)
+    while len(pending) and K > 0:
+        offsets = np.arange(1, K + 1)
+        size = chunk_size or max(1, 2_000_000 // K)
+        # Forward-window views (row i = bars i..i+K-1); row gathers are memcpy-fast
+        pad = lambda a: np.lib.stride_tricks.sliding_window_view(np.concatenate([a, np.full(K, a[-1])]), K)
+        vo, vh, vl = pad(o), pad(h), pad(l)
+        unresolved = []
+
+        for lo in range(0, len(pending), size):
+            ev = pending[lo:lo + size]
+            s, end = pos[ev], session_end[pos[ev]]
+            ref = c[s]
+            limit = ref * (1 + entry_limit_pct)
+            target = ref * (1 + profit_target_pct)
+
+            valid = offsets <= (end - s)[:, None]      # (E, K): bar s+k inside the session
+            wo, wh, wl = vo[s + 1], vh[s + 1], vl[s + 1]
+
+            # --- 1. Parent limit fill ---
+            fills = (wl <= limit[:, None]) & valid
+            filled = fills.any(axis=1)
+            f = fills.argmax(axis=1)                   # Offset index of fill bar
+            rows = np.arange(len(ev))
+            f_px = np.minimum(wo[rows, f], limit)
+
+            # --- 2. Exits from the bar after the fill ---
+            after = (offsets[None, :] - 1 > f[:, None]) & valid & filled[:, None]
+            # High-water mark: fill price, then highs through the previous bar
+            highs = np.where((offsets[None, :] - 1 >= f[:, None]) & valid, wh, -np.inf)
+            hwm = np.maximum(np.maximum.accumulate(highs, axis=1), f_px[:, None])
+            hwm = np.concatenate([f_px[:, None], hwm[:, :-1]], axis=1)
+            stop = hwm * (1 - trail)
+
+            stop_hit = (wl <= stop) & after
+            tgt_hit = (wh >= target[:, None]) & after
+            gap_tgt = tgt_hit & (wo >= target[:, None])
+            # Pessimistic: stop wins a shared bar unless it opened through target
+            tgt_first = tgt_hit & (~stop_hit | gap_tgt)
+            any_exit = stop_hit | tgt_first
+            has_exit = any_exit.any(axis=1)
+            x = any_exit.argmax(axis=1)
+            is_tgt = tgt_first[rows, x]
+
+            x_px = np.where(is_tgt, np.maximum(wo[rows, x], target), np.minimum(wo[rows, x], stop[rows, x]))
+            x_reason = np.where(is_tgt, 1, 2)
+
+            # --- 3. End of session ---
+            x_pos = np.where(has_exit, s + 1 + x, end)
+            x_px = np.where(has_exit, x_px, c[end])
+            x_reason = np.where(has_exit, x_reason, 3)
+
+            # Window did not reach the session end and nothing decided yet
+            done = (end - s <= K) | (filled & has_exit)
+            unresolved.append(ev[~done])
+            ev, filled = ev[done], filled[done]
+            fill_pos[ev] = np.where(filled, (s + 1 + f)[done], -1)
+            fill_px[ev] = np.where(filled, f_px[done], np.nan)
+            exit_pos[ev] = np.where(filled, x_pos[done], -1)
+            exit_px[ev] = np.where(filled, x_px[done], np.nan)
+            reason[ev] = np.where(filled, x_reason[done], 0)
+
+        pending = np.concatenate(unresolved)
+        K = min(2 * K, max_h) if K < max_h else 0
+
+    def times(p):
+        t = pd.Series(pd.NaT, index=entries, dtype=index.dtype)
+        t[p >= 0] = index[p[p >= 0]]
+        return t
+
+    out = pd.DataFrame(index=entries)
+    out['fill_time'] = times(fill_pos)
+    out['fill_price'] = fill_px
+    out['exit_time'] = times(exit_pos)
+    out['exit_price'] = exit_px
+    out['reason'] = EXIT_REASONS[reason]
+    out['ret'] = exit_px / fill_px - 1
+    return out
@@ -1,5 +1,6 @@
 # quant_v2/src/strategy/features.py
 import numpy as np
+from collections import deque
 import pandas as pd
 from src import config
 
@@ -85,4 +86,145 @@ def run_features_pipeline(target_symbol):
     print(f"  [SUCCESS] Saved Features: {output_path}")
     print(f"    Rows: {len(df_features)}")
     
-    return df_features
\ No newline at end of file
+    return df_features
+
+# Columns the live models are scored on (order matters for XGBoost)
+FEATURE_COLUMNS = [
+    'average', 'vwap', 'feat_dist_vwap', 'log_ret', 'feat_vol_15m',
+    'feat_vol_impact', 'feat_rsi_14', 'feat_spread_proxy'
+]
+
+class StreamingFeatures:
+    """
+    Incremental version of add_technical_features for live inference.
+    Keeps running VWAP sums, rolling return/volume windows and Wilder RSI
+    state so every new 1-min bar costs O(1) instead of a full recompute.
+    """
+    def __init__(self, vol_window=15, volume_window=20, rsi_alpha=1/14):
+        self.vol_window = vol_window
+        self.volume_window = volume_window
+        self.rsi_alpha = rsi_alpha
+
+        # VWAP (reset every session date)
+        self.session_date = None
+        self.cum_pv = 0.0
+        self.cum_vol = 0.0
+
+        # Rolling log-return window (sum / sum of squares)
+        self.rets = deque()
+        self.ret_sum = 0.0
+        self.ret_sumsq = 0.0
+
+        # Rolling volume window
+        self.vols = deque()
+        self.vol_sum = 0.0
+
+        # Wilder RSI state (EWM, adjust=False)
+        self.prev_close = None
+        self.avg_gain = None
+        self.avg_loss = None
+
+        self.last_ts = None
+
+    def seed(self, df):
+        """Warm up the state from a frame of historical OHLCV bars."""
+        cols = ['open', 'high', 'low', 'close', 'volume', 'average']
+        for ts, row in zip(df.index, df[cols].to_numpy(dtype=float)):
+            self._step(ts, *row, commit=True)
+        return self
+
+    def update(self, ts, bar):
+        """Commit a completed bar. Returns the feature row (or None while warming up)."""
+        return self._step(ts, *self._unpack(bar), commit=True)
+
+    def peek(self, ts, bar):
+        """Features for a bar that may still be forming, without committing it."""
+        return self._step(ts, *self._unpack(bar), commit=False)
+
+    @staticmethod
+    def _unpack(bar):
+        return (float(bar['open']), float(bar['high']), float(bar['low']),
+                float(bar['close']), float(bar['volume']), float(bar.get('average', np.nan)))
+
+    def _step(self, ts, o, h, l, c, v, average, commit):
+        # --- 1. VWAP ---
+        day = pd.Timestamp(ts).date()
+        if day != self.session_date:
+            cum_pv, cum_vol = 0.0, 0.0
+        else:
+            cum_pv, cum_vol = self.cum_pv, self.cum_vol
+        cum_pv += ((h + l + c) / 3) * v
+        cum_vol += v
+        vwap = cum_pv / cum_vol if cum_vol != 0 else np.nan
+
+        # --- 2. Volatility (rolling std of log-returns, ddof=1) ---
+        log_ret = np.log(c / self.prev_close) if self.prev_close is not None else np.nan
+        ret_sum, ret_sumsq, n_rets = self.ret_sum, self.ret_sumsq, len(self.rets)
+        if not np.isnan(log_ret):
+            ret_sum += log_ret
+            ret_sumsq += log_ret * log_ret
+            n_rets += 1
+            if n_rets > self.vol_window:
+                old = self.rets[0]
+                ret_sum -= old
+                ret_sumsq -= old * old
+                n_rets -= 1
+        vol_15m = np.nan
+        if n_rets == self.vol_window:
+            var = (ret_sumsq - ret_sum * ret_sum / n_rets) / (n_rets - 1)
+            vol_15m = np.sqrt(max(var, 0.0))
+
+        # --- 3. Volume Impact ---
+        vol_sum, n_vols = self.vol_sum + v, len(self.vols) + 1
+        if n_vols > self.volume_window:
+            vol_sum -= self.vols[0]
+            n_vols -= 1
+        vol_ma = vol_sum / n_vols if n_vols == self.volume_window else np.nan
+        vol_impact = (v / vol_ma) * (c - o) if vol_ma else np.nan
+
+        # --- 4. RSI (Wilder's smoothing) ---
+        delta = c - self.prev_close if self.prev_close is not None else 0.0
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        if self.avg_gain is None:
+            avg_gain, avg_loss = gain, loss
+        else:
+            a = self.rsi_alpha
+            avg_gain = (1 - a) * self.avg_gain + a * gain
+            avg_loss = (1 - a) * self.avg_loss + a * loss
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = np.float64(avg_gain) / np.float64(avg_loss)
+            rsi = 100 - (100 / (1 + rs))
+
+        if commit:
+            self.session_date, self.cum_pv, self.cum_vol = day, cum_pv, cum_vol
+            if not np.isnan(log_ret):
+                self.rets.append(log_ret)
+                if len(self.rets) > self.vol_window:
+                    self.rets.popleft()
+            self.ret_sum, self.ret_sumsq = ret_sum, ret_sumsq
+            self.vols.append(v)
+            if len(self.vols) > self.volume_window:
+                self.vols.popleft()
+            self.vol_sum = vol_sum
+            self.prev_close = c
+            self.avg_gain, self.avg_loss = avg_gain, avg_loss
+            self.last_ts = ts
+
+        row = {
+            'average': average,
+            'vwap': vwap,
+            'feat_dist_vwap': np.log(c / vwap),
+            'log_ret': log_ret,
+            'feat_vol_15m': vol_15m,
+            'feat_vol_impact': vol_impact,
+            'feat_rsi_14': rsi,
+            'feat_spread_proxy': (h - l) / c,
+        }
+        # Mirror the batch dropna(): no row until every window is warm
+        if any(pd.isna(x) for x in row.values()):
+            return None
+        return row
+
+    def to_frame(self, ts, row):
+        """Single-row DataFrame in the column order the models expect."""
+        return pd.DataFrame([row], index=pd.DatetimeIndex([ts], name='date'))[FEATURE_COLUMNS]
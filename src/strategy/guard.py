@@ -0,0 +1,130 @@
+# quant_v2/src/strategy/guard.py
+import datetime
+import pytz
+from ib_insync import *
+from src import config
+
+def _aware(ts):
+    """Bar times without a timezone are exchange (US/Eastern) time."""
+    return ts if ts.tzinfo is not None else pytz.timezone('US/Eastern').localize(ts)
+
+class MarketGuard:
+    """
+    Streaming Market Guard: every guard symbol must close above its EMA.
+    EMA state is seeded once from history and then advanced by one step per
+    closed bar, so reading the guard never touches the network.
+    Bars can come from an IB keepUpToDate subscription (attach) or from any
+    local bar aggregator calling on_bar().
+    """
+    def __init__(self, symbols=None, spans=None):
+        self.symbols = list(symbols or config.GUARD_SYMBOLS)
+        spans = spans or config.GUARD_EMA_SPANS
+        self.spans = {sym: spans.get(sym, 20) for sym in self.symbols}
+        self.subscriptions = {}
+        self.reset()
+
+    def reset(self):
+        """Drops all EMA state (e.g. after a reconnect)."""
+        self.ema = {}
+        self.last_close = {}
+        self.last_bar_time = {}
+        self.bars_seen = {sym: 0 for sym in self.symbols}
+        self.subscriptions = {}
+
+    # --- State updates ---
+    def on_bar(self, symbol, bar_time, close):
+        """Advances the EMA by one closed bar (older/duplicate bars are ignored)."""
+        if symbol not in self.spans:
+            return
+        bar_time = _aware(bar_time)
+        last = self.last_bar_time.get(symbol)
+        if last is not None and bar_time <= last:
+            return
+
+        alpha = 2 / (self.spans[symbol] + 1)
+        prev = self.ema.get(symbol)
+        self.ema[symbol] = close if prev is None else prev + alpha * (close - prev)
+        self.last_close[symbol] = close
+        self.last_bar_time[symbol] = bar_time
+        self.bars_seen[symbol] += 1
+
+    def forget(self, symbol):
+        """Drops one symbol's EMA state and subscription so the next attach() reseeds it."""
+        for state in (self.ema, self.last_close, self.last_bar_time, self.subscriptions):
+            state.pop(symbol, None)
+        self.bars_seen[symbol] = 0
+
+    def seed(self, symbol, bars):
+        for bar in bars:
+            self.on_bar(symbol, bar.date, bar.close)
+
+    # --- IB subscription ---
+    @property
+    def attached(self):
+        return len(self.subscriptions) == len(self.symbols)
+
+    def attach(self, ib, stream=True):
+        """
+        One keepUpToDate request per guard symbol: the initial bars seed the
+        EMA and every later 'new bar' event feeds the bar that just closed.
+        stream=False only seeds (closed bars then come from a local
+        aggregator through on_bar).
+        """
+        for symbol in self.symbols:
+            if symbol in self.subscriptions:
+                continue
+            contract = Stock(symbol, 'SMART', 'USD')
+            bars = ib.reqHistoricalData(
+                contract, endDateTime='', durationStr=config.GUARD_SEED_DURATION,
+                barSizeSetting=config.GUARD_BAR_SIZE, whatToShow='TRADES', useRTH=True,
+                keepUpToDate=stream, timeout=10
+            )
+            if not bars:
+                continue
+            self.seed(symbol, bars[:-1])  # Last bar is still forming
+            if stream:
+                bars.updateEvent += self._make_handler(symbol)
+            self.subscriptions[symbol] = bars
+
+    def detach(self, ib):
+        for bars in self.subscriptions.values():
+            try:
+                if bars.keepUpToDate: ib.cancelHistoricalData(bars)
+            except Exception: pass
+        self.reset()
+
+    def _make_handler(self, symbol):
+        def handler(bars, has_new_bar):
+            if has_new_bar and len(bars) >= 2:
+                closed = bars[-2]
+                self.on_bar(symbol, closed.date, closed.close)
+        return handler
+
+    # --- Read side (hot path, no I/O) ---
+    def statuses(self):
+        """{symbol: True/False/None} - None while there is not enough history."""
+        out = {}
+        for sym in self.symbols:
+            if self.bars_seen[sym] < self.spans[sym]:
+                out[sym] = None
+            else:
+                out[sym] = self.last_close[sym] > self.ema[sym]
+        return out
+
+    def age_minutes(self, now=None):
+        """
+        Age of the stalest guard symbol's last bar, so one dead feed makes
+        the whole guard stale. None while any symbol has no bar yet.
+        """
+        if any(self.last_bar_time.get(sym) is None for sym in self.symbols):
+            return None
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        oldest = min(_aware(self.last_bar_time[sym]) for sym in self.symbols)
+        return (now - oldest).total_seconds() / 60
+
+    def is_safe(self, now=None):
+        """THE DOUBLE LOCK: every guard symbol bullish and the state fresh."""
+        age = self.age_minutes(now)
+        if age is None or age > config.GUARD_MAX_STALENESS_MIN:
+            return False
+        return all(s is True for s in self.statuses().values())
@@ -1,5 +1,6 @@
 # quant_v2/src/strategy/kalman.py
 import numpy as np
+from collections import deque
 import pandas as pd
 from src import config
 import matplotlib.pyplot as plt
@@ -8,32 +9,120 @@ class KalmanFilterReg:
     """
     Online Kalman Filter for Dynamic Linear Regression.
     Updates regression coefficients (alpha, beta) on every new observation.
+
+    The 2-state problem is solved in closed form on plain floats (P is
+    symmetric, so only p00/p01/p11 are kept) - no per-step array allocation.
     """
     def __init__(self, delta=1e-5, R=1e-3):
         self.delta = delta # Process noise (adaptability)
         self.R = R         # Measurement noise (sensitivity)
         self.n_states = 2 
-        self.state_mean = np.zeros(self.n_states)
-        self.state_mean[1] = 1.0 # Initialize beta to 1.0
-        self.P = np.eye(self.n_states)
-        self.wt = self.delta / (1 - self.delta) * np.eye(self.n_states)
+        self.alpha = 0.0
+        self.beta = 1.0    # Initialize beta to 1.0
+        self.p00, self.p01, self.p11 = 1.0, 0.0, 1.0
+        self.q = self.delta / (1 - self.delta)
+
+    @property
+    def state_mean(self):
+        return np.array([self.alpha, self.beta])
+
+    @property
+    def P(self):
+        return np.array([[self.p00, self.p01], [self.p01, self.p11]])
 
     def update(self, y, x):
         # Time Update (Prediction)
-        self.P = self.P + self.wt
+        p00 = self.p00 + self.q
+        p01 = self.p01
+        p11 = self.p11 + self.q
         
         # Measurement Update (Correction)
-        H = np.array([1.0, x])
-        y_pred = H.dot(self.state_mean)
+        y_pred = self.alpha + self.beta * x
         error = y - y_pred
         
-        S = H.dot(self.P).dot(H.T) + self.R
-        K = self.P.dot(H.T) / S
+        ph0 = p00 + p01 * x   # P.H'
+        ph1 = p01 + p11 * x
+        S = ph0 + ph1 * x + self.R
+        k0, k1 = ph0 / S, ph1 / S
         
-        self.state_mean = self.state_mean + K * error
-        self.P = (np.eye(self.n_states) - np.outer(K, H)).dot(self.P)
+        self.alpha += k0 * error
+        self.beta += k1 * error
+        self.p00 = p00 - k0 * ph0
+        self.p01 = p01 - k0 * ph1
+        self.p11 = p11 - k1 * ph1
         
-        return y_pred, error, self.state_mean[0], self.state_mean[1]
+        return y_pred, error, self.alpha, self.beta
+
+class RollingZScore:
+    """
+    Streaming rolling z-score (O(1) per value) using running sum and sum of
+    squares over a fixed window. Matches pandas rolling mean / std (ddof=1).
+    """
+    def __init__(self, window=30):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, value):
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+        if len(self.values) < self.window:
+            return np.nan
+
+        n = self.window
+        mean = self.total / n
+        var = (self.total_sq - self.total * mean) / (n - 1)
+        if var <= 0:
+            return np.nan
+        return (value - mean) / np.sqrt(var)
+
+def kalman_filter_batch(y, x, delta=1e-4, R=1e-3):
+    """
+    Runs many independent filters at once as stacked arrays.
+    y, x: (T,) or (T, N) price paths (e.g. N pairs); delta, R: scalars or
+    (N,) arrays (e.g. a grid of settings on the same pair).
+    Returns model_price, spread, alpha, beta as (T, N) arrays.
+    """
+    y = np.asarray(y, dtype=float)
+    x = np.asarray(x, dtype=float)
+    y = y[:, None] if y.ndim == 1 else y
+    x = x[:, None] if x.ndim == 1 else x
+    q = np.asarray(delta, dtype=float) / (1 - np.asarray(delta, dtype=float))
+    R = np.asarray(R, dtype=float)
+
+    T = y.shape[0]
+    n = np.broadcast_shapes(y.shape[1:], x.shape[1:], q.shape, R.shape, (1,))[0]
+    y, x = np.broadcast_to(y, (T, n)), np.broadcast_to(x, (T, n))
+    q, R = np.broadcast_to(q, (n,)), np.broadcast_to(R, (n,))
+    alpha, beta = np.zeros(n), np.ones(n)
+    p00, p01, p11 = np.ones(n), np.zeros(n), np.ones(n)
+
+    out = {k: np.empty((T, n)) for k in ('model_price', 'spread', 'alpha', 'beta')}
+    for t in range(T):
+        xt = x[t]
+        p00 = p00 + q
+        p11 = p11 + q
+        y_pred = alpha + beta * xt
+        error = y[t] - y_pred
+        ph0 = p00 + p01 * xt
+        ph1 = p01 + p11 * xt
+        S = ph0 + ph1 * xt + R
+        k0, k1 = ph0 / S, ph1 / S
+        alpha = alpha + k0 * error
+        beta = beta + k1 * error
+        p00, p01, p11 = p00 - k0 * ph0, p01 - k0 * ph1, p11 - k1 * ph1
+
+        out['model_price'][t] = y_pred
+        out['spread'][t] = error
+        out['alpha'][t] = alpha
+        out['beta'][t] = beta
+    return out
 
 def run_kalman_on_pair(target_symbol):
     """
@@ -49,28 +138,22 @@ def run_kalman_on_pair(target_symbol):
     
     df = pd.read_parquet(file_path)
     kf = KalmanFilterReg(delta=1e-4, R=1e-3)
+    zs = RollingZScore(window=30) # Rolling window to normalize volatility
     
-    # Vectorize inputs for speed
-    obs_y = df['close_Y'].values
-    obs_x = df['close_X'].values
-    
-    preds, errors, alphas, betas = [], [], [], []
+    # Plain float inputs + preallocated outputs (no per-step allocation)
+    obs_y = df['close_Y'].to_numpy(dtype=float).tolist()
+    obs_x = df['close_X'].to_numpy(dtype=float).tolist()
+    out = np.empty((len(df), 5))
     
     for i in range(len(df)):
         y_pred, error, alpha, beta = kf.update(obs_y[i], obs_x[i])
-        preds.append(y_pred)
-        errors.append(error)
-        alphas.append(alpha)
-        betas.append(beta)
+        out[i] = (y_pred, error, alpha, beta, zs.update(error))
         
-    df['model_price'] = preds
-    df['spread'] = errors
-    df['alpha'] = alphas
-    df['beta'] = betas
-    
-    # Calculate Z-Score on a rolling window to normalize volatility
-    window = 30 
-    df['z_score'] = (df['spread'] - df['spread'].rolling(window).mean()) / df['spread'].rolling(window).std()
+    df['model_price'] = out[:, 0]
+    df['spread'] = out[:, 1]
+    df['alpha'] = out[:, 2]
+    df['beta'] = out[:, 3]
+    df['z_score'] = out[:, 4]
     
     df.dropna(inplace=True)
     
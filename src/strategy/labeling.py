@@ -3,76 +3,78 @@ import numpy as np
 import pandas as pd
 from src import config
 
-def get_triple_barrier_labels(prices, events, sl_tp_limits, vertical_barrier_bars=12):
+def get_triple_barrier_labels(prices, events, sl_tp_limits, vertical_barrier_bars=12, chunk_size=None):
     """
     Implements the Triple Barrier Method (Meta-Labeling).
     Determines if a trade hits Profit, Stop Loss, or Time Stop first.
+
+    Vectorized: every event's forward path (Entry+1 to Time Stop) is laid out
+    as a row of a 2-D window over the price array, so first touches for all
+    events are found at once. Events are processed in chunks to bound memory.
     """
+    index = prices.index
+    values = prices.to_numpy(dtype=float)
+    n = len(values)
+
     # Vertical Barrier (Time Stop)
-    # Find the timestamp N bars in the future for every event
-    t1 = prices.index.searchsorted(events + pd.Timedelta(minutes=5 * vertical_barrier_bars))
-    t1 = t1[t1 < prices.shape[0]] # Ensure index is valid
-    t1 = pd.Series(prices.index[t1], index=events[:len(t1)])
+    # Find the bar position N bars in the future for every event
+    t1 = index.searchsorted(events + pd.Timedelta(minutes=5 * vertical_barrier_bars))
+    t1 = t1[t1 < n] # Ensure index is valid
+    end_pos = np.full(len(events), n - 1, dtype=np.int64)
+    end_pos[:len(t1)] = t1
 
-    # Initialize output container
-    out = pd.DataFrame(index=events)
-    out['bin'] = np.nan        # 1 = Profit, 0 = Loss/Time
-    out['ret'] = np.nan        # Realized return
-    out['exit_time'] = pd.NaT  # Timestamp of exit
+    # Entry positions (-1 = event not in price index)
+    entry_pos = index.get_indexer(events)
 
     stop_loss = sl_tp_limits[0]
     take_profit = sl_tp_limits[1]
 
-    # Iterate Through Events
-    # Loop required to handle path dependency (SL vs TP order)
-    for loc, entry_time in enumerate(events):
-        if entry_time not in prices.index:
-            continue
+    # Events with a non-empty future path
+    valid = (entry_pos >= 0) & (end_pos > entry_pos)
+    ev = np.flatnonzero(valid)
 
-        entry_price = prices.loc[entry_time]
-        
-        # Determine max hold time (Vertical Barrier)
-        end_time = t1.loc[entry_time] if entry_time in t1.index else prices.index[-1]
-
-        # Slice future price path (Entry+1 to Time Stop)
-        path = prices.loc[entry_time:end_time].iloc[1:]
-
-        if path.empty:
-            continue
-
-        # Calculate returns relative to entry
-        path_rets = (path / entry_price) - 1
-
-        # Check Barriers
-        # Did we hit PT?
-        first_touch_pt = path_rets[path_rets >= take_profit].index.min()
-        # Did we hit SL?
-        first_touch_sl = path_rets[path_rets <= -stop_loss].index.min()
-
-        # Determine First Touch
-        exit_time = end_time   # Default: Time Stop
-        outcome = 0            # Default: Loss/Neutral
-
-        if pd.notna(first_touch_pt) and pd.notna(first_touch_sl):
-            if first_touch_pt < first_touch_sl:
-                exit_time = first_touch_pt
-                outcome = 1 # Win
-            else:
-                exit_time = first_touch_sl
-                outcome = 0 # Loss (SL hit first)
-        elif pd.notna(first_touch_pt):
-            exit_time = first_touch_pt
-            outcome = 1 # Win
-        elif pd.notna(first_touch_sl):
-            exit_time = first_touch_sl
-            outcome = 0 # Loss
-
-        # Record Result
-        realized_ret = (prices.loc[exit_time] / entry_price) - 1
-        
-        out.loc[entry_time, 'bin'] = int(outcome)
-        out.loc[entry_time, 'ret'] = realized_ret
-        out.loc[entry_time, 'exit_time'] = exit_time
+    out_bin = np.full(len(events), np.nan)
+    out_ret = np.full(len(events), np.nan)
+    out_exit = np.full(len(events), -1, dtype=np.int64)
+
+    if len(ev):
+        max_len = int((end_pos[ev] - entry_pos[ev]).max())
+        offsets = np.arange(1, max_len + 1)
+        if chunk_size is None:
+            chunk_size = max(1, 4_000_000 // max_len)
+
+        for lo in range(0, len(ev), chunk_size):
+            rows = ev[lo:lo + chunk_size]
+            start, stop = entry_pos[rows], end_pos[rows]
+            entry_price = values[start]
+
+            # 2-D forward window: one row per event, masked past its Time Stop
+            path_pos = start[:, None] + offsets
+            in_path = path_pos <= stop[:, None]
+            path_rets = values[np.minimum(path_pos, n - 1)] / entry_price[:, None] - 1
+
+            # First touch of each horizontal barrier (max_len = never touched)
+            pt_hits = (path_rets >= take_profit) & in_path
+            sl_hits = (path_rets <= -stop_loss) & in_path
+            first_pt = np.where(pt_hits.any(axis=1), pt_hits.argmax(axis=1), max_len)
+            first_sl = np.where(sl_hits.any(axis=1), sl_hits.argmax(axis=1), max_len)
+
+            # Determine First Touch (default: Time Stop, Loss/Neutral)
+            win = first_pt < first_sl
+            touched = np.minimum(first_pt, first_sl) < max_len
+            exit_pos = np.where(touched, start + 1 + np.minimum(first_pt, first_sl), stop)
+
+            out_bin[rows] = win.astype(float)
+            out_ret[rows] = values[exit_pos] / entry_price - 1
+            out_exit[rows] = exit_pos
+
+    # Initialize output container
+    out = pd.DataFrame(index=events)
+    out['bin'] = out_bin        # 1 = Profit, 0 = Loss/Time
+    out['ret'] = out_ret        # Realized return
+    exit_time = pd.Series(pd.NaT, index=events, dtype=index.dtype)
+    exit_time[out_exit >= 0] = index[out_exit[out_exit >= 0]]
+    out['exit_time'] = exit_time  # Timestamp of exit
 
     return out.dropna()
 
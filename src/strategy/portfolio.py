@@ -0,0 +1,159 @@
+# quant_v2/src/strategy/portfolio.py
+import heapq
+import json
+import numpy as np
+import pandas as pd
+from src import config
+from src.data import store
+
+def _ns(times):
+    """int64 UTC nanoseconds (parquet files may hold us-resolution times)."""
+    return pd.DatetimeIndex(times).as_unit('ns').asi8
+
+def entry_thresholds(symbols):
+    """
+    {symbol: entry threshold}: the one tuned jointly with the model
+    (models/<SYM>_params.json from tune_model.py) or ENTRY_THRESHOLD.
+    """
+    out = {}
+    for sym in symbols:
+        path = config.MODELS_DIR / f"{sym}_params.json"
+        tuned = json.loads(path.read_text()).get('entry_threshold') if path.exists() else None
+        out[sym] = float(tuned) if tuned is not None else config.ENTRY_THRESHOLD
+    return out
+
+def threshold_mask(panel, threshold=None):
+    """prob >= threshold per row; threshold is a float, a {symbol: threshold} dict or None (tuned per symbol)."""
+    if threshold is None:
+        threshold = entry_thresholds(panel['symbol'].unique())
+    if isinstance(threshold, dict):
+        limit = panel['symbol'].map(threshold).fillna(config.ENTRY_THRESHOLD).to_numpy(dtype=float)
+    else:
+        limit = threshold
+    return panel['prob'].to_numpy() >= limit
+
+def guard_series(index, symbols=None, spans=None, bar_size='5min'):
+    """
+    Market Guard state on a 1-min index, built the way MLTrader sees it:
+    every guard symbol's closed 5-min bar must be above its EMA. A 5-min bar
+    only counts once it has closed (T + bar_size <= decision time).
+    Guard symbols with no stored data are skipped with a warning.
+    """
+    symbols = symbols or config.GUARD_SYMBOLS
+    spans = spans or config.GUARD_EMA_SPANS
+    index = pd.DatetimeIndex(index).unique().sort_values()
+    safe = pd.Series(True, index=index)
+
+    used = []
+    for sym in symbols:
+        df = store.read_bars(sym, columns=['close'])
+        if df.empty:
+            print(f"  [!] Guard data missing for {sym}, skipping it.")
+            continue
+        bars = df['close'].resample(bar_size, label='left', closed='left').last().dropna()
+        ema = bars.ewm(span=spans.get(sym, 20), adjust=False).mean()
+        status = (bars > ema).to_frame('ok')
+        status['available'] = status.index + pd.Timedelta(bar_size)
+
+        # Decision for the 1-min bar labeled t is taken at t + 1min
+        decisions = pd.DataFrame({'t': index + pd.Timedelta(minutes=1)})
+        merged = pd.merge_asof(decisions, status.sort_values('available'), left_on='t', right_on='available')
+        safe &= merged['ok'].fillna(False).astype(bool).to_numpy()
+        used.append(sym)
+
+    if not used:
+        print("  [!] No guard data at all: guard treated as always safe.")
+    return safe
+
+def select_entries(panel, threshold=None, rsi_ceiling=75, cooldown_min=30,
+                   start_hour=None, end_hour=None):
+    """
+    Applies MLTrader's entry gating to a panel of candidate minutes.
+
+    panel: rows indexed by time with columns symbol, prob, market_safe,
+    feat_rsi_14 and exit_time. Threshold / guard / RSI / trading-hours are
+    vectorized masks. Ownership + cooldown (no entry until cooldown_min after
+    the previous exit) is resolved per symbol with precomputed 'next allowed
+    candidate' pointers, so the Python walk only touches accepted trades.
+    threshold=None uses each symbol's tuned entry threshold (entry_thresholds).
+    """
+    start_hour = config.TRADING_START_HOUR if start_hour is None else start_hour
+    end_hour = config.TRADING_END_HOUR if end_hour is None else end_hour
+
+    hours = panel.index.hour
+    mask = (
+        threshold_mask(panel, threshold)
+        & panel['market_safe'].to_numpy(dtype=bool)
+        & ~(panel['feat_rsi_14'].to_numpy() > rsi_ceiling)
+        & (hours >= start_hour) & (hours < end_hour)
+    )
+    cand = panel[mask]
+    if cand.empty:
+        return cand
+
+    cooldown = pd.Timedelta(minutes=cooldown_min).value
+    keep = []
+    for _, grp in cand.groupby('symbol', sort=False):
+        times = _ns(grp.index)
+        order = np.argsort(times, kind='stable')
+        times = times[order]
+        exits = _ns(grp['exit_time'])[order]
+
+        # next_idx[i]: first candidate allowed after taking candidate i
+        next_idx = np.searchsorted(times, np.maximum(exits, times) + cooldown, side='left')
+        i, taken = 0, []
+        while i < len(times):
+            taken.append(i)
+            i = next_idx[i]
+        keep.append(grp.iloc[order[taken]])
+
+    return pd.concat(keep).sort_index(kind='stable')
+
+def simulate_portfolio(trades, initial_equity=None, position_pct=None, commission=2.0):
+    """
+    Compounds trade returns at portfolio level. Each entry is sized at
+    position_pct of equity realized so far (closed trades only); P&L is
+    booked at exit_time. Returns (trades with size/pnl, equity curve).
+    """
+    initial_equity = config.FALLBACK_EQUITY if initial_equity is None else initial_equity
+    position_pct = config.POSITION_PCT if position_pct is None else position_pct
+
+    trades = trades.sort_index(kind='stable')
+    entries = _ns(trades.index)
+    exits = _ns(trades['exit_time'])
+    rets = trades['ret'].to_numpy(dtype=float)
+
+    equity = initial_equity
+    open_heap = []   # (exit_ns, pnl)
+    sizes = np.empty(len(trades))
+    pnls = np.empty(len(trades))
+    max_open = 0
+
+    for i in range(len(trades)):
+        while open_heap and open_heap[0][0] <= entries[i]:
+            equity += heapq.heappop(open_heap)[1]
+        sizes[i] = equity * position_pct
+        pnls[i] = sizes[i] * rets[i] - commission
+        heapq.heappush(open_heap, (exits[i], pnls[i]))
+        max_open = max(max_open, len(open_heap))
+
+    trades = trades.copy()
+    trades['size'] = sizes
+    trades['pnl'] = pnls
+    trades.attrs['max_open'] = max_open
+
+    curve = pd.Series(pnls, index=pd.DatetimeIndex(trades['exit_time'])).sort_index().cumsum() + initial_equity
+    return trades, curve
+
+def summarize(trades, curve, initial_equity=None):
+    initial_equity = config.FALLBACK_EQUITY if initial_equity is None else initial_equity
+    final = curve.iloc[-1] if len(curve) else initial_equity
+    drawdown = (curve / curve.cummax() - 1).min() if len(curve) else 0.0
+    return {
+        'final_equity': final,
+        'total_return': final / initial_equity - 1,
+        'trades': len(trades),
+        'win_rate': (trades['pnl'] > 0).mean() if len(trades) else 0.0,
+        'max_drawdown': drawdown,
+        'max_open': trades.attrs.get('max_open', 0),
+    }
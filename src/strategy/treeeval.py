@@ -0,0 +1,166 @@
+# quant_v2/src/strategy/treeeval.py
+import json
+import numpy as np
+
+class TreeEnsemble:
+    """
+    XGBoost binary:logistic booster flattened into NumPy arrays.
+
+    All trees' nodes live in one set of arrays (split feature, threshold,
+    left/right child as global node ids, default direction for missing
+    values, leaf value). Leaves point to themselves, so every row walks all
+    trees at once for max_depth steps with no per-tree Python loop.
+    predict()/inplace_predict() take a float32 [rows, features] array in
+    the booster's feature order and return probabilities, like
+    Booster.inplace_predict.
+    """
+    def __init__(self, feature, threshold, left, right, default_left, value, roots, depth,
+                 base_margin, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.base_margin = base_margin
+        self.feature_names = feature_names
+        self.num_features = int(feature.max()) + 1 if len(feature) else 0
+        # children[2 * node + went_right]: one gather per level instead of two
+        self.children = np.stack([left, right], axis=1).ravel().astype(np.int32)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_json(json.load(f))
+
+    @classmethod
+    def from_booster(cls, bst):
+        return cls.from_json(json.loads(bst.save_raw('json')))
+
+    @classmethod
+    def from_json(cls, model):
+        learner = model['learner']
+        if learner['objective']['name'] != 'binary:logistic':
+            raise ValueError(f"Unsupported objective {learner['objective']['name']}")
+        booster = learner['gradient_booster']
+        if booster['name'] != 'gbtree':
+            raise ValueError(f"Unsupported booster {booster['name']}")
+
+        # base_score is stored in probability space ('5E-1' or '[5E-1]')
+        base = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+        base_margin = np.log(base / (1 - base))
+
+        feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+        depth = 0
+        offset = 0
+        for tree in booster['model']['trees']:
+            if any(tree['split_type']):
+                raise ValueError("Categorical splits are not supported")
+            lc = np.asarray(tree['left_children'], dtype=np.int32)
+            rc = np.asarray(tree['right_children'], dtype=np.int32)
+            leaf = lc == -1
+            ids = np.arange(len(lc), dtype=np.int32)
+
+            feature.append(np.where(leaf, 0, tree['split_indices']).astype(np.int32))
+            cond = np.asarray(tree['split_conditions'], dtype=np.float32)
+            threshold.append(cond)
+            left.append(np.where(leaf, ids, lc) + offset)
+            right.append(np.where(leaf, ids, rc) + offset)
+            default_left.append(np.asarray(tree['default_left'], dtype=bool))
+            value.append(np.where(leaf, cond, 0).astype(np.float32))  # leaf value sits in split_conditions
+            roots.append(offset)
+
+            # Tree depth = longest parent chain
+            parents = np.asarray(tree['parents'], dtype=np.int64)
+            node_depth = np.zeros(len(lc), dtype=np.int32)
+            for i in range(1, len(lc)):  # parents precede children in XGBoost's layout
+                node_depth[i] = node_depth[parents[i]] + 1
+            depth = max(depth, int(node_depth.max()) if len(lc) else 0)
+            offset += len(lc)
+
+        return cls(
+            np.concatenate(feature), np.concatenate(threshold),
+            np.concatenate(left).astype(np.int32), np.concatenate(right).astype(np.int32),
+            np.concatenate(default_left), np.concatenate(value),
+            np.asarray(roots, dtype=np.int32), depth, np.float32(base_margin),
+            learner.get('feature_names') or None,
+        )
+
+    def predict_margin(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1 or len(X) == 1:
+            return self._margin_row(X.reshape(-1))[None]
+        n, n_feat = X.shape
+        flat = X.ravel()
+        idx_type = np.int32 if flat.size < 2 ** 31 else np.int64
+        row_off = (np.arange(n, dtype=idx_type) * idx_type(n_feat))[:, None]
+        has_nan = np.isnan(flat).any()
+
+        node = np.broadcast_to(self.roots, (n, len(self.roots)))
+        for _ in range(self.depth):
+            x = flat[row_off + self.feature[node]]
+            # XGBoost: go left if x < threshold; NaN follows the default direction
+            right = ~(x < self.threshold[node])
+            if has_nan:
+                right = np.where(np.isnan(x), ~self.default_left[node], right)
+            node = self.children[2 * node + right]
+        return self.value[node].sum(axis=1, dtype=np.float32) + self.base_margin
+
+    def _margin_row(self, x_row):
+        """Single-row path: 1-D arrays over the trees, fewest NumPy calls."""
+        has_nan = np.isnan(x_row).any()
+        node = self.roots
+        for _ in range(self.depth):
+            x = x_row[self.feature[node]]
+            right = ~(x < self.threshold[node])
+            if has_nan:
+                right = np.where(np.isnan(x), ~self.default_left[node], right)
+            node = self.children[2 * node + right]
+        return self.value[node].sum(dtype=np.float32) + self.base_margin
+
+    def predict(self, X):
+        return (1.0 / (1.0 + np.exp(-self.predict_margin(X)))).astype(np.float32)
+
+    inplace_predict = predict  # Drop-in for Booster.inplace_predict(X)
+
+if __name__ == "__main__":
+    # Parity + latency benchmark against xgboost on a saved model
+    import sys
+    import time
+    import pandas as pd
+    import xgboost as xgb
+    from src import config
+
+    symbol = sys.argv[1] if len(sys.argv) > 1 else config.ACTIVE_TRADING_LIST[0]
+    model_path = config.MODELS_DIR / f"{symbol}_xgb.json"
+    bst = xgb.Booster()
+    bst.load_model(str(model_path))
+    ens = TreeEnsemble.load(model_path)
+
+    df = pd.read_parquet(config.DATA_PROCESSED / f"{symbol}_labeled.parquet")
+    X = df[bst.feature_names].to_numpy(dtype=np.float32)
+    X_nan = X.copy()
+    X_nan[np.random.default_rng(0).random(X.shape) < 0.1] = np.nan
+
+    print(f"--> {symbol}: {len(ens.roots)} trees, depth {ens.depth}, {len(X)} rows")
+    for name, data in [('dense', X), ('10% missing', X_nan)]:
+        ref = bst.predict(xgb.DMatrix(data, feature_names=bst.feature_names))
+        diff = np.abs(ens.predict(data) - ref).max()
+        print(f"  [{'+' if diff < 1e-5 else '!'}] {name:<12} max |diff| vs Booster.predict: {diff:.2e}")
+
+    def bench(fn, data, reps):
+        fn(data)
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            fn(data)
+        return (time.perf_counter() - t0) / reps * 1e6
+
+    print(f"\n  {'rows':>6} | {'xgboost us':>11} | {'numpy us':>9} | speedup")
+    for rows in [1, 6, 120, 1000, 10000]:
+        data = X[:rows]
+        reps = max(5, 20000 // rows)
+        t_xgb = bench(bst.inplace_predict, data, reps)
+        t_np = bench(ens.predict, data, reps)
+        print(f"  {rows:>6} | {t_xgb:>11.1f} | {t_np:>9.1f} | {t_xgb / t_np:.1f}x")
@@ -0,0 +1,68 @@
+# quant_v2/src/strategy/validation.py
+import numpy as np
+import pandas as pd
+
+def _ns(times):
+    return pd.DatetimeIndex(times).as_unit('ns').asi8
+
+def purge_before(times, exit_times, boundary, embargo_min=0):
+    """
+    Positions whose label is fully resolved (exit_time + embargo) before
+    `boundary`. Rows with a missing exit_time are dropped as unresolved.
+    """
+    exits = _ns(exit_times)
+    ok = exits != np.iinfo(np.int64).min  # NaT
+    limit = pd.Timestamp(boundary).as_unit('ns').value - pd.Timedelta(minutes=embargo_min).value
+    return np.flatnonzero(ok & (exits < limit) & (_ns(times) < limit))
+
+def walk_forward_folds(times, exit_times, n_folds=5, mode='expanding', train_blocks=None, embargo_min=0):
+    """
+    Walk-forward splits over time-sorted rows.
+
+    Rows are cut into n_folds + 1 contiguous blocks; fold k tests on block
+    k + 1 and trains on the blocks before it (all of them when expanding,
+    the last `train_blocks` when rolling). Training rows whose label
+    (entry -> exit_time) reaches into the test block, or into the embargo
+    gap before it, are purged.
+
+    Returns a list of dicts: fold, train (positions), test (positions),
+    purged (rows dropped from the training span).
+    """
+    times = pd.DatetimeIndex(times)
+    n = len(times)
+    bounds = np.linspace(0, n, n_folds + 2).astype(int)
+    if mode == 'rolling':
+        train_blocks = train_blocks or 1
+    elif mode != 'expanding':
+        raise ValueError(f"Unknown walk-forward mode '{mode}'")
+
+    folds = []
+    for k in range(n_folds):
+        test_lo, test_hi = bounds[k + 1], bounds[k + 2]
+        train_lo = 0 if mode == 'expanding' else bounds[max(0, k + 1 - train_blocks)]
+        if test_hi <= test_lo or test_lo <= train_lo:
+            continue
+        span = slice(train_lo, test_lo)
+        keep = purge_before(times[span], exit_times[span], times[test_lo], embargo_min)
+        folds.append({
+            'fold': k,
+            'train': keep + train_lo,
+            'test': np.arange(test_lo, test_hi),
+            'purged': (test_lo - train_lo) - len(keep),
+        })
+    return folds
+
+def inner_split(train_idx, times, exit_times, val_frac=0.2, embargo_min=0):
+    """
+    Splits a fold's training positions into (fit, validation): validation is
+    the newest val_frac of them, fit is the rest purged + embargoed against
+    it. Used to pick the round count without looking at the test block.
+    """
+    train_idx = np.asarray(train_idx)
+    cut = int(len(train_idx) * (1 - val_frac))
+    if cut <= 0 or cut >= len(train_idx):
+        return train_idx, train_idx[:0]
+    head, val = train_idx[:cut], train_idx[cut:]
+    times, exit_times = pd.DatetimeIndex(times), pd.DatetimeIndex(exit_times)
+    keep = purge_before(times[head], exit_times[head], times[val[0]], embargo_min)
+    return head[keep], val
@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+
+# Tests import the project the same way the scripts do (from src import ...)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+def make_labeled(n=3000, wins=True, seed=0):
+    """Small labeled frame shaped like data/processed/<SYM>_labeled.parquet."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2025-03-03 09:30', periods=n, freq='min', name='date')
+    x = rng.normal(size=n)
+    return pd.DataFrame({
+        'feat_a': x, 'feat_b': rng.normal(size=n),
+        'bin': ((x + rng.normal(0, 0.5, n) > 0) & wins).astype(int),
+        'ret': rng.normal(0, 0.01, n),
+        'exit_time': index + pd.Timedelta(minutes=5),
+    }, index=index)
+
+@pytest.fixture
+def labeled():
+    return make_labeled
@@ -0,0 +1,97 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src.alerts import AlertDispatcher
+
+class Webhook:
+    """Local Discord webhook stand-in. `replies` is consumed one per call, then 204s."""
+    def __init__(self):
+        self.received, self.calls, self.replies = [], 0, []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.hit = threading.Event()
+        hook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                hook.calls += 1
+                hook.hit.set()
+                hook.gate.wait(10)
+                status, headers, payload = hook.replies.pop(0) if hook.replies else (204, {}, b"")
+                if status < 300:
+                    hook.received.append(body["embeds"])
+                self.send_response(status)
+                for k, v in {**headers, "Content-Length": str(len(payload))}.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/webhook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+@pytest.fixture
+def hook():
+    h = Webhook()
+    yield h
+    h.gate.set()
+    h.server.shutdown()
+
+def embed(i):
+    return {"title": f"Alert {i}"}
+
+def test_429_waits_retry_after_and_delivers(hook):
+    hook.replies = [(429, {}, json.dumps({"retry_after": 0.05}).encode())]
+    alerts = AlertDispatcher(url=hook.url, batch_window=0.0, max_retries=0)
+    alerts.send(embed(0))
+    alerts.close(timeout=5)
+    assert hook.calls == 2
+    assert alerts.sent == 1 and alerts.failed == 0
+
+def test_burst_is_coalesced_into_one_message(hook):
+    alerts = AlertDispatcher(url=hook.url, batch_window=0.3)
+    for i in range(5):
+        alerts.send(embed(i))
+    alerts.close(timeout=5)
+    assert hook.calls == 1
+    assert [e["title"] for e in hook.received[0]] == [f"Alert {i}" for i in range(5)]
+
+def test_overflow_becomes_one_drop_notice(hook):
+    alerts = AlertDispatcher(url=hook.url, maxsize=2, batch_window=0.0)
+    hook.gate.clear()                  # Webhook hangs on the first message
+    alerts.send(embed(0))
+    assert hook.hit.wait(5)
+    results = [alerts.send(embed(i)) for i in range(1, 11)]
+    assert results.count(False) == 8
+    hook.gate.set()
+    alerts.close(timeout=5)
+    titles = [e["title"] for msg in hook.received for e in msg]
+    notices = [e for msg in hook.received for e in msg if "DROPPED" in e["title"]]
+    assert [t for t in titles if "DROPPED" not in t] == ["Alert 0", "Alert 1", "Alert 2"]
+    assert len(notices) == 1 and notices[0]["description"].startswith("8 alert(s)")
+    assert alerts.sent == 4 and alerts.dropped == 0
+
+def test_close_drains_the_queue(hook):
+    alerts = AlertDispatcher(url=hook.url, batch_window=0.0)
+    for i in range(25):
+        alerts.send(embed(i))
+    alerts.close(timeout=10)
+    assert alerts.queue.unfinished_tasks == 0
+    assert sum(map(len, hook.received)) == alerts.sent == 25
+
+def test_worker_survives_bad_batches(hook):
+    hook.replies = [(204, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "soon"}, b"")]
+    alerts = AlertDispatcher(url=hook.url, batch_window=0.0)
+    alerts.send(embed(0))                       # Garbage rate-limit header
+    alerts.flush(timeout=5)
+    alerts.send({"title": "bad", "when": object()})  # Not JSON encodable
+    alerts.flush(timeout=5)
+    alerts.send(embed(1))
+    alerts.close(timeout=5)
+    assert alerts.failed == 1
+    assert [msg[0]["title"] for msg in hook.received] == ["Alert 0", "Alert 1"]
@@ -0,0 +1,23 @@
+import pandas as pd
+from src.data import backfill
+
+def test_windows_are_stable_across_run_days():
+    monday = backfill.plan_windows('2024-01-01', '2025-03-03', days=10)
+    tuesday = backfill.plan_windows('2024-01-02', '2025-03-04', days=10)
+    # Only the clipped edge windows may differ
+    keys = lambda ws: {backfill.window_key(w) for w in ws[1:-1]}
+    assert keys(monday) == keys(tuesday)
+
+def test_windows_cover_range_without_overlap():
+    windows = backfill.plan_windows('2024-01-01', '2024-03-15', days=7)
+    days = [d for w in windows for d in pd.date_range(w[0], w[1])]
+    assert sorted(days) == list(pd.date_range('2024-01-01', '2024-03-15'))
+    assert all(w[1] - w[0] < pd.Timedelta(days=7) for w in windows)
+    assert windows == sorted(windows, reverse=True)
+
+def test_resume_on_later_day_skips_checkpointed_windows():
+    first = backfill.plan_windows('2024-01-01', '2024-06-28', days=10)
+    done = {backfill.window_key(w) for w in first[1:]}  # Last (partial) window not checkpointed
+    later = backfill.plan_windows('2024-01-05', '2024-07-10', days=10)
+    todo = [w for w in later if not backfill.is_done(w, done)]
+    assert all(w[1] >= first[0][0] for w in todo)
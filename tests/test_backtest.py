@@ -0,0 +1,28 @@
+import numpy as np
+import xgboost as xgb
+import backtest
+import train_model
+from src import config
+
+def setup(tmp_path, monkeypatch, labeled, trained_until):
+    monkeypatch.setattr(config, 'DATA_PROCESSED', tmp_path)
+    monkeypatch.setattr(config, 'MODELS_DIR', tmp_path / "models")
+    monkeypatch.setattr(config, 'PROJECT_ROOT', tmp_path)
+    monkeypatch.setattr(config, 'PRED_CACHE', tmp_path / "predictions")
+    df = labeled(1000).rename(columns={'feat_b': 'feat_rsi_14'})
+    df.to_parquet(tmp_path / "AAA_labeled.parquet")
+    model = xgb.XGBClassifier(n_estimators=5, max_depth=2)
+    model.fit(df[['feat_a', 'feat_rsi_14']].to_numpy(dtype=np.float32), df['bin'])
+    train_model.save_model(model, 'AAA', trained_until(df.index))
+    return df
+
+def test_panel_is_the_holdout(tmp_path, monkeypatch, labeled):
+    df = setup(tmp_path, monkeypatch, labeled, lambda index: index[800])
+    panel = backtest.load_panel(['AAA'])
+    assert len(panel) == int(len(df) * config.HOLDOUT_FRAC)
+    assert panel.index[0] == df.index[800]
+
+def test_panel_skips_rows_a_refresh_trained_on(tmp_path, monkeypatch, labeled):
+    df = setup(tmp_path, monkeypatch, labeled, lambda index: index[900])
+    panel = backtest.load_panel(['AAA'])
+    assert panel.index[0] == df.index[900] and len(panel) == 100
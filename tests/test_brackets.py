@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.strategy.brackets import simulate_brackets
+
+def brute_force(bars, entries, entry_limit_pct, target_pct, trail_pct):
+    """Per-bar walk of the same bracket rules (see simulate_brackets)."""
+    o, h, l, c = (bars[k].to_numpy() for k in ('open', 'high', 'low', 'close'))
+    days = bars.index.normalize()
+    out = {}
+    for t in entries:
+        s = bars.index.get_loc(t)
+        end = np.flatnonzero(days == days[s])[-1]
+        limit, target = c[s] * (1 + entry_limit_pct), c[s] * (1 + target_pct)
+        fill = next((k for k in range(s + 1, end + 1) if l[k] <= limit), None)
+        if fill is None:
+            out[t] = ('unfilled', None, None)
+            continue
+        f_px = min(o[fill], limit)
+        hwm = max(f_px, h[fill])
+        result = ('eod', end, c[end])
+        for k in range(fill + 1, end + 1):
+            stop = hwm * (1 - trail_pct / 100)
+            stop_hit, tgt_hit = l[k] <= stop, h[k] >= target
+            if tgt_hit and (not stop_hit or o[k] >= target):
+                result = ('target', k, max(o[k], target))
+                break
+            if stop_hit:
+                result = ('trail', k, min(o[k], stop))
+                break
+            hwm = max(hwm, h[k])
+        out[t] = (result[0], result[1], result[2], fill, f_px)
+    return out
+
+def random_bars(days=3, per_day=80, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.DatetimeIndex([t for d in pd.bdate_range('2025-03-03', periods=days)
+                              for t in pd.date_range(d + pd.Timedelta('9h30min'), periods=per_day, freq='min')])
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 2e-3, len(index))))
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 5e-4, len(index)))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 2e-3, len(index)))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 2e-3, len(index)))
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close}, index=index)
+
+def compare(bars, entries, limit_pct, target_pct, trail_pct, **kw):
+    got = simulate_brackets(bars, entries, limit_pct, target_pct, trail_pct, **kw)
+    ref = brute_force(bars, entries, limit_pct, target_pct, trail_pct)
+    for t, r in ref.items():
+        row = got.loc[t]
+        assert row['reason'] == r[0], t
+        if r[0] == 'unfilled':
+            assert pd.isna(row['fill_time']) and pd.isna(row['exit_time'])
+            continue
+        assert row['exit_time'] == bars.index[r[1]] and row['fill_time'] == bars.index[r[3]]
+        assert row['exit_price'] == pytest.approx(r[2], rel=1e-12)
+        assert row['fill_price'] == pytest.approx(r[4], rel=1e-12)
+    return got
+
+@pytest.mark.parametrize('limit_pct, target_pct, trail_pct', [(0.0, 0.004, 0.3), (0.001, 0.01, 0.8), (-0.002, 0.05, 0.1)])
+@pytest.mark.parametrize('first_window, chunk_size', [(30, None), (2, 17)])
+def test_matches_per_bar_loop(limit_pct, target_pct, trail_pct, first_window, chunk_size):
+    bars = random_bars()
+    got = compare(bars, bars.index, limit_pct, target_pct, trail_pct,
+                  first_window=first_window, chunk_size=chunk_size)
+    assert got['reason'].iloc[-1] == 'unfilled'      # Last bar of the session: no later bar to fill on
+
+def test_all_exit_reasons_show_up():
+    bars = random_bars(seed=1)
+    got = compare(bars, bars.index, 0.0, 0.004, 0.3, first_window=4)
+    assert set(got['reason']) == {'unfilled', 'target', 'trail', 'eod'}
+
+def frame(rows, start='2025-03-03 09:30'):
+    return pd.DataFrame(rows, columns=['open', 'high', 'low', 'close'], dtype=float,
+                        index=pd.date_range(start, periods=len(rows), freq='min'))
+
+def test_shared_bar_goes_to_the_stop_unless_it_gapped_through_target():
+    # Signal at 100, fill on bar 1 at 100; bar 2 touches both the 1% target and the 0.5% trail
+    both = frame([[100, 100, 100, 100], [100, 100.2, 99.9, 100], [100, 101.5, 99.0, 100], [100, 100, 100, 100]])
+    got = compare(both, both.index[:1], 0.0, 0.01, 0.5)
+    assert got['reason'].iloc[0] == 'trail' and got['exit_price'].iloc[0] == pytest.approx(100.2 * 0.995)
+
+    gapped = both.copy()
+    gapped.iloc[2] = [101.2, 101.5, 99.0, 100]
+    got = compare(gapped, gapped.index[:1], 0.0, 0.01, 0.5)
+    assert got['reason'].iloc[0] == 'target' and got['exit_price'].iloc[0] == pytest.approx(101.2)
+
+def test_never_resolved_exits_at_session_close():
+    flat = frame([[100, 100.05, 99.98, 100]] * 50)
+    got = compare(flat, flat.index[:3], 0.0, 0.05, 1.0, first_window=2)
+    assert (got['reason'] == 'eod').all() and (got['exit_time'] == flat.index[-1]).all()
+    got = compare(flat, flat.index[:5], -0.01, 0.05, 1.0)   # Limit 1% under: never fills
+    assert (got['reason'] == 'unfilled').all()
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from src.strategy import features
+
+def make_bars(days=2, seed=0):
+    rng = np.random.default_rng(seed)
+    index = []
+    for day in pd.bdate_range('2025-03-03', periods=days):
+        index.extend(pd.date_range(day + pd.Timedelta(hours=9, minutes=30), periods=390, freq='1min'))
+    n = len(index)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.0003, n))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.001, n))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.001, n))
+    volume = rng.integers(100, 5000, n).astype(float)
+    return pd.DataFrame({
+        'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume,
+        'average': (high + low + close) / 3,
+    }, index=pd.DatetimeIndex(index, name='date'))
+
+def test_streaming_matches_batch_bar_by_bar():
+    df = make_bars()
+    batch = features.add_technical_features(df)[features.FEATURE_COLUMNS]
+
+    engine = features.StreamingFeatures().seed(df.iloc[:100])
+    rows = {}
+    for ts, bar in df.iloc[100:].iterrows():
+        row = engine.update(ts, bar)
+        if row is not None:
+            rows[ts] = row
+    stream = pd.DataFrame.from_dict(rows, orient='index')[features.FEATURE_COLUMNS]
+
+    expected = batch.loc[batch.index >= df.index[100]]
+    assert list(stream.index) == list(expected.index)
+    np.testing.assert_allclose(stream.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-12)
+
+def test_warmup_rows_match_batch_dropna():
+    df = make_bars(days=1)
+    batch = features.add_technical_features(df)
+    engine = features.StreamingFeatures()
+    emitted = [ts for ts, bar in df.iterrows() if engine.update(ts, bar) is not None]
+    assert emitted == list(batch.index)
+
+def test_peek_on_forming_bar_matches_batch_and_does_not_commit():
+    df = make_bars()
+    engine = features.StreamingFeatures().seed(df.iloc[:-1])
+    last_ts, forming = df.index[-1], df.iloc[-1].copy()
+
+    # Partial bar first: peek must not touch the committed state
+    partial = forming.copy()
+    partial[['close', 'volume']] = [partial['open'], partial['volume'] / 3]
+    engine.peek(last_ts, partial)
+    assert engine.last_ts == df.index[-2]
+
+    row = engine.to_frame(last_ts, engine.peek(last_ts, forming))
+    expected = features.add_technical_features(df)[features.FEATURE_COLUMNS].iloc[[-1]]
+    np.testing.assert_allclose(row.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-12)
+
+    # Committing the same bar afterwards gives the same row
+    committed = engine.to_frame(last_ts, engine.update(last_ts, forming))
+    np.testing.assert_allclose(committed.to_numpy(), row.to_numpy(), rtol=0, atol=0)
+    assert engine.last_ts == last_ts
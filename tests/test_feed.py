@@ -0,0 +1,75 @@
+import datetime
+import numpy as np
+import pandas as pd
+import pytz
+from src.data.feed import Bar, MarketDataFeed, ReplayFeed, split_bars
+
+NY = pytz.timezone('US/Eastern')
+COLS = ['open', 'high', 'low', 'close', 'volume']
+
+def minute_bars(n=30, start='2025-03-03 09:30'):
+    rng = np.random.default_rng(0)
+    close = 100 + np.cumsum(rng.normal(0, 0.1, n))
+    open_ = np.r_[100.0, close[:-1]]
+    df = pd.DataFrame({
+        'open': open_, 'close': close,
+        'high': np.maximum(open_, close) + 0.05, 'low': np.minimum(open_, close) - 0.05,
+        'volume': rng.integers(1_000, 5_000, n).astype(float),
+    }, index=pd.date_range(start, periods=n, freq='min', tz=NY, name='date'))
+    df['average'] = (df['high'] + df['low'] + df['close']) / 3
+    return df
+
+def make_feed():
+    feed = MarketDataFeed(['AAA'], bar_sizes=[60, 300])
+    closed = {60: [], 300: []}
+    for size in closed:
+        feed.barCloseEvent[size] += lambda sym, bar, size=size: closed[size].append(bar.date)
+    return feed, closed
+
+def five_sec(start, n):
+    """n flat 5-second bars from start (HH:MM:SS on the test day)."""
+    t0 = NY.localize(datetime.datetime.strptime(f'2025-03-03 {start}', '%Y-%m-%d %H:%M:%S'))
+    return [Bar(t0 + datetime.timedelta(seconds=5 * i), 100.0, 100.0, 100.0, 100.0, 10.0, 100.0) for i in range(n)]
+
+def play(feed, bars):
+    for bar in bars:
+        feed.on_realtime_bar('AAA', bar)
+
+def test_replay_rebuilds_stored_bars():
+    src = minute_bars()
+    feed, closed = make_feed()
+    n = ReplayFeed(feed, {'AAA': src}).run()
+    assert n == len(split_bars(src)) == 12 * len(src)
+
+    built = feed.frame('AAA', 60)
+    assert np.allclose(built[COLS].to_numpy(), src[COLS].to_numpy())
+    ref5 = src.resample('5min').agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+    assert np.allclose(feed.frame('AAA', 300)[COLS].to_numpy(), ref5[COLS].to_numpy())
+    assert len(closed[60]) == 30 and len(closed[300]) == 6
+
+def test_bar_with_a_hole_is_not_emitted():
+    feed, closed = make_feed()
+    bars = five_sec('09:30:00', 24)
+    del bars[5]                        # 09:30:25 never arrived
+    play(feed, bars)
+    assert [t.strftime('%H:%M') for t in closed[60]] == ['09:31']
+
+def test_bar_missing_its_last_sub_bars_is_not_emitted():
+    feed, closed = make_feed()
+    bars = five_sec('09:30:00', 24)
+    del bars[10:12]                    # 09:30:50 and :55 lost, next minute closes it
+    play(feed, bars)
+    assert [t.strftime('%H:%M') for t in closed[60]] == ['09:31']
+    assert feed.latest('AAA', 60).volume == 120
+
+def test_mid_bar_join_drops_partial_bars_at_every_size():
+    feed, closed = make_feed()
+    play(feed, five_sec('09:30:20', 12 * 10 - 4))   # Joined 20s into 09:30, runs to 09:40
+    assert closed[60][0].strftime('%H:%M') == '09:31'
+    assert [t.strftime('%H:%M') for t in closed[300]] == ['09:35']  # 09:30 bucket lacks its first minute
+
+def test_duplicate_sub_bar_is_ignored():
+    feed, closed = make_feed()
+    bars = five_sec('09:30:00', 12)
+    play(feed, bars[:6] + [bars[5]] + bars[6:])
+    assert feed.latest('AAA', 60).volume == 120
@@ -0,0 +1,52 @@
+import datetime
+import pytz
+from src.strategy.guard import MarketGuard
+
+NY = pytz.timezone('US/Eastern')
+
+def feed(guard, symbol, start, n, step=1.0):
+    for i in range(n):
+        guard.on_bar(symbol, start + datetime.timedelta(minutes=5 * i), 100 + step * i)
+
+def test_safe_when_all_symbols_fresh_and_bullish():
+    guard = MarketGuard(['SPY', 'QQQ'], {'SPY': 3, 'QQQ': 3})
+    start = NY.localize(datetime.datetime(2025, 3, 3, 10, 0))
+    feed(guard, 'SPY', start, 10)
+    feed(guard, 'QQQ', start, 10)
+    now = start + datetime.timedelta(minutes=50)
+    assert guard.is_safe(now)
+
+def test_one_dead_symbol_makes_guard_stale():
+    guard = MarketGuard(['SPY', 'QQQ'], {'SPY': 3, 'QQQ': 3})
+    start = NY.localize(datetime.datetime(2025, 3, 3, 10, 0))
+    feed(guard, 'SPY', start, 30)   # Keeps ticking until 12:25
+    feed(guard, 'QQQ', start, 10)   # Went quiet after 10:45
+    now = start + datetime.timedelta(minutes=150)
+    assert guard.age_minutes(now) == 105
+    assert not guard.is_safe(now)
+
+def test_missing_symbol_is_unsafe():
+    guard = MarketGuard(['SPY', 'QQQ'], {'SPY': 3, 'QQQ': 3})
+    start = NY.localize(datetime.datetime(2025, 3, 3, 10, 0))
+    feed(guard, 'SPY', start, 10)
+    assert guard.age_minutes(start) is None
+    assert not guard.is_safe(start + datetime.timedelta(minutes=50))
+
+def test_naive_bar_times_are_exchange_time():
+    guard = MarketGuard(['SPY'], {'SPY': 3})
+    feed(guard, 'SPY', datetime.datetime(2025, 3, 3, 10, 0), 10)
+    now = NY.localize(datetime.datetime(2025, 3, 3, 10, 50))
+    assert guard.age_minutes(now) == 5
+    assert guard.is_safe(now)
+
+def test_forget_drops_one_symbol_for_reseed():
+    guard = MarketGuard(['SPY', 'QQQ'], {'SPY': 3, 'QQQ': 3})
+    start = NY.localize(datetime.datetime(2025, 3, 3, 10, 0))
+    feed(guard, 'SPY', start, 10)
+    feed(guard, 'QQQ', start, 10)
+    guard.subscriptions = {'SPY': object(), 'QQQ': object()}
+    guard.forget('QQQ')
+    assert not guard.attached
+    assert guard.statuses()['QQQ'] is None and guard.statuses()['SPY'] is not None
+    feed(guard, 'QQQ', start, 10)   # Reseed can replay bars it had already seen
+    assert guard.bars_seen['QQQ'] == 10
@@ -0,0 +1,42 @@
+import asyncio
+from src import config
+from src.data import ingest, store
+from src.data.fake_ib import FakeIB
+
+class PinnedIB(FakeIB):
+    """'Now' is a fixed Wednesday after the close, so the bars don't depend on the wall clock."""
+    async def reqHistoricalDataAsync(self, contract, endDateTime, *args, **kwargs):
+        return await super().reqHistoricalDataAsync(contract, endDateTime or '20250305 17:00:00', *args, **kwargs)
+
+def setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'BAR_STORE', tmp_path)
+    monkeypatch.setattr(config, 'DATA_RAW', tmp_path)  # No legacy CSVs to import
+    monkeypatch.setattr(config, 'DURATION', '2 D')
+    monkeypatch.setattr(config, 'HIST_RETRY_BACKOFF', 0.01)
+    monkeypatch.setattr(config, 'HIST_MAX_RETRIES', 6)
+
+def test_download_stays_under_the_pacing_limit(tmp_path, monkeypatch):
+    setup(tmp_path, monkeypatch)
+    # Scaled-down IBKR rule: 12 requests per 1s window
+    ib = PinnedIB(latency=0.02, jitter=0.01, pacing_requests=12, pacing_window=1.0)
+    pacer = ingest.TokenBucket.for_ibkr(requests=12, window=1.0, burst=4)
+    symbols = [f"SYM{i:02d}" for i in range(20)]
+    results = asyncio.run(ingest.fetch_data_async(symbols, ib=ib, pacer=pacer, max_in_flight=4))
+
+    stats = ib.stats()
+    assert stats['violations'] == 0
+    assert stats['max_in_window'] <= 12
+    assert stats['peak_in_flight'] <= 4
+    assert all(results[s] > 0 for s in symbols)
+
+def test_retries_recover_from_failures(tmp_path, monkeypatch):
+    setup(tmp_path, monkeypatch)
+    ib = PinnedIB(latency=0.01, jitter=0.0, failure_rate=0.4, pacing_requests=1000, pacing_window=1.0, seed=3)
+    pacer = ingest.TokenBucket.for_ibkr(requests=1000, window=1.0, burst=50)
+    symbols = [f"SYM{i:02d}" for i in range(10)]
+    results = asyncio.run(ingest.fetch_data_async(symbols, ib=ib, pacer=pacer, max_in_flight=4))
+
+    stats = ib.stats()
+    assert stats['failed'] > 0 and stats['requests'] == len(symbols) + stats['failed']
+    assert all(results[s] > 0 for s in symbols)
+    assert all(len(store.read_bars(s)) == 2 * 390 for s in symbols)
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.strategy.kalman import KalmanFilterReg, RollingZScore, kalman_filter_batch
+
+class MatrixKalman:
+    """The original matrix-form filter the closed form replaced."""
+    def __init__(self, delta=1e-5, R=1e-3):
+        self.R = R
+        self.state_mean = np.array([0.0, 1.0])
+        self.P = np.eye(2)
+        self.wt = delta / (1 - delta) * np.eye(2)
+
+    def update(self, y, x):
+        self.P = self.P + self.wt
+        H = np.array([1.0, x])
+        y_pred = H.dot(self.state_mean)
+        error = y - y_pred
+        S = H.dot(self.P).dot(H.T) + self.R
+        K = self.P.dot(H.T) / S
+        self.state_mean = self.state_mean + K * error
+        self.P = (np.eye(2) - np.outer(K, H)).dot(self.P)
+        return y_pred, error, self.state_mean[0], self.state_mean[1]
+
+def pair(n=1500, seed=0):
+    rng = np.random.default_rng(seed)
+    x = 50 * np.exp(np.cumsum(rng.normal(0, 2e-3, n)))
+    beta = 1.3 + np.cumsum(rng.normal(0, 1e-3, n))
+    y = 2.0 + beta * x + rng.normal(0, 0.05, n)
+    return y, x
+
+@pytest.mark.parametrize('delta, R', [(1e-5, 1e-3), (1e-4, 1e-3), (1e-3, 1e-1)])
+def test_closed_form_matches_matrix_update(delta, R):
+    y, x = pair()
+    fast, ref = KalmanFilterReg(delta, R), MatrixKalman(delta, R)
+    for yt, xt in zip(y, x):
+        np.testing.assert_allclose(fast.update(yt, xt), ref.update(yt, xt), rtol=1e-8, atol=1e-10)
+    np.testing.assert_allclose(fast.P, ref.P, rtol=1e-6, atol=1e-12)
+
+def test_batch_matches_streaming_per_pair_and_setting():
+    ys, xs = zip(*(pair(800, seed) for seed in range(3)))
+    y, x = np.stack(ys, axis=1), np.stack(xs, axis=1)
+    deltas = np.array([1e-5, 1e-4, 1e-3])
+    out = kalman_filter_batch(y, x, delta=deltas, R=1e-3)
+    for j, delta in enumerate(deltas):
+        kf = KalmanFilterReg(delta, 1e-3)
+        ref = np.array([kf.update(yt, xt) for yt, xt in zip(y[:, j], x[:, j])])
+        for col, key in enumerate(('model_price', 'spread', 'alpha', 'beta')):
+            np.testing.assert_allclose(out[key][:, j], ref[:, col], rtol=1e-10, atol=1e-12)
+
+def test_batch_single_series_grid():
+    y, x = pair(300)
+    out = kalman_filter_batch(y, x, delta=[1e-5, 1e-4])
+    assert out['beta'].shape == (300, 2)
+    kf = KalmanFilterReg(1e-4, 1e-3)
+    np.testing.assert_allclose(out['beta'][:, 1], [kf.update(a, b)[3] for a, b in zip(y, x)], rtol=1e-10)
+
+def test_rolling_zscore_matches_pandas():
+    spread = pd.Series(np.random.default_rng(1).normal(0, 1, 500).cumsum())
+    ref = (spread - spread.rolling(30).mean()) / spread.rolling(30).std()
+    zs = RollingZScore(30)
+    got = np.array([zs.update(v) for v in spread])
+    assert np.isnan(got[:29]).all()
+    np.testing.assert_allclose(got[29:], ref.to_numpy()[29:], rtol=1e-6, atol=1e-9)
+
+def test_rolling_zscore_flat_window_is_nan():
+    zs = RollingZScore(5)
+    assert np.isnan([zs.update(1.0) for _ in range(8)]).all()
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.strategy.labeling import get_triple_barrier_labels
+
+def reference_labels(prices, events, sl_tp_limits, vertical_barrier_bars=12):
+    """The original per-event loop the vectorized version replaced."""
+    t1 = prices.index.searchsorted(events + pd.Timedelta(minutes=5 * vertical_barrier_bars))
+    t1 = t1[t1 < prices.shape[0]]
+    t1 = pd.Series(prices.index[t1], index=events[:len(t1)])
+    stop_loss, take_profit = sl_tp_limits
+    rows = {}
+    for entry_time in events:
+        if entry_time not in prices.index:
+            continue
+        entry_price = prices.loc[entry_time]
+        end_time = t1.loc[entry_time] if entry_time in t1.index else prices.index[-1]
+        path = prices.loc[entry_time:end_time].iloc[1:]
+        if path.empty:
+            continue
+        path_rets = path / entry_price - 1
+        first_pt = path_rets[path_rets >= take_profit].index.min()
+        first_sl = path_rets[path_rets <= -stop_loss].index.min()
+        exit_time, outcome = end_time, 0
+        if pd.notna(first_pt) and pd.notna(first_sl):
+            exit_time, outcome = (first_pt, 1) if first_pt < first_sl else (first_sl, 0)
+        elif pd.notna(first_pt):
+            exit_time, outcome = first_pt, 1
+        elif pd.notna(first_sl):
+            exit_time = first_sl
+        rows[entry_time] = (float(outcome), prices.loc[exit_time] / entry_price - 1, exit_time)
+    return pd.DataFrame.from_dict(rows, orient='index', columns=['bin', 'ret', 'exit_time'])
+
+def check(prices, events, limits, bars=12, chunk_size=None):
+    got = get_triple_barrier_labels(prices, events, limits, vertical_barrier_bars=bars, chunk_size=chunk_size)
+    ref = reference_labels(prices, events, limits, bars)
+    assert list(got.index) == list(ref.index)
+    assert got['bin'].tolist() == ref['bin'].tolist()
+    np.testing.assert_allclose(got['ret'].to_numpy(), ref['ret'].to_numpy(), rtol=0, atol=1e-12)
+    assert list(got['exit_time']) == list(ref['exit_time'])
+    return got
+
+def minutes(values, start='2025-03-03 09:30'):
+    return pd.Series(np.asarray(values, dtype=float), index=pd.date_range(start, periods=len(values), freq='min'))
+
+@pytest.mark.parametrize('limits', [(0.002, 0.004), (0.01, 0.01), (0.0005, 0.02)])
+@pytest.mark.parametrize('chunk_size', [None, 7])
+def test_random_walk_matches_reference_loop(limits, chunk_size):
+    rng = np.random.default_rng(0)
+    prices = minutes(100 * np.exp(np.cumsum(rng.normal(0, 1e-3, 400))))
+    # Every bar (incl. the last few, within the time stop of the end) plus ones not in the index
+    events = prices.index.append(pd.DatetimeIndex(['2025-03-03 09:30:30', '2025-03-04 09:30']))
+    check(prices, events, limits, chunk_size=chunk_size)
+
+def test_barrier_cases():
+    # 0: TP at +1 bar, 1: SL first, 2: time stop, 3: tie on one bar -> SL wins
+    p = minutes([100, 101, 100.5, 98.9, 99.5, 100.2] + [100.0] * 60)
+    got = check(p, p.index[[0, 1]], (0.01, 0.01), bars=1)
+    assert got['bin'].tolist() == [1.0, 0.0]
+    assert got['exit_time'].tolist() == [p.index[1], p.index[3]]
+
+    got = check(p, p.index[[6]], (0.01, 0.01), bars=2)  # Flat: time stop after 10 min
+    assert got['bin'].tolist() == [0.0] and got['exit_time'].iloc[0] == p.index[16]
+
+    got = check(p, p.index[[6]], (0.0, 0.0), bars=2)    # Flat bar touches both barriers
+    assert got['bin'].tolist() == [0.0] and got['exit_time'].iloc[0] == p.index[7]
+
+def test_events_near_the_end():
+    p = minutes(np.linspace(100, 100.1, 30))
+    got = check(p, p.index[-5:], (0.05, 0.05), bars=12)   # Time stop past the data: exit at the last bar
+    assert list(got.index) == list(p.index[-5:-1])          # Last bar has no future path
+    assert (got['exit_time'] == p.index[-1]).all()
@@ -0,0 +1,101 @@
+import asyncio
+import pandas as pd
+import pytest
+import paper_trade
+from src import config
+from src.data.fake_ib import FakeIB, make_bars
+from src.data.feed import Bar
+
+class LoopIB(FakeIB):
+    def run(self, awaitable):
+        return asyncio.new_event_loop().run_until_complete(awaitable)
+
+@pytest.fixture
+def trader():
+    t = paper_trade.MLTrader()
+    t.log = lambda msg: None
+    return t
+
+def test_fetch_is_concurrent(trader, monkeypatch):
+    monkeypatch.setattr(config, 'LIVE_FETCH_DEADLINE', 5)
+    trader.ib = LoopIB(latency=0.3, jitter=0.0)
+    symbols = ['AAA', 'BBB', 'CCC', 'DDD']
+    out, late = trader.fetch_live_features(symbols)
+    assert late == []
+    assert all(out[s][0] is not None for s in symbols)
+    assert trader.ib.peak_in_flight == len(symbols)
+
+def test_deadline_miss_is_reported_late(trader, monkeypatch):
+    monkeypatch.setattr(config, 'LIVE_FETCH_DEADLINE', 0.2)
+    trader.ib = LoopIB(latency=1.0, jitter=0.0)
+    out, late = trader.fetch_live_features(['AAA', 'BBB'])
+    assert sorted(late) == ['AAA', 'BBB']
+    assert out == {}
+
+def test_empty_answer_before_deadline_is_a_failure_not_late(trader, monkeypatch):
+    monkeypatch.setattr(config, 'LIVE_FETCH_DEADLINE', 5)
+    trader.ib = LoopIB(latency=0.05, jitter=0.0, failure_rate=1.0)
+    out, late = trader.fetch_live_features(['AAA'])
+    assert late == []
+    assert out['AAA'] == (None, 0.0)
+
+class ClockedIB(LoopIB):
+    """Historical bars up to a fixed end; on_request runs while the request is in flight."""
+    end = '20250303 10:59:00 US/Eastern'
+    on_request = None
+
+    async def reqHistoricalDataAsync(self, contract, endDateTime, *args, **kwargs):
+        bars = await super().reqHistoricalDataAsync(contract, self.end, *args, **kwargs)
+        if self.on_request: self.on_request(contract.symbol, bars)
+        return bars
+
+    def sleep(self, secs):
+        if self.on_request: self.on_request('AAA', None)
+
+def closed(minute):
+    return pd.Timestamp(f'2025-03-03 {minute}', tz='US/Eastern').to_pydatetime()
+
+def feed_bar(b):
+    return Bar(b.date, b.open, b.high, b.low, b.close, b.volume, b.average)
+
+def seed(trader):
+    trader.ib = ClockedIB(latency=0.0, jitter=0.0)
+    out, _ = trader.fetch_live_features(['AAA'], closed_at=closed('10:59'))
+    assert out['AAA'][0].index[-1] == closed('10:58')
+
+def test_feed_closing_the_bar_mid_request_is_not_dropped(trader):
+    seed(trader)
+    ib = trader.ib
+    ib.end = '20250303 11:00:00 US/Eastern'
+    # The feed closes 10:59 while the request is in flight
+    ib.on_request = lambda sym, bars: trader.on_live_bar(sym, feed_bar(bars[-1]))
+    out, late = trader.fetch_live_features(['AAA'], closed_at=closed('11:00'))
+    assert late == []
+    assert out['AAA'][0].index[-1] == closed('10:59')
+    assert out['AAA'] is trader.live_rows['AAA']
+
+def test_tick_waits_for_the_feed_before_requesting(trader, monkeypatch):
+    monkeypatch.setattr(config, 'FEED_WAIT_MS', 5000)
+    seed(trader)
+    ib = trader.ib
+    ib.end = '20250303 11:00:00 US/Eastern'
+    bar = make_bars('AAA', ib.end, '1 D')[-1]
+    trader.feed.subscriptions['AAA'] = object()
+    ib.on_request = lambda sym, bars: trader.on_live_bar('AAA', feed_bar(bar))  # Arrives during ib.sleep
+    requests = len(ib.request_log)
+    trader.wait_for_feed(['AAA'], closed('11:00'))
+    assert trader.feature_engines['AAA'].last_ts == closed('10:59')
+
+    ib.on_request = None
+    out, _ = trader.fetch_live_features(['AAA'], closed_at=closed('11:00'))
+    assert out['AAA'] is trader.live_rows['AAA']
+    assert len(ib.request_log) == requests  # Served by the feed, no historical request
+
+def test_price_comes_from_the_scored_bar_not_the_forming_one(trader):
+    seed(trader)
+    trader.ib.end = '20250303 11:00:30 US/Eastern'   # 11:00 bar has just started forming
+    bars = make_bars('AAA', trader.ib.end, '1 D')
+    assert bars[-1].date == closed('11:00')
+    X, price = trader.fetch_live_features(['AAA'], closed_at=closed('11:00'))[0]['AAA']
+    assert X.index[-1] == closed('10:59')
+    assert price == bars[-2].close != bars[-1].close
@@ -0,0 +1,39 @@
+import pandas as pd
+import run_pipeline
+from src import config
+from src.data import ingest, store
+from src.data.fake_ib import make_bars
+
+def bars(days=8):
+    return ingest.bars_to_frame(make_bars('AAA', '20250311 17:00:00', f'{days} D'))
+
+def build(tmp_path, monkeypatch, name, frames):
+    """Writes each frame into a fresh store, running the pipeline after each one."""
+    root = tmp_path / name
+    monkeypatch.setattr(config, 'BAR_STORE', root / "bars")
+    monkeypatch.setattr(config, 'DATA_RAW', root)
+    monkeypatch.setattr(config, 'DATA_PROCESSED', root)
+    monkeypatch.setattr(config, 'STAGE_CACHE', root / "cache")
+    for df in frames:
+        store.write_bars('AAA', df)
+        run_pipeline.run_full_pipeline('AAA')
+    return pd.read_parquet(root / "AAA_labeled.parquet")
+
+def test_incremental_build_equals_cold_build(tmp_path, monkeypatch):
+    df = bars()
+    days = df.index.strftime('%Y-%m-%d')
+    cold = build(tmp_path, monkeypatch, 'cold', [df])
+    # Day by day: every run recomputes only the newest day (plus the labels before it)
+    steps = [df[days == d] for d in sorted(set(days))]
+    incremental = build(tmp_path, monkeypatch, 'incremental', steps)
+    assert len(cold) > 1000
+    pd.testing.assert_frame_equal(incremental, cold, check_exact=True)  # Byte-for-byte the same labels
+
+def test_rebuild_is_served_from_cache(tmp_path, monkeypatch, capsys):
+    df = bars()
+    first = build(tmp_path, monkeypatch, 'again', [df])
+    n = len(store.stored_days('AAA'))
+    capsys.readouterr()
+    run_pipeline.run_full_pipeline('AAA')
+    assert f"recomputed 0/{n} feature days, 0/{n} label days" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "again" / "AAA_labeled.parquet"), first)
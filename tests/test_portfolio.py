@@ -0,0 +1,79 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from src import config
+from src.strategy import portfolio
+
+def test_entry_thresholds_prefer_tuned(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'MODELS_DIR', tmp_path)
+    (tmp_path / "AAA_params.json").write_text(json.dumps({'xgb': {}, 'entry_threshold': 0.62}))
+    assert portfolio.entry_thresholds(['AAA', 'BBB']) == {'AAA': 0.62, 'BBB': config.ENTRY_THRESHOLD}
+
+def test_threshold_mask_per_symbol():
+    panel = pd.DataFrame({'symbol': ['AAA', 'AAA', 'BBB', 'CCC'], 'prob': [0.60, 0.65, 0.60, 0.99]})
+    mask = portfolio.threshold_mask(panel, {'AAA': 0.62, 'BBB': 0.55})
+    assert mask.tolist() == [False, True, True, 0.99 >= config.ENTRY_THRESHOLD]
+    assert portfolio.threshold_mask(panel, 0.7).tolist() == [False, False, False, True]
+
+def candidates(symbols=('AAA',), n=120, hold_min=5, start='2025-03-03 10:00', **cols):
+    frames = []
+    for sym in symbols:
+        index = pd.date_range(start, periods=n, freq='min')
+        frames.append(pd.DataFrame({
+            'symbol': sym, 'prob': 0.9, 'market_safe': True, 'feat_rsi_14': 50.0,
+            'exit_time': index + pd.Timedelta(minutes=hold_min), **cols,
+        }, index=index))
+    return pd.concat(frames).sort_index(kind='stable')
+
+def naive_entries(panel, threshold, cooldown_min=30):
+    """Minute-by-minute version of the live loop's gating: busy until exit, then cooldown from the exit fill."""
+    taken = []
+    free_at = {}
+    for t, row in panel.sort_index(kind='stable').iterrows():
+        ok = (row['prob'] >= threshold and row['market_safe'] and not row['feat_rsi_14'] > 75
+              and config.TRADING_START_HOUR <= t.hour < config.TRADING_END_HOUR)
+        if ok and t >= free_at.get(row['symbol'], t):
+            taken.append((t, row['symbol']))
+            free_at[row['symbol']] = max(row['exit_time'], t) + pd.Timedelta(minutes=cooldown_min)
+    return taken
+
+def entries(df):
+    return list(zip(df.index, df['symbol']))
+
+def test_cooldown_runs_from_the_exit():
+    picked = portfolio.select_entries(candidates(hold_min=5), threshold=0.5)
+    # Busy 5 min + 30 min cooldown -> an entry every 35 minutes
+    assert [t.strftime('%H:%M') for t in picked.index] == ['10:00', '10:35', '11:10', '11:45']
+
+def test_guard_off_bars_are_skipped_without_starting_a_cooldown():
+    panel = candidates(n=60)
+    panel.loc[panel.index < '2025-03-03 10:07', 'market_safe'] = False
+    picked = portfolio.select_entries(panel, threshold=0.5)
+    assert picked.index[0] == pd.Timestamp('2025-03-03 10:07')
+    assert portfolio.select_entries(candidates(market_safe=False), threshold=0.5).empty
+
+def test_symbols_hold_one_position_each_but_overlap():
+    panel = candidates(('AAA', 'BBB', 'CCC'), n=60, hold_min=20)
+    picked = portfolio.select_entries(panel, threshold=0.5)
+    assert picked.groupby('symbol').size().tolist() == [2, 2, 2]   # 10:00 and 10:50 each
+    picked['ret'] = 0.01
+    trades, curve = portfolio.simulate_portfolio(picked, initial_equity=100_000, position_pct=0.1, commission=0)
+    assert trades.attrs['max_open'] == 3
+    # Entries while others are open are sized off realized equity only
+    first = trades[trades.index == trades.index[0]]
+    assert (first['size'] == 10_000).all()
+    second = trades[trades.index > trades.index[0]]
+    assert second['size'].iloc[0] == pytest.approx((100_000 + 3 * 100) * 0.1)
+    assert curve.iloc[-1] == pytest.approx(100_000 + trades['pnl'].sum())
+
+@pytest.mark.parametrize('seed', range(3))
+def test_matches_minute_by_minute_gating(seed):
+    rng = np.random.default_rng(seed)
+    panel = candidates(('AAA', 'BBB'), n=400, start='2025-03-03 09:30')
+    panel['prob'] = rng.uniform(0.3, 1.0, len(panel))
+    panel['market_safe'] = rng.random(len(panel)) > 0.2
+    panel['feat_rsi_14'] = rng.uniform(40, 90, len(panel))
+    panel['exit_time'] = panel.index + pd.to_timedelta(rng.integers(1, 60, len(panel)), unit='min')
+    picked = portfolio.select_entries(panel, threshold=0.7)
+    assert sorted(entries(picked)) == sorted(naive_entries(panel, 0.7))
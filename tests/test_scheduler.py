@@ -0,0 +1,75 @@
+from src.scheduler import BarScheduler
+
+T0 = 1741012200  # 2025-03-03 09:30:00 ET, a bar boundary
+
+def make(start, **kw):
+    """Scheduler on a fake clock; sleep just moves the clock forward."""
+    t = [start]
+    kw = {'offset_ms': 250, 'budget_ms': 10000, 'max_lag_ms': 5000, **kw}
+    sched = BarScheduler(clock=lambda: t[0], **kw)
+    sleep = lambda d: t.__setitem__(0, t[0] + d)
+    return sched, t, sleep
+
+def test_first_wait_wakes_offset_after_next_close():
+    sched, t, sleep = make(T0 + 20)
+    tick = sched.wait(sleep)
+    assert tick.close_epoch == T0 + 60
+    assert t[0] == T0 + 60.25
+    assert tick.late == 0.25 and tick.missed == 0
+    assert tick.bar_close.strftime('%H:%M') == '09:31'
+
+def test_next_wait_after_quick_tick_is_next_bar():
+    sched, t, sleep = make(T0 + 20)
+    sched.wait(sleep)
+    t[0] += 2
+    tick = sched.wait(sleep)
+    assert tick.close_epoch == T0 + 120 and tick.missed == 0
+
+def test_overrun_within_max_lag_runs_late():
+    sched, t, sleep = make(T0 + 20)
+    sched.wait(sleep)
+    t[0] = T0 + 123        # Previous tick ran 3s past the 09:32 close
+    tick = sched.wait(sleep)
+    assert tick.close_epoch == T0 + 120
+    assert t[0] == T0 + 123 and tick.late == 3
+    assert tick.missed == 0 and sched.skipped == 0
+
+def test_overrun_past_max_lag_skips_to_next_close():
+    sched, t, sleep = make(T0 + 20)
+    sched.wait(sleep)
+    t[0] = T0 + 130        # 10s past the 09:32 close: too late for it
+    tick = sched.wait(sleep)
+    assert tick.close_epoch == T0 + 180
+    assert t[0] == T0 + 180.25
+    assert tick.missed == 1 and sched.skipped == 1
+
+def test_missed_counts_every_skipped_close():
+    sched, t, sleep = make(T0 + 20)
+    sched.wait(sleep)
+    t[0] = T0 + 302        # Stalled through 09:32..09:35, 09:35 still in lag
+    tick = sched.wait(sleep)
+    assert tick.close_epoch == T0 + 300
+    assert tick.missed == 3 and sched.skipped == 3
+
+def test_overrun_and_stale_orders_and_summary():
+    sched, t, sleep = make(T0 + 20)
+    tick = sched.wait(sleep)
+    t[0] += 1.75
+    tick.mark('features')
+    assert not sched.over_budget(tick)
+    tick.orders = 1
+    tick.mark('orders')
+    assert not sched.finish(tick)
+
+    tick = sched.wait(sleep)
+    t[0] += 12
+    tick.mark('inference')
+    assert sched.over_budget(tick)
+    assert sched.finish(tick)
+
+    stats = sched.summary()
+    assert stats['ticks'] == 2 and stats['overruns'] == 1
+    assert stats['stale'] == 1 and stats['skipped'] == 0
+    assert stats['max_ms'] == 12250
+    assert stats['order_max_ms'] == 2000
+    assert tick.describe() == 'inference 12000ms'
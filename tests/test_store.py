@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src import config
+from src.data import store
+
+@pytest.fixture
+def bar_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'BAR_STORE', tmp_path / "bars")
+    monkeypatch.setattr(config, 'DATA_RAW', tmp_path)
+    index = pd.DatetimeIndex(
+        list(pd.date_range('2025-03-03 15:50', periods=10, freq='min', tz='US/Eastern')) +
+        list(pd.date_range('2025-03-04 09:30', periods=10, freq='min', tz='US/Eastern')), name='date')
+    df = pd.DataFrame({c: np.arange(len(index), dtype=float) for c in store.BAR_COLUMNS}, index=index)
+    store.write_bars('TEST', df)
+    return df
+
+def test_aware_bounds_prune_by_store_day(bar_store):
+    # 05:55 on the 4th in Tokyo is still 15:55 on the 3rd in New York
+    start = pd.Timestamp('2025-03-04 05:55', tz='Asia/Tokyo')
+    end = pd.Timestamp('2025-03-04 00:30', tz='UTC')
+    out = store.read_bars('TEST', start=start, end=end)
+    assert list(out.index) == list(bar_store.index[5:10])
+
+def test_naive_bounds_are_store_local(bar_store):
+    out = store.read_bars('TEST', start='2025-03-04 09:35', end='2025-03-04 09:36')
+    assert list(out.index) == list(bar_store.index[15:17])
+
+def test_utc_bars_land_in_their_exchange_day(bar_store):
+    # 00:30 UTC on the 5th is still 19:30 ET on the 4th
+    late = pd.date_range('2025-03-04 20:55', periods=3, freq='min', tz='UTC', name='date')
+    utc = pd.DataFrame({c: 1.0 for c in store.BAR_COLUMNS}, index=late)
+    late_night = pd.DatetimeIndex([pd.Timestamp('2025-03-05 00:30', tz='UTC')], name='date')  # 19:30 ET on the 4th
+    utc = pd.concat([utc, pd.DataFrame({c: 2.0 for c in store.BAR_COLUMNS}, index=late_night)])
+    store.write_bars('TEST', utc)
+    assert store.stored_days('TEST') == ['2025-03-03', '2025-03-04']
+    out = store.read_bars('TEST', start='2025-03-04 15:55', end='2025-03-04 19:30')
+    assert len(out) == 4 and out['close'].iloc[-1] == 2.0
+
+def test_day_file_is_replaced_atomically(bar_store, monkeypatch):
+    path = store._day_path('TEST', '2025-03-04')
+    before = pd.read_parquet(path)
+    def crash(self, target, *args, **kwargs):
+        open(target, 'wb').write(b'partial')
+        raise OSError("disk full")
+    extra = bar_store.iloc[10:].copy()
+    extra.index = extra.index + pd.Timedelta(minutes=30)
+    with monkeypatch.context() as m, pytest.raises(OSError):
+        m.setattr(pd.DataFrame, 'to_parquet', crash)
+        store.write_bars('TEST', extra)
+    pd.testing.assert_frame_equal(pd.read_parquet(path), before)
+    assert len(store.read_bars('TEST')) == len(bar_store)   # Leftover temp file is not scanned
@@ -0,0 +1,25 @@
+import json
+import train_model
+from src import config
+
+def setup(tmp_path, monkeypatch, labeled, threshold):
+    monkeypatch.setattr(config, 'DATA_PROCESSED', tmp_path)
+    monkeypatch.setattr(config, 'MODELS_DIR', tmp_path / "models")
+    monkeypatch.setattr(config, 'PROJECT_ROOT', tmp_path)
+    monkeypatch.setattr(config, 'PRED_CACHE', tmp_path / "predictions")
+    (tmp_path / "models").mkdir()
+    labeled().to_parquet(tmp_path / "AAA_labeled.parquet")
+    (tmp_path / "models" / "AAA_params.json").write_text(
+        json.dumps({'xgb': {'n_estimators': 20}, 'entry_threshold': threshold}))
+    train_model.train_walk_forward('AAA', n_folds=3, embargo_min=10)
+    return json.loads((tmp_path / "models" / "AAA_walkforward.json").read_text())
+
+def test_walk_forward_scores_at_the_tuned_threshold(tmp_path, monkeypatch, labeled):
+    report = setup(tmp_path, monkeypatch, labeled, 1.01)  # Unreachable: no fold may take a trade
+    assert report['threshold'] == 1.01
+    assert report['oof']['trades'] == 0
+    assert all(f.get('trades', 0) == 0 for f in report['folds'])
+
+def test_walk_forward_default_threshold_trades(tmp_path, monkeypatch, labeled):
+    report = setup(tmp_path, monkeypatch, labeled, 0.0)
+    assert report['oof']['trades'] > 0
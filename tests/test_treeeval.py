@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+import paper_trade
+from src import config
+from src.strategy import features
+from src.strategy.treeeval import TreeEnsemble
+
+@pytest.fixture(scope='module')
+def booster():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, len(features.FEATURE_COLUMNS))).astype(np.float32)
+    X[rng.random(X.shape) < 0.15] = np.nan   # Missing values -> learned default directions
+    y = (np.nan_to_num(X[:, 0]) + np.nan_to_num(X[:, 1]) * 0.5 + rng.normal(0, 0.5, len(X)) > 0).astype(int)
+    model = xgb.XGBClassifier(n_estimators=40, max_depth=4, learning_rate=0.1, random_state=0)
+    model.fit(X, y)
+    return model.get_booster()
+
+def sample(n, nan_frac=0.0, seed=1):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, len(features.FEATURE_COLUMNS))).astype(np.float32)
+    X[rng.random(X.shape) < nan_frac] = np.nan
+    return X
+
+@pytest.mark.parametrize('n, nan_frac', [(1, 0.0), (1, 0.3), (500, 0.0), (500, 0.3)])
+def test_matches_xgboost(booster, n, nan_frac):
+    ens = TreeEnsemble.from_booster(booster)
+    X = sample(n, nan_frac)
+    np.testing.assert_allclose(ens.inplace_predict(X), booster.inplace_predict(X), atol=1e-6)
+
+def test_all_missing_row_takes_default_directions(booster):
+    X = np.full((1, len(features.FEATURE_COLUMNS)), np.nan, dtype=np.float32)
+    ens = TreeEnsemble.from_booster(booster)
+    np.testing.assert_allclose(ens.inplace_predict(X), booster.inplace_predict(X), atol=1e-6)
+
+def test_load_from_saved_model(booster, tmp_path):
+    path = tmp_path / "AAA_xgb.json"
+    booster.save_model(str(path))
+    X = sample(50, 0.2)
+    np.testing.assert_allclose(TreeEnsemble.load(path).inplace_predict(X), booster.inplace_predict(X), atol=1e-6)
+
+def test_predict_batch_switches_to_xgboost_for_big_batches(booster, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'MODELS_DIR', tmp_path)
+    symbols = [f"S{i:02d}" for i in range(6)]
+    monkeypatch.setattr(config, 'ACTIVE_TRADING_LIST', symbols)
+    for sym in symbols:
+        booster.save_model(str(tmp_path / f"{sym}_xgb.json"))
+    trader = paper_trade.MLTrader()
+    trader.log = lambda msg: None
+    trader.load_models()
+    shared = trader.models[symbols[0]]
+    for sym in symbols:                       # One model for all -> one group of 6 rows
+        trader.models[sym] = shared
+    X = sample(len(symbols), 0.2)
+    rows = {sym: pd.DataFrame(X[i:i + 1], columns=features.FEATURE_COLUMNS) for i, sym in enumerate(symbols)}
+    expected = booster.inplace_predict(X)
+
+    calls = []
+    for model in (shared, trader.boosters[symbols[0]]):
+        orig = model.inplace_predict
+        monkeypatch.setattr(model, 'inplace_predict', lambda data, orig=orig, model=model: calls.append(model) or orig(data))
+    for limit, used in [(32, shared), (4, trader.boosters[symbols[0]])]:
+        monkeypatch.setattr(config, 'TREE_EVAL_MAX_ROWS', limit)
+        calls.clear()
+        probs = trader.predict_batch(rows)
+        assert calls == [used]
+        np.testing.assert_allclose([probs[s] for s in symbols], expected, atol=1e-6)
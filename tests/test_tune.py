@@ -0,0 +1,28 @@
+import json
+import tune_model
+from src import config
+
+def setup(tmp_path, monkeypatch, labeled):
+    monkeypatch.setattr(config, 'DATA_PROCESSED', tmp_path)
+    monkeypatch.setattr(config, 'MODELS_DIR', tmp_path)
+    monkeypatch.setattr(tune_model, 'HALVING_BUDGETS', [5, 10])
+    monkeypatch.setattr(tune_model, 'MIN_VAL_TRADES', 1)
+    tune_model._load.cache_clear()
+    labeled().to_parquet(tmp_path / "AAA_labeled.parquet")
+    labeled(wins=False).to_parquet(tmp_path / "ZZZ_labeled.parquet")  # Never wins
+
+def test_degenerate_symbol_does_not_abort_the_search(tmp_path, monkeypatch, labeled):
+    setup(tmp_path, monkeypatch, labeled)
+    best = tune_model.search(['AAA', 'ZZZ'], n_trials=4, name='t')
+    assert best['ZZZ']['score'] is None and best['ZZZ']['error']
+    assert best['AAA']['logloss'] < float('inf')
+    assert not (tmp_path / "ZZZ_params.json").exists()
+    assert 'entry_threshold' in json.loads((tmp_path / "AAA_params.json").read_text())
+
+def test_resume_reads_error_records(tmp_path, monkeypatch, labeled):
+    setup(tmp_path, monkeypatch, labeled)
+    tune_model.search(['AAA', 'ZZZ'], n_trials=3, name='t')
+    log = tune_model.TrialLog('t')
+    assert any(r['symbol'] == 'ZZZ' and r['logloss'] == float('inf') for r in log.done.values())
+    best = tune_model.search(['AAA', 'ZZZ'], n_trials=3, name='t')  # All from the log
+    assert best['ZZZ']['score'] is None
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+from src.strategy import validation
+
+def make_times(n=1000, hold_min=30):
+    times = pd.date_range('2025-03-03 09:30', periods=n, freq='min')
+    return times, times + pd.Timedelta(minutes=hold_min)
+
+def test_folds_purge_labels_reaching_the_test_block():
+    times, exits = make_times()
+    for fold in validation.walk_forward_folds(times, exits, n_folds=4, embargo_min=10):
+        test_start = times[fold['test'][0]]
+        assert (exits[fold['train']] < test_start - pd.Timedelta(minutes=10)).all()
+        assert fold['train'].max() < fold['test'].min()
+
+def test_inner_split_is_newest_slice_and_purged():
+    times, exits = make_times()
+    train = np.arange(800)
+    fit, val = validation.inner_split(train, times, exits, val_frac=0.25, embargo_min=10)
+    assert list(val) == list(range(600, 800))
+    assert (exits[fit] < times[600] - pd.Timedelta(minutes=10)).all()
+    assert len(fit) == 600 - 40  # 30m hold + 10m embargo purged
+
+def test_inner_split_too_small():
+    times, exits = make_times(10)
+    fit, val = validation.inner_split(np.arange(1), times, exits, val_frac=0.2)
+    assert len(val) == 0
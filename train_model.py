@@ -1,11 +1,47 @@
 # code red/train_model.py
+import json
+import warnings
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import pandas as pd
 import xgboost as xgb
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.metrics import precision_score
 from src import config
+from src.data import stream
+from src.data.cache import PredictionCache
+from src.strategy import portfolio, validation
 import os
 
-def train_xgb_model(symbol):
+DROP_COLS = ['bin', 'ret', 'exit_time', 'open', 'high', 'low', 'close', 'volume']
+XGB_PARAMS = dict(n_estimators=100, max_depth=3, learning_rate=0.05, random_state=42)
+
+def load_params(symbol):
+    """XGB_PARAMS overlaid with the tuned ones from models/<SYM>_params.json (tune_model.py), if any."""
+    path = config.MODELS_DIR / f"{symbol}_params.json"
+    if not path.exists():
+        return dict(XGB_PARAMS)
+    return {**XGB_PARAMS, **json.loads(path.read_text())['xgb']}
+
+def save_model(model, name, trained_until):
+    """
+    Saves models/<name>_xgb.json. trained_until (stored as a booster
+    attribute) is the first timestamp the model has NOT been trained on;
+    refresh_model() treats rows from there on as new.
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    booster.set_attr(trained_until=pd.Timestamp(trained_until).isoformat() if trained_until is not None else None)
+    save_dir = config.PROJECT_ROOT / "models"
+    os.makedirs(save_dir, exist_ok=True)
+    model.save_model(save_dir / f"{name}_xgb.json")
+    PredictionCache().invalidate(name) # Old probabilities are stale now
+
+def _unseen_from(index, split):
+    return index[split] if split < len(index) else index[-1] + pd.Timedelta(minutes=1)
+
+def train_xgb_model(symbol, n_jobs=-1):
     print(f"\n--> Training Model for {symbol}...")
     
     # 1. Load Data
@@ -17,8 +53,7 @@ def train_xgb_model(symbol):
     df = pd.read_parquet(file_path)
     
     # 2. Setup Features (X) and Target (y)
-    drop_cols = ['bin', 'ret', 'exit_time', 'open', 'high', 'low', 'close', 'volume']
-    features = [c for c in df.columns if c not in drop_cols]
+    features = [c for c in df.columns if c not in DROP_COLS]
     
     X = df[features]
     y = df['bin']
@@ -41,12 +76,9 @@ def train_xgb_model(symbol):
 
     # 5. Train XGBoost
     model = xgb.XGBClassifier(
-        n_estimators=100,
-        max_depth=3,
-        learning_rate=0.05,
+        **load_params(symbol),
         scale_pos_weight=scale_pos_weight,
-        random_state=42,
-        n_jobs=-1 # Use all CPU cores
+        n_jobs=n_jobs # -1 = all CPU cores (capped when run in a process pool)
     )
     
     model.fit(X_train, y_train)
@@ -60,12 +92,338 @@ def train_xgb_model(symbol):
         print("    -> [WARNING] Precision is low. Model might be guessing.")
     
     # 7. Save
-    save_dir = config.PROJECT_ROOT / "models"
-    os.makedirs(save_dir, exist_ok=True)
-    model.save_model(save_dir / f"{symbol}_xgb.json")
+    save_model(model, symbol, _unseen_from(df.index, split))
     
     return precision
 
+# --- WALK-FORWARD ---
+# Fold data for the current symbol. Pool workers get it once through the
+# initializer (works under fork, spawn and forkserver), not per fold.
+_WF = {}
+
+def _init_wf(data):
+    _WF.clear()
+    _WF.update(data)
+
+def fold_metrics(prob, y, ret, threshold=None):
+    """Precision at 0.5 plus trade count / win rate / EV at the entry threshold."""
+    threshold = config.ENTRY_THRESHOLD if threshold is None else threshold
+    pred = prob > 0.5
+    taken = prob >= threshold
+    trades = int(taken.sum())
+    win_rate = float((y[taken] == 1).mean()) if trades else 0.0
+    return {
+        'precision': float((y[pred] == 1).mean()) if pred.any() else 0.0,
+        'trades': trades,
+        'win_rate': win_rate,
+        # Same approximation as optimize.py: Win% * 1.0% - Loss% * 0.5%
+        'ev': win_rate * 1.0 - (1 - win_rate) * 0.5 if trades else 0.0,
+        'avg_ret': float(np.nanmean(ret[taken])) if trades else 0.0,
+    }
+
+def _fit(train_idx, n_estimators, n_jobs, eval_idx=None):
+    X, y = _WF['X'], _WF['y']
+    y_train = y[train_idx]
+    n_ones = (y_train == 1).sum()
+    if n_ones == 0:
+        return None
+    model = xgb.XGBClassifier(
+        **{**_WF['params'], 'n_estimators': n_estimators},
+        scale_pos_weight=(y_train == 0).sum() / n_ones,
+        n_jobs=n_jobs,
+    )
+    eval_set = [(X[eval_idx], y[eval_idx])] if eval_idx is not None else None
+    model.fit(X[train_idx], y_train, eval_set=eval_set, verbose=False)
+    return model
+
+def _run_fold(fold, n_jobs):
+    # Round count is picked on an inner validation slice, never on the test block
+    times = _WF['times']
+    fit_idx, val_idx = validation.inner_split(fold['train'], times, _WF['exits'],
+                                              config.WF_INNER_VAL_FRAC, _WF['embargo_min'])
+    if len(val_idx) == 0:
+        return {'fold': fold['fold'], 'skipped': 'training window too small for inner validation'}
+    model = _fit(fit_idx, _WF['n_estimators'], n_jobs, eval_idx=val_idx)
+    if model is None:
+        return {'fold': fold['fold'], 'skipped': 'no wins in training window'}
+    logloss = model.evals_result()['validation_0']['logloss']
+    best_rounds = int(np.argmin(logloss)) + 1
+    test = fold['test']
+    prob = model.predict_proba(_WF['X'][test], iteration_range=(0, best_rounds))[:, 1]
+    return {
+        'fold': fold['fold'],
+        'train_rows': len(fit_idx),
+        'val_rows': len(val_idx),
+        'purged': int(fold['purged']),
+        'test_start': str(times[test[0]]),
+        'test_end': str(times[test[-1]]),
+        'best_rounds': best_rounds,
+        'logloss': logloss,
+        'prob': prob,
+        **fold_metrics(prob, _WF['y'][test], _WF['ret'][test], threshold=_WF['threshold']),
+    }
+
+def train_walk_forward(symbol, n_folds=None, mode=None, embargo_min=None, fold_workers=1, n_jobs=-1, params=None):
+    """
+    Walk-forward validation, then a final refit.
+
+    The last HOLDOUT_FRAC of rows is kept out entirely (backtest.py and
+    optimize.py test on it). The rest is cut into purged/embargoed
+    walk-forward folds, trained in parallel over fold_workers processes
+    with n_jobs threads each. Each fold picks its boosting rounds on an
+    inner validation slice (the newest WF_INNER_VAL_FRAC of its training
+    span) before scoring the test block; the round count with the lowest
+    mean inner logloss is then used to refit on the whole training span
+    (purged against the holdout), which becomes <SYM>_xgb.json.
+    Returns the pooled out-of-fold precision.
+    """
+    n_folds = n_folds or config.WF_FOLDS
+    mode = mode or config.WF_MODE
+    embargo_min = config.WF_EMBARGO_MIN if embargo_min is None else embargo_min
+    params = {**load_params(symbol), **(params or {})}
+    threshold = portfolio.entry_thresholds([symbol])[symbol] # Same one the live loop trades at
+    print(f"\n--> Walk-forward training for {symbol} ({n_folds} {mode} folds, {embargo_min}m embargo, "
+          f"entry >= {threshold:.3f})...")
+
+    file_path = config.DATA_PROCESSED / f"{symbol}_labeled.parquet"
+    if not file_path.exists():
+        print(f"  [SKIP] No labeled data for {symbol}")
+        return None
+    df = pd.read_parquet(file_path).sort_index(kind='stable')
+    features = [c for c in df.columns if c not in DROP_COLS]
+
+    split = int(len(df) * (1 - config.HOLDOUT_FRAC))
+    dev = df.iloc[:split]
+    folds = validation.walk_forward_folds(dev.index, dev['exit_time'], n_folds, mode,
+                                          config.WF_TRAIN_BLOCKS, embargo_min)
+    if not folds:
+        print(f"  [!] Not enough data for walk-forward on {symbol}")
+        return None
+
+    data = dict(
+        X=df[features].to_numpy(dtype=np.float32),
+        y=df['bin'].to_numpy(),
+        ret=df['ret'].to_numpy(dtype=float),
+        times=df.index,
+        exits=df['exit_time'],
+        embargo_min=embargo_min,
+        params=params,
+        n_estimators=params['n_estimators'],
+        threshold=threshold,
+    )
+    _init_wf(data)
+
+    if fold_workers > 1:
+        with ProcessPoolExecutor(max_workers=fold_workers, initializer=_init_wf, initargs=(data,)) as pool:
+            results = list(pool.map(_run_fold, folds, [n_jobs] * len(folds)))
+    else:
+        results = [_run_fold(f, n_jobs) for f in folds]
+
+    done = [r for r in results if 'skipped' not in r]
+    for r in results:
+        if 'skipped' in r:
+            print(f"  [!] Fold {r['fold']}: skipped ({r['skipped']})")
+            continue
+        print(f"  Fold {r['fold']}: {r['test_start'][:10]} -> {r['test_end'][:10]} | "
+              f"train {r['train_rows']} (-{r['purged']} purged) | {r['best_rounds']} rounds | prec {r['precision']:.2%} | "
+              f"{r['trades']} trades, win {r['win_rate']:.2%}, EV {r['ev']:+.4f}%")
+    if not done:
+        print(f"  [!] Error: No usable folds for {symbol}.")
+        return None
+
+    # Pooled out-of-fold metrics
+    test_idx = np.concatenate([f['test'] for f in folds if f['fold'] in {r['fold'] for r in done}])
+    oof = fold_metrics(np.concatenate([r['prob'] for r in done]), _WF['y'][test_idx], _WF['ret'][test_idx],
+                       threshold=threshold)
+    curve = np.mean([r['logloss'] for r in done], axis=0)
+    best_rounds = int(np.argmin(curve)) + 1
+    print(f"  [RESULT] {symbol} OOF Precision: {oof['precision']:.2%} | {oof['trades']} trades, "
+          f"win {oof['win_rate']:.2%}, EV {oof['ev']:+.4f}% | best rounds {best_rounds}")
+
+    # Final model: whole training span, purged against the holdout
+    train_idx = validation.purge_before(dev.index, dev['exit_time'], df.index[split], embargo_min) if split < len(df) else np.arange(split)
+    model = _fit(train_idx, best_rounds, n_jobs)
+    if model is None:
+        print(f"  [!] Error: No 'Wins' in training set for {symbol}. Check labeling.")
+        return None
+
+    save_model(model, symbol, _unseen_from(df.index, split))
+    save_dir = config.PROJECT_ROOT / "models"
+
+    report = {
+        'symbol': symbol, 'mode': mode, 'embargo_min': embargo_min, 'best_rounds': best_rounds, 'threshold': threshold,
+        'oof': oof, 'folds': [{k: v for k, v in r.items() if k not in ('prob', 'logloss')} for r in results],
+    }
+    (save_dir / f"{symbol}_walkforward.json").write_text(json.dumps(report, indent=1))
+    _WF.clear()
+    return oof['precision']
+
+# --- OUT-OF-CORE ---
+def train_out_of_core(symbols, name=None, memory=None, n_jobs=-1, batch_rows=None):
+    """
+    Trains one booster on the labeled files of `symbols` (one symbol, or a
+    pooled universe) without loading them: parquet record batches are fed
+    through stream.ParquetBatchIter, so RAM is bounded by batch_rows rather
+    than history length. memory='external' keeps XGBoost's pages on disk
+    (XGB_CACHE), 'quantile' keeps them quantized in RAM (~1 byte per value).
+    The holdout split and purge match train_walk_forward. Saves
+    models/<name>_xgb.json and returns holdout precision.
+    """
+    symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+    name = name or (symbols[0] if len(symbols) == 1 else 'UNIVERSE')
+    memory = memory or config.TRAIN_MEMORY
+    print(f"\n--> Out-of-core training [{name}] on {len(symbols)} symbol(s) ({memory} memory)...")
+
+    train_spans, holdout_spans, holdout_starts = stream.split_spans(symbols)
+    if not train_spans:
+        print(f"  [SKIP] No labeled data for {name}")
+        return None
+    features = stream.feature_columns(next(iter(train_spans.values()))[0], DROP_COLS)
+
+    # Pass 1: class balance (labels only)
+    n_rows = n_ones = 0
+    for _, _, labels in stream.iter_spans(train_spans, [], batch_rows):
+        n_rows += len(labels['bin'])
+        n_ones += int((labels['bin'] == 1).sum())
+    if n_ones == 0:
+        print(f"  [!] Error: No 'Wins' in training set for {name}. Check labeling.")
+        return None
+
+    params = load_params(name)
+    n_rounds = params.pop('n_estimators')
+    params.pop('random_state', None)
+    booster_params = {
+        **params, 'seed': XGB_PARAMS['random_state'], 'objective': 'binary:logistic',
+        'tree_method': 'hist', 'scale_pos_weight': (n_rows - n_ones) / n_ones,
+        'nthread': n_jobs if n_jobs > 0 else os.cpu_count(),
+    }
+
+    if memory == 'external':
+        cache_dir = config.XGB_CACHE / name
+        os.makedirs(cache_dir, exist_ok=True)
+        it = stream.ParquetBatchIter(train_spans, features, batch_rows, cache_prefix=str(cache_dir / "pages"))
+        dtrain = xgb.ExtMemQuantileDMatrix(it, nthread=booster_params['nthread'])
+    else:
+        it = stream.ParquetBatchIter(train_spans, features, batch_rows)
+        dtrain = xgb.QuantileDMatrix(it, nthread=booster_params['nthread'])
+    print(f"  [+] {n_rows} training rows streamed in batches of {batch_rows or config.TRAIN_BATCH_ROWS}")
+
+    bst = xgb.train(booster_params, dtrain, num_boost_round=n_rounds)
+    del dtrain
+
+    # Holdout precision, streamed the same way
+    n_pred = n_pred_wins = 0
+    for _, X, labels in stream.iter_spans(holdout_spans, features, batch_rows):
+        pred = bst.inplace_predict(X) > 0.5
+        n_pred += int(pred.sum())
+        n_pred_wins += int((labels['bin'][pred] == 1).sum())
+    precision = n_pred_wins / n_pred if n_pred else 0.0
+    print(f"  [RESULT] {name} Holdout Precision: {precision:.2%} ({n_pred} signals)")
+
+    # Pooled models span several symbols' timelines: no single refresh point
+    save_model(bst, name, holdout_starts.get(symbols[0]) if len(symbols) == 1 else None)
+    return precision
+
+# --- NIGHTLY REFRESH ---
+def _logloss(prob, y):
+    prob = np.clip(prob, 1e-7, 1 - 1e-7)
+    return float(-np.mean(y * np.log(prob) + (1 - y) * np.log(1 - prob)))
+
+def refresh_model(symbol, method=None, n_jobs=-1):
+    """
+    Updates models/<SYM>_xgb.json with only the rows it has not seen
+    (index >= its trained_until attribute, at most REFRESH_LOOKBACK_DAYS).
+    The newest REFRESH_HOLDOUT_DAYS of those (more if they hold fewer than
+    REFRESH_MIN_HOLDOUT_ROWS rows) are held out; the rest
+    (purged + embargoed) either grow the booster by REFRESH_ROUNDS trees
+    ('continue') or refit the existing trees' leaf values ('refit', also
+    used once the model would pass REFRESH_MAX_TREES). The refreshed model
+    replaces the current one only if its holdout logloss is not worse.
+    Returns True if promoted.
+    """
+    model_path = config.MODELS_DIR / f"{symbol}_xgb.json"
+    data_path = config.DATA_PROCESSED / f"{symbol}_labeled.parquet"
+    if not model_path.exists() or not data_path.exists():
+        print(f"  [SKIP] No model / labeled data for {symbol}")
+        return None
+
+    current = xgb.Booster()
+    current.load_model(str(model_path))
+    unseen = current.attr('trained_until')
+    if unseen is None:
+        # Older models: trained on the first 80% of the file
+        index = pd.read_parquet(data_path, columns=['bin']).index
+        unseen = index[int(len(index) * (1 - config.HOLDOUT_FRAC))]
+    unseen = pd.Timestamp(unseen)
+
+    # Only the unseen tail is read (row-group statistics skip the rest)
+    date_type = pq.read_schema(data_path).field('date').type
+    df = pd.read_parquet(data_path, filters=pc.field('date') >= pa.scalar(unseen, type=date_type)).sort_index(kind='stable')
+    days = sorted(set(df.index.normalize()))[-config.REFRESH_LOOKBACK_DAYS:]
+    if len(days) <= config.REFRESH_HOLDOUT_DAYS:
+        print(f"  [SKIP] {symbol}: {len(days)} new day(s), need more than {config.REFRESH_HOLDOUT_DAYS}")
+        return False
+    df = df[df.index >= days[0]]
+    # Newest days as holdout, widened while it is too thin to compare on
+    k = config.REFRESH_HOLDOUT_DAYS
+    while k < len(days) - 1 and (df.index >= days[-k]).sum() < config.REFRESH_MIN_HOLDOUT_ROWS:
+        k += 1
+    holdout_start = days[-k]
+
+    features = [c for c in df.columns if c not in DROP_COLS]
+    train_idx = validation.purge_before(df.index, df['exit_time'], holdout_start, config.WF_EMBARGO_MIN)
+    test = df[df.index >= holdout_start]
+    X_train = df[features].to_numpy(dtype=np.float32)[train_idx]
+    y_train = df['bin'].to_numpy()[train_idx]
+    n_ones = (y_train == 1).sum()
+    if n_ones == 0 or test.empty:
+        print(f"  [SKIP] {symbol}: no wins / holdout rows in the new data")
+        return False
+
+    n_trees = current.num_boosted_rounds()
+    method = method or 'continue'
+    if method == 'continue' and n_trees + config.REFRESH_ROUNDS > config.REFRESH_MAX_TREES:
+        method = 'refit'
+
+    params = load_params(symbol)
+    params.pop('n_estimators')
+    params.pop('random_state', None)
+    params.update(objective='binary:logistic', seed=XGB_PARAMS['random_state'],
+                  scale_pos_weight=(y_train == 0).sum() / n_ones,
+                  nthread=n_jobs if n_jobs > 0 else os.cpu_count())
+    dtrain = xgb.DMatrix(X_train, label=y_train, feature_names=features)
+
+    if method == 'continue':
+        refreshed = xgb.train(params, dtrain, num_boost_round=config.REFRESH_ROUNDS, xgb_model=current.copy())
+    else:
+        params.update(process_type='update', updater='refresh', refresh_leaf=True)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')  # "manually specified updater" - intended here
+            refreshed = xgb.train(params, dtrain, num_boost_round=n_trees, xgb_model=current.copy())
+
+    # Same unseen holdout for both models
+    X_test = test[features].to_numpy(dtype=np.float32)
+    y_test = test['bin'].to_numpy()
+    old_loss = _logloss(current.inplace_predict(X_test), y_test)
+    new_loss = _logloss(refreshed.inplace_predict(X_test), y_test)
+    ret_test = test['ret'].to_numpy(dtype=float)
+    threshold = portfolio.entry_thresholds([symbol])[symbol]
+    old_m = fold_metrics(current.inplace_predict(X_test), y_test, ret_test, threshold=threshold)
+    new_m = fold_metrics(refreshed.inplace_predict(X_test), y_test, ret_test, threshold=threshold)
+    print(f"  [{symbol}] {method}: {len(train_idx)} new rows ({len(days) - k}d), "
+          f"trees {n_trees} -> {refreshed.num_boosted_rounds()}")
+    print(f"    holdout {len(test)} rows | logloss {old_loss:.4f} -> {new_loss:.4f} | "
+          f"EV {old_m['ev']:+.4f}% -> {new_m['ev']:+.4f}%")
+
+    if new_loss > old_loss:
+        print(f"    [-] Kept current model for {symbol}")
+        return False
+
+    os.replace(model_path, model_path.with_suffix('.prev.json')) # One-step rollback
+    save_model(refreshed, symbol, holdout_start)
+    print(f"    [+] Promoted refreshed model for {symbol}")
+    return True
+
 if __name__ == "__main__":
     print(f"Targeting Universe: {config.TARGET_SYMBOLS}")
     
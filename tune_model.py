@@ -0,0 +1,207 @@
+# code red/tune_model.py
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from src import config
+from src.strategy import validation
+from train_model import DROP_COLS, XGB_PARAMS, fold_metrics
+
+MIN_VAL_TRADES = 30       # Fewer validation trades than this = unusable config
+EARLY_STOPPING = 30       # Rounds without validation logloss improvement
+HALVING_ETA = 3           # Keep the top 1/eta of configs at each rung
+HALVING_BUDGETS = [100, 300, 900]  # Max boosting rounds per rung
+SCORING = 2               # Bump when trial scoring changes; older log records are rerun
+
+def sample_params(trial, seed=0):
+    """Trial `trial`'s configuration. Deterministic in (seed, trial) so resumed searches line up."""
+    rng = np.random.default_rng([seed, trial])
+    return {
+        'max_depth': int(rng.integers(2, 9)),
+        'learning_rate': float(np.exp(rng.uniform(np.log(0.01), np.log(0.3)))),
+        'subsample': float(rng.uniform(0.5, 1.0)),
+        'colsample_bytree': float(rng.uniform(0.5, 1.0)),
+        'min_child_weight': float(np.exp(rng.uniform(0, np.log(20)))),
+        'reg_lambda': float(np.exp(rng.uniform(np.log(0.1), np.log(10)))),
+        'gamma': float(rng.uniform(0, 5)),
+        'entry_threshold': float(np.round(rng.uniform(0.50, 0.80), 3)),
+    }
+
+@lru_cache(maxsize=None)
+def _load(symbol):
+    """
+    Training / early-stopping / scoring arrays for a symbol (once per
+    worker process). The holdout is never touched. The last WF fold-sized
+    block of the training span is split in two: the older half drives
+    early stopping, the newer half scores EV, so the threshold and EV
+    aren't judged on the rows that picked the round count. Each slice is
+    purged + embargoed against the next.
+    """
+    df = pd.read_parquet(config.DATA_PROCESSED / f"{symbol}_labeled.parquet").sort_index(kind='stable')
+    features = [c for c in df.columns if c not in DROP_COLS]
+    dev = df.iloc[:int(len(df) * (1 - config.HOLDOUT_FRAC))]
+    es_lo = int(len(dev) * (1 - 1 / (config.WF_FOLDS + 1)))
+    score_lo = (es_lo + len(dev)) // 2
+    times, exits = dev.index, dev['exit_time']
+    train_idx = validation.purge_before(times[:es_lo], exits.iloc[:es_lo], times[es_lo], config.WF_EMBARGO_MIN)
+    es_idx = es_lo + validation.purge_before(times[es_lo:score_lo], exits.iloc[es_lo:score_lo],
+                                             times[score_lo], config.WF_EMBARGO_MIN)
+    X = dev[features].to_numpy(dtype=np.float32)
+    y = dev['bin'].to_numpy()
+    ret = dev['ret'].to_numpy(dtype=float)
+    return (X[train_idx], y[train_idx], X[es_idx], y[es_idx],
+            X[score_lo:], y[score_lo:], ret[score_lo:])
+
+def run_trial(symbol, trial, params, budget, n_jobs=1):
+    X_train, y_train, X_es, y_es, X_val, y_val, ret_val = _load(symbol)
+    n_ones = (y_train == 1).sum()
+    if n_ones == 0:
+        # Same keys as a real trial so ranking / resume never trip on it
+        return {**fold_metrics(np.zeros(0), y_val[:0], ret_val[:0]), 'best_iteration': 0,
+                'logloss': float('inf'), 'score': None, 'error': 'no wins in training slice'}
+
+    xgb_params = {k: v for k, v in params.items() if k != 'entry_threshold'}
+    model = xgb.XGBClassifier(
+        **{**XGB_PARAMS, **xgb_params, 'n_estimators': budget},
+        scale_pos_weight=(y_train == 0).sum() / n_ones,
+        early_stopping_rounds=EARLY_STOPPING,
+        eval_metric='logloss',
+        n_jobs=n_jobs,
+    )
+    model.fit(X_train, y_train, eval_set=[(X_es, y_es)], verbose=False)
+    prob = model.predict_proba(X_val)[:, 1]  # best_iteration only
+    metrics = fold_metrics(prob, y_val, ret_val, threshold=params['entry_threshold'])
+    return {
+        **metrics,
+        'best_iteration': int(model.best_iteration) + 1,
+        'logloss': float(model.best_score),  # Early-stopping slice
+        # EV at the trial's threshold; too few trades can't be trusted
+        'score': metrics['ev'] if metrics['trades'] >= MIN_VAL_TRADES else None,
+    }
+
+class TrialLog:
+    """
+    Append-only JSONL of finished trials (models/tuning/<name>.jsonl).
+    Only the parent process writes, one fsynced line per trial, so a killed
+    search loses at most the trials that were running.
+    """
+    def __init__(self, name):
+        self.path = config.MODELS_DIR / "tuning" / f"{name}.jsonl"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.done = {}
+        if self.path.exists():
+            for line in self.path.read_text().splitlines():
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn last line from a crash
+                self.done[(rec['symbol'], rec['trial'], rec['budget'])] = rec
+
+    def get(self, symbol, trial, budget, params):
+        rec = self.done.get((symbol, trial, budget))
+        if rec is None or rec['params'] != params or rec.get('scoring', 1) != SCORING:
+            return None
+        return rec
+
+    def append(self, rec):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(rec) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.done[(rec['symbol'], rec['trial'], rec['budget'])] = rec
+
+def _run_rung(tasks, log, workers, n_jobs):
+    """Runs (symbol, trial, params, budget) tasks not already in the log. Returns all records."""
+    records, todo = [], []
+    for symbol, trial, params, budget in tasks:
+        rec = log.get(symbol, trial, budget, params)
+        if rec is not None:
+            records.append(rec)
+        else:
+            todo.append((symbol, trial, params, budget))
+
+    def record(task, result):
+        symbol, trial, params, budget = task
+        rec = {'symbol': symbol, 'trial': trial, 'budget': budget, 'params': params, 'scoring': SCORING, **result}
+        log.append(rec)
+        records.append(rec)
+        score = f"EV {rec['score']:+.4f}%" if rec['score'] is not None else "unusable"
+        print(f"  [{len(records)}/{len(tasks)}] {symbol} trial {trial} @ {budget}: {score}")
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(run_trial, t[0], t[1], t[2], t[3], n_jobs): t for t in todo}
+            for future in as_completed(futures):
+                try:
+                    record(futures[future], future.result())
+                except Exception as e:
+                    print(f"  [!] Trial failed for {futures[future][0]}: {e}")
+    else:
+        for t in todo:
+            try:
+                record(t, run_trial(t[0], t[1], t[2], t[3], n_jobs))
+            except Exception as e:
+                print(f"  [!] Trial failed for {t[0]}: {e}")
+    return records
+
+def _rank(rec):
+    score = rec.get('score')
+    return (score is not None, score if score is not None else 0.0, -rec.get('logloss', math.inf))
+
+def search(symbols=None, n_trials=200, method='halving', workers=1, seed=0, name=None):
+    """
+    Random or successive-halving search over XGBoost parameters and the
+    entry threshold, per symbol. Every (symbol, config, budget) trial is a
+    pool task; halving runs HALVING_BUDGETS as rungs, keeping the top
+    1/HALVING_ETA configs of each symbol for the next. Rerunning with the
+    same name/seed resumes from the trial log.
+    Best configs are written to models/<SYM>_params.json.
+    """
+    symbols = [s for s in (symbols or config.TARGET_SYMBOLS)
+               if (config.DATA_PROCESSED / f"{s}_labeled.parquet").exists()]
+    name = name or f"{method}-s{seed}"
+    budgets = HALVING_BUDGETS if method == 'halving' else HALVING_BUDGETS[-1:]
+    n_jobs = max(1, (os.cpu_count() or 1) // workers)
+    log = TrialLog(name)
+    print(f"--> {method} search: {n_trials} configs x {len(symbols)} symbols, {workers} worker(s) [{log.path.name}]")
+
+    alive = {sym: list(range(n_trials)) for sym in symbols}
+    best = {}
+    for rung, budget in enumerate(budgets):
+        tasks = [(sym, t, sample_params(t, seed), budget) for sym in symbols for t in alive[sym]]
+        print(f"\n  Rung {rung}: {len(tasks)} trials, up to {budget} rounds")
+        records = _run_rung(tasks, log, workers, n_jobs)
+
+        for sym in symbols:
+            ranked = sorted((r for r in records if r['symbol'] == sym), key=_rank, reverse=True)
+            if ranked:
+                best[sym] = ranked[0]
+            keep = max(1, math.ceil(len(ranked) / HALVING_ETA))
+            alive[sym] = [r['trial'] for r in ranked[:keep]]
+
+    print("\n=== BEST CONFIGS ===")
+    for sym, rec in best.items():
+        if rec['score'] is None:
+            print(f"{sym}: no config reached {MIN_VAL_TRADES} validation trades")
+            continue
+        params = {k: v for k, v in rec['params'].items() if k != 'entry_threshold'}
+        out = {
+            'xgb': {**params, 'n_estimators': rec['best_iteration']},
+            'entry_threshold': rec['params']['entry_threshold'],
+            'validation': {k: rec[k] for k in ('ev', 'win_rate', 'trades', 'precision', 'logloss')},
+            'search': {'name': name, 'trial': rec['trial'], 'budget': rec['budget']},
+        }
+        (config.MODELS_DIR / f"{sym}_params.json").write_text(json.dumps(out, indent=1))
+        print(f"{sym}: trial {rec['trial']} | EV {rec['score']:+.4f}% ({rec['trades']} trades) | "
+              f"thresh {out['entry_threshold']} | depth {params['max_depth']} lr {params['learning_rate']:.3f} "
+              f"rounds {rec['best_iteration']}")
+    return best
+
+if __name__ == "__main__":
+    search()